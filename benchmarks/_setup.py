@@ -0,0 +1,63 @@
+"""
+Shared setup for the benchmark scripts.
+
+Each script runs against a throwaway database created the same way the
+test suite creates one, so benchmarks never touch development data::
+
+    just bench game_sync
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@contextlib.contextmanager
+def django_test_database():
+    sys.path[:0] = [str(ROOT), str(ROOT / "test_project")]
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_project.settings")
+
+    import django
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if connection.vendor == "sqlite":
+            # a file rather than shared-cache memory, so threads can share it
+            test_settings = connection.settings_dict["TEST"]
+            test_settings["NAME"] = str(Path(tmp_dir) / "bench.sqlite3")
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+
+def create_user(username: str = "bench-user"):
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.create_user(username=username, password="bench")
+
+
+def report(title: str, rows: list[tuple], headers: tuple[str, ...]) -> None:
+    widths = [
+        max(len(str(value)) for value in column) for column in zip(headers, *rows)
+    ]
+    print(f"\n{title}")
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
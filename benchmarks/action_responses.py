@@ -0,0 +1,122 @@
+"""
+CPU cost of building the response to an activity action: the old path,
+which fed our own output back through ``ActivityResponseSerializer`` and
+validated it, against the renderers in ``do_again_list.responses``.
+
+Measured for the body alone and for a whole POST /activities/<id>/set_next/
+request, with the old path patched back into the view.
+
+    python benchmarks/action_responses.py --number 2000
+"""
+
+import argparse
+import time
+import timeit
+from dataclasses import asdict
+from unittest import mock
+
+from _setup import create_user, django_test_database, report
+
+
+def validated_response(game_state, game_effect):
+    from do_again_list import serializers
+
+    serializer = serializers.ActivityResponseSerializer(
+        data={
+            "game": game_state,
+            "success": True,
+            "error": None,
+            "messages": game_effect.messages,
+            "spawn_enemy": asdict(game_effect.spawn_enemy)
+            if game_effect.spawn_enemy is not None
+            else None,
+            "hero_buffs": [asdict(buff) for buff in game_effect.hero_buffs],
+            "pending_heal": game_effect.pending_heal,
+            "pending_fatigue": game_effect.pending_fatigue,
+            "resource_ref": asdict(game_effect.resource_ref)
+            if game_effect.resource_ref is not None
+            else None,
+        },
+        context={},
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+def per_request(client, path: str, number: int) -> float:
+    """Mean process CPU time of ``number`` POSTs to ``path``, in seconds."""
+    started = time.process_time()
+    for _ in range(number):
+        response = client.post(path, {"next_time": None}, format="json")
+        assert response.status_code == 200, response.content
+    return (time.process_time() - started) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    with django_test_database():
+        from rest_framework.test import APIClient
+
+        from do_again_list import models, responses, services, views
+        from do_again_list.repositories import GameStateRepository
+
+        user = create_user()
+        game_state, _ = GameStateRepository().get(user)
+        effect = services.GameEffect(
+            spawn_enemy=services.SpawnEnemy(
+                level=2, stat_modifier=services.StatModifier(attack=-2, defense=-1)
+            ),
+            hero_buffs=[
+                services.Buff(stat=stat, amount=1, label="bench [good]")
+                for stat in services.Stat
+            ],
+            messages=["Good habit on schedule!"],
+        )
+        assert responses.render_activity_action(
+            game_state, effect
+        ) == validated_response(game_state, effect)
+
+        rows = []
+        for name, render in (
+            ("validated serializer", validated_response),
+            ("responses.render_activity_action", responses.render_activity_action),
+        ):
+            elapsed = timeit.timeit(
+                lambda: render(game_state, effect), number=args.number
+            )
+            rows.append(("body", name, f"{elapsed / args.number * 1e6:,.1f} us"))
+
+        activity = models.Activity.objects.create(owner=user, title="bench")
+        client = APIClient()
+        client.force_authenticate(user)
+        path = f"/api/do-again/activities/{activity.pk}/set_next/"
+        per_request(client, path, 50)  # warm up
+
+        def legacy_render_action(self, *, game_effect):
+            game_state, _ = self.game_state_repository.get(self.request.user)
+            game_state = services.GameStateService().update(
+                game_state=game_state, game_effect=game_effect
+            )
+            return validated_response(game_state, game_effect)
+
+        with mock.patch.object(
+            views.ActivityViewSet, "_render_action", legacy_render_action
+        ):
+            legacy = per_request(client, path, args.number)
+        lean = per_request(client, path, args.number)
+        rows.append(("request", "validated serializer", f"{legacy * 1e6:,.1f} us"))
+        rows.append(
+            ("request", "responses.render_activity_action", f"{lean * 1e6:,.1f} us")
+        )
+        report(
+            f"Activity action response CPU time, mean of {args.number}",
+            rows,
+            ("scope", "response built by", "cpu"),
+        )
+
+
+if __name__ == "__main__":
+    main()
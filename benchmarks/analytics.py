@@ -0,0 +1,76 @@
+"""
+Time to analyze every activity of one user (``analytics.analyze``) with
+NumPy and with the plain Python fallback, against a loop over Occurance
+instances per activity.
+
+    python benchmarks/analytics.py --activities 50 --occurances 100000
+"""
+
+import argparse
+import statistics
+import time
+
+from _setup import create_user, django_test_database, report
+from export_memory import seed
+
+
+def mean_ms(function, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - start) / number * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--occurances", type=int, default=100_000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    with django_test_database():
+        from django.conf import settings
+
+        from do_again_list import analytics
+        from do_again_list.models import Activity
+
+        if analytics.np is None:
+            print("numpy is not installed; both backends are plain Python")
+
+        owner = create_user()
+        seed(owner, args.activities, args.occurances)
+        activities = Activity.objects.filter(owner=owner)
+
+        def orm_loop():
+            for activity in activities:
+                occurances = list(
+                    activity.occurances.filter(end_time__isnull=False).order_by(
+                        "end_time"
+                    )
+                )
+                intervals = [
+                    (later.end_time - earlier.end_time).total_seconds()
+                    for earlier, later in zip(occurances, occurances[1:])
+                ]
+                if intervals:
+                    statistics.quantiles(intervals, n=20)
+
+        rows = []
+        for backend, accelerated in (("numpy", True), ("python", False)):
+            settings.DO_AGAIN_LIST_ANALYTICS_ACCELERATED = accelerated
+            rows.append(
+                (
+                    f"analyze ({backend})",
+                    f"{mean_ms(lambda: analytics.analyze(activities), args.number):,.1f} ms",
+                )
+            )
+        rows.append(("ORM loop", f"{mean_ms(orm_loop, args.number):,.1f} ms"))
+        report(
+            f"{args.activities} activities, {args.occurances:,} occurances",
+            rows,
+            ("method", "time"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Throughput and tail latency of the activity list under concurrent load:
+gunicorn with two sync WSGI workers against gunicorn with one uvicorn
+worker serving the ASGI application, both answering the DRF view at
+/api/do-again/activities/.
+
+Each setup is also measured while other clients keep downloading the data
+export, which holds a sync worker for as long as it streams.
+
+Needs ``pip install gunicorn uvicorn-worker``; the servers share the
+benchmark's SQLite file, so absolute numbers are lower than on Postgres.
+
+    python benchmarks/asgi_throughput.py --clients 16 --seconds 10
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from _setup import ROOT, create_user, django_test_database, report
+from export_memory import seed
+
+SETUPS = {
+    "wsgi (2 sync workers)": ["test_project.wsgi:application", "--workers", "2"],
+    "asgi (1 uvicorn worker)": [
+        "test_project.asgi:application",
+        "--workers",
+        "1",
+        "--worker-class",
+        "uvicorn_worker.UvicornWorker",
+    ],
+}
+LIST_PATH = "/api/do-again/activities/"
+EXPORT_PATH = "/api/do-again/data/export/"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} didn't start")
+
+
+def load(
+    port: int, path: str, cookie: str, clients: int, seconds: float, exporters: int
+) -> tuple[int, list[float]]:
+    """Run ``clients`` looping GETs of ``path`` (and ``exporters`` looping
+    downloads of the export) for ``seconds``; returns the number of
+    requests and their latencies in milliseconds."""
+    stop = time.monotonic() + seconds
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def client(target: str, record: bool) -> None:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        mine = []
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            connection.request("GET", target, headers={"Cookie": cookie})
+            response = connection.getresponse()
+            response.read()
+            assert response.status == 200, response.status
+            mine.append((time.perf_counter() - start) * 1000)
+        connection.close()
+        if record:
+            with lock:
+                latencies.extend(mine)
+
+    threads = [
+        threading.Thread(target=client, args=(path, True)) for _ in range(clients)
+    ] + [
+        threading.Thread(target=client, args=(EXPORT_PATH, False))
+        for _ in range(exporters)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--occurances", type=int, default=20_000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--exporters", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with django_test_database(), tempfile.TemporaryDirectory() as settings_dir:
+        from django.db import connection
+        from django.test import Client
+
+        owner = create_user()
+        seed(owner, args.activities, args.occurances)
+        client = Client()
+        client.force_login(owner)
+        cookie = f"sessionid={client.cookies['sessionid'].value}"
+
+        Path(settings_dir, "bench_settings.py").write_text(
+            "from test_project.settings import *  # noqa: F403\n"
+            f"DATABASES['default']['NAME'] = {str(connection.settings_dict['NAME'])!r}\n"
+            "DEBUG = False\n"
+            "ALLOWED_HOSTS = ['*']\n"
+        )
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "bench_settings",
+            "PYTHONPATH": os.pathsep.join(
+                [settings_dir, str(ROOT), str(ROOT / "test_project")]
+            ),
+        }
+
+        rows = []
+        for name, server_args in SETUPS.items():
+            port = free_port()
+            server = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "gunicorn",
+                    *server_args,
+                    "--bind",
+                    f"127.0.0.1:{port}",
+                    "--log-level",
+                    "warning",
+                ],
+                env=env,
+            )
+            try:
+                wait_until_listening(port)
+                for exporters in (0, args.exporters):
+                    count, latencies = load(
+                        port, LIST_PATH, cookie, args.clients, args.seconds, exporters
+                    )
+                    percentiles = statistics.quantiles(latencies, n=100)
+                    rows.append(
+                        (
+                            name,
+                            exporters,
+                            f"{count / args.seconds:,.0f}",
+                            f"{percentiles[49]:,.0f} ms",
+                            f"{percentiles[94]:,.0f} ms",
+                            f"{percentiles[98]:,.0f} ms",
+                        )
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+        report(
+            f"GET activity list, {args.clients} clients for {args.seconds:g}s, "
+            f"{args.activities} activities",
+            rows,
+            ("server", "exporters", "req/s", "p50", "p95", "p99"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Time and peak memory of ``POST /api/do-again/data/import/`` for uploads of
+growing size, through the same serializer and service the view uses.
+
+    python benchmarks/data_import.py --activities 50 --occurances 10000 100000
+
+Each upload is imported twice: into an empty account, then again on top
+of itself, where every occurance is a duplicate to be skipped. Pass
+``--memory`` to also record peak memory with ``tracemalloc``, which slows
+the import down several times over.
+"""
+
+import argparse
+import datetime
+import time
+import tracemalloc
+
+from _setup import create_user, django_test_database, report
+
+
+def payload(n_activities: int, n_occurances: int) -> dict:
+    start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    activities = [
+        {"title": f"activity-{index}", "default_duration": "30m", "occurances": []}
+        for index in range(n_activities)
+    ]
+    for index in range(n_occurances):
+        start_time = start + datetime.timedelta(hours=index)
+        activities[index % n_activities]["occurances"].append(
+            {
+                "start_time": start_time.isoformat(),
+                "end_time": (start_time + datetime.timedelta(minutes=30)).isoformat(),
+            }
+        )
+    return {"version": 1, "activities": activities}
+
+
+def do_import(owner, data: dict):
+    from do_again_list.serializers import DataImportSerializer
+    from do_again_list.services import DataImportExportService
+
+    serializer = DataImportSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return DataImportExportService().do_import(
+        owner=owner,
+        activities=serializer.iter_activities(),
+        game_state=serializer.validated_data["game_state"],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--occurances", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+
+    with django_test_database():
+        rows = []
+        for n_occurances in args.occurances:
+            owner = create_user(f"bench-user-{n_occurances}")
+            data = payload(args.activities, n_occurances)
+            for name in ("fresh", "re-import"):
+                if args.memory:
+                    tracemalloc.start()
+                start = time.perf_counter()
+                result = do_import(owner, data)
+                elapsed = time.perf_counter() - start
+                peak = "-"
+                if args.memory:
+                    peak = f"{tracemalloc.get_traced_memory()[1] / 2**20:.1f} MiB"
+                    tracemalloc.stop()
+                rows.append(
+                    (
+                        n_occurances,
+                        name,
+                        result.occurances_added,
+                        f"{elapsed:.2f}s",
+                        peak,
+                    )
+                )
+        report(
+            f"import of {args.activities} activities",
+            rows,
+            ("occurances", "run", "added", "elapsed", "peak memory"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Micro-benchmarks for the duration codec behind ``HumanReadableDurationField``:
+the old seven-regex parser and day-limited formatter against
+``do_again_list.durations``, with its caches cold and warm.
+
+    python benchmarks/durations.py --number 20000
+"""
+
+import argparse
+import datetime
+import re
+import timeit
+
+from _setup import django_test_database, report
+
+SAMPLES = ["30m", "1h", "1d5h30m", "2w", "1y2mo3w4d5h6m7s", "45s", "1.5h", ""]
+
+
+def legacy_parse_ms(value: str) -> float:
+    if not value or not value.strip():
+        return 0
+    total = 0
+    year = re.search(r"([\d\.]+)y", value)
+    month = re.search(r"([\d\.]+)mo", value)
+    week = re.search(r"([\d\.]+)w", value)
+    day = re.search(r"([\d\.]+)d", value)
+    hour = re.search(r"([\d\.]+)h", value)
+    minute = re.search(r"([\d\.]+)m(?!o)", value)
+    sec = re.search(r"([\d\.]+)s", value)
+    if year:
+        total += float(year.group(1)) * 365 * 24 * 60 * 60 * 1000
+    if month:
+        total += float(month.group(1)) * 30 * 24 * 60 * 60 * 1000
+    if week:
+        total += float(week.group(1)) * 7 * 24 * 60 * 60 * 1000
+    if day:
+        total += float(day.group(1)) * 24 * 60 * 60 * 1000
+    if hour:
+        total += float(hour.group(1)) * 60 * 60 * 1000
+    if minute:
+        total += float(minute.group(1)) * 60 * 1000
+    if sec:
+        total += float(sec.group(1)) * 1000
+    return total
+
+
+def legacy_humanize(duration: datetime.timedelta) -> str:
+    buffer = ""
+    days = duration.days
+    for unit, unit_days in (("y", 365), ("mo", 30), ("w", 7)):
+        if days >= unit_days:
+            buffer += f"{days // unit_days}{unit}"
+            days %= unit_days
+    if days > 0:
+        buffer += f"{days}d"
+    seconds = duration.seconds
+    for unit, unit_seconds in (("h", 3600), ("m", 60)):
+        if seconds >= unit_seconds:
+            buffer += f"{seconds // unit_seconds}{unit}"
+            seconds %= unit_seconds
+    if seconds > 0:
+        buffer += f"{seconds}s"
+    return buffer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with django_test_database():
+        from do_again_list import durations
+        from do_again_list.serializers import HumanReadableDurationField
+
+        field = HumanReadableDurationField()
+        values = [datetime.timedelta(milliseconds=legacy_parse_ms(s)) for s in SAMPLES]
+
+        def uncached_parse():
+            for sample in SAMPLES:
+                durations.parse_ms.__wrapped__(sample)
+
+        def uncached_humanize():
+            for value in values:
+                durations.humanize_seconds.__wrapped__(
+                    value.days * 86400 + value.seconds
+                )
+
+        cases = [
+            ("parse", "legacy", lambda: [legacy_parse_ms(s) for s in SAMPLES]),
+            ("parse", "tokenizer, uncached", uncached_parse),
+            (
+                "parse",
+                "tokenizer, cached",
+                lambda: [durations.parse_ms(s) for s in SAMPLES],
+            ),
+            ("format", "legacy", lambda: [legacy_humanize(v) for v in values]),
+            ("format", "codec, uncached", uncached_humanize),
+            (
+                "format",
+                "codec, cached",
+                lambda: [durations.humanize(v) for v in values],
+            ),
+            (
+                "field",
+                "to_internal_value",
+                lambda: [field.to_internal_value(s) for s in SAMPLES],
+            ),
+            (
+                "field",
+                "to_representation",
+                lambda: [field.to_representation(v) for v in values],
+            ),
+        ]
+        rows = []
+        for direction, name, case in cases:
+            elapsed = timeit.timeit(case, number=args.number)
+            per_value = elapsed / (args.number * len(SAMPLES)) * 1e9
+            rows.append((direction, name, f"{per_value:,.0f} ns"))
+        report(
+            f"{len(SAMPLES)} sample values x {args.number}",
+            rows,
+            ("direction", "implementation", "per value"),
+        )
+
+
+if __name__ == "__main__":
+    main()
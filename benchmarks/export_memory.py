@@ -0,0 +1,122 @@
+"""
+Peak memory and time of the data export as history grows: building the
+whole document with ``DataImportExportService.export`` and rendering it
+at once, against streaming it with ``iter_export``, and the gzipped
+version 2 NDJSON export from ``iter_export_ndjson``.
+
+    python benchmarks/export_memory.py --activities 50 --occurances 1000 10000 50000
+
+Peak memory is measured with ``tracemalloc`` and covers Python objects only.
+"""
+
+import argparse
+import datetime
+import json
+import time
+import tracemalloc
+
+from _setup import create_user, django_test_database, report
+
+
+def seed(owner, n_activities: int, n_occurances: int) -> None:
+    from django.utils import timezone
+
+    from do_again_list.models import Activity, Occurance
+
+    Activity.objects.filter(owner=owner).delete()
+    activities = Activity.objects.bulk_create(
+        Activity(
+            owner=owner,
+            title=f"activity-{index}",
+            display_name=f"activity-{index}",
+            ordering=index,
+            default_duration=datetime.timedelta(minutes=30),
+        )
+        for index in range(n_activities)
+    )
+    now = timezone.now()
+    Occurance.objects.bulk_create(
+        (
+            Occurance(
+                activity=activities[index % n_activities],
+                start_time=now - datetime.timedelta(hours=index + 1),
+                end_time=now - datetime.timedelta(hours=index, minutes=30),
+            )
+            for index in range(n_occurances)
+        ),
+        batch_size=1000,
+    )
+
+
+def whole_document(owner) -> int:
+    from do_again_list.services import DataImportExportService
+
+    return len(json.dumps(DataImportExportService().export(owner)))
+
+
+def streamed(owner) -> int:
+    from do_again_list.services import DataImportExportService
+
+    return sum(len(chunk) for chunk in DataImportExportService().iter_export(owner))
+
+
+def streamed_ndjson(owner) -> int:
+    from do_again_list.services import DataImportExportService
+
+    return sum(
+        len(chunk) for chunk in DataImportExportService().iter_export_ndjson(owner)
+    )
+
+
+def measure(export, owner) -> tuple[float, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = export(owner)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument(
+        "--occurances", type=int, nargs="+", default=[1_000, 10_000, 50_000]
+    )
+    args = parser.parse_args()
+
+    with django_test_database():
+        from do_again_list.models import GameState
+
+        user = create_user()
+        GameState.objects.create(owner=user)
+
+        rows = []
+        for n_occurances in args.occurances:
+            seed(user, args.activities, n_occurances)
+            for name, export in (
+                ("export()", whole_document),
+                ("iter_export()", streamed),
+                ("iter_export_ndjson()", streamed_ndjson),
+            ):
+                export(user)  # warm up
+                elapsed, peak, size = measure(export, user)
+                rows.append(
+                    (
+                        n_occurances,
+                        name,
+                        f"{elapsed:.3f}s",
+                        f"{peak:.1f} MiB",
+                        f"{size / 2**10:,.0f} KiB",
+                    )
+                )
+        report(
+            f"export of {args.activities} activities",
+            rows,
+            ("occurances", "implementation", "elapsed", "peak memory", "body"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Throughput of ``game/sync`` style writes: the old read-modify-write with a
+full ``save()`` against ``GameStateService.sync``'s column-scoped
+``UPDATE ... SET col = col + delta``.
+
+    python benchmarks/game_sync.py --threads 1 --syncs 2000
+
+With ``--threads`` above 1 the old implementation loses updates. SQLite
+serializes all writers, so the throughput gain from scoped updates only
+shows up on a database with row-level locking such as Postgres.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _setup import create_user, django_test_database, report
+
+
+def legacy_sync(owner, gold: int, xp: int) -> None:
+    """The pre-F() implementation of ``GameStateViewSet.sync``."""
+    from do_again_list.models import GameState
+
+    game_state = GameState.objects.get(owner=owner)
+    game_state.gold += gold
+    game_state.streak = 1
+    game_state.hero_hp = 10
+    if xp > 0:
+        xp += game_state.consume_bonus_xp()
+    game_state.add_xp(xp)
+    game_state.quest_tokens += 1
+    game_state.save()
+
+
+def service_sync(owner, gold: int, xp: int) -> None:
+    from do_again_list.services import GameStateService
+
+    GameStateService().sync(
+        owner=owner,
+        gold=gold,
+        xp=xp,
+        streak=1,
+        hero_hp=10,
+        quest_tokens=1,
+    )
+
+
+def run(sync, owner, syncs: int, threads: int) -> tuple[float, int]:
+    from django.db import connections
+
+    from do_again_list.models import GameState
+
+    GameState.objects.filter(owner=owner).update(gold=0, quest_tokens=0)
+
+    def _one(_):
+        try:
+            sync(owner, 1, 0)
+        finally:
+            if threads > 1:
+                connections.close_all()
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(_one, range(syncs)))
+    else:
+        for index in range(syncs):
+            _one(index)
+    elapsed = time.perf_counter() - start
+    lost = syncs - GameState.objects.get(owner=owner).gold
+    return elapsed, lost
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--syncs", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    with django_test_database():
+        from do_again_list.models import GameState
+
+        user = create_user()
+        # a realistic inventory makes the full-row rewrite visible
+        GameState.objects.create(
+            owner=user, items=[{"name": f"item-{i}"} for i in range(50)]
+        )
+
+        rows = []
+        for name, sync in (
+            ("legacy save()", legacy_sync),
+            ("F() update", service_sync),
+        ):
+            run(sync, user, 50, 1)  # warm up
+            elapsed, lost = run(sync, user, args.syncs, args.threads)
+            rows.append(
+                (name, f"{elapsed:.3f}s", f"{args.syncs / elapsed:,.0f}/s", lost)
+            )
+        report(
+            f"{args.syncs} syncs on {args.threads} thread(s)",
+            rows,
+            ("implementation", "elapsed", "throughput", "lost updates"),
+        )
+
+
+if __name__ == "__main__":
+    main()
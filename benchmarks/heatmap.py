@@ -0,0 +1,93 @@
+"""
+Time to fetch a year heatmap for one user: GET /heatmap/ reading
+``DailyRollup`` against aggregating the raw occurances by day, which is
+what it replaces.
+
+    python benchmarks/heatmap.py --activities 50 --occurances 2000
+"""
+
+import argparse
+import time
+
+from _setup import create_user, django_test_database, report
+from export_memory import seed
+
+
+def mean_ms(function, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - start) / number * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--occurances", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    with django_test_database():
+        import datetime
+
+        from django.db.models import Count, F, Sum
+        from django.db.models.fields import DurationField
+        from django.db.models.functions import TruncDate
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        from do_again_list.models import Activity, DailyRollup, Occurance
+
+        owner = create_user()
+        seed(owner, args.activities, args.occurances)
+        activities = Activity.objects.filter(owner=owner)
+        start = time.perf_counter()
+        activities.refresh_daily_rollups()
+        backfill = time.perf_counter() - start
+        client = APIClient()
+        client.force_authenticate(owner)
+        end = timezone.localdate()
+        year_start = end - datetime.timedelta(days=364)
+
+        def rollup_request():
+            response = client.get("/api/do-again/heatmap/")
+            assert response.status_code == 200
+
+        def raw_aggregate():
+            list(
+                Occurance.objects.filter(
+                    activity__owner=owner,
+                    end_time__date__gte=year_start,
+                    end_time__date__lte=end,
+                )
+                .annotate(day=TruncDate("end_time"))
+                .values("day")
+                .annotate(
+                    count=Count("pk"),
+                    total_duration=Sum(
+                        F("end_time") - F("start_time"), output_field=DurationField()
+                    ),
+                )
+                .order_by("day")
+            )
+
+        report(
+            f"{args.activities} activities x {args.occurances} occurances, "
+            f"{DailyRollup.objects.filter(owner=owner).count():,} rollup rows "
+            f"(backfilled in {backfill * 1000:,.0f} ms)",
+            [
+                (
+                    "rollups (request)",
+                    f"{mean_ms(rollup_request, args.number):,.2f} ms",
+                ),
+                (
+                    "raw aggregate (query only)",
+                    f"{mean_ms(raw_aggregate, args.number):,.2f} ms",
+                ),
+            ],
+            ("heatmap", "time"),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+JSON encoding and decoding time for realistic payloads: the activity list
+(GET /activities/) and the version 1 data export document, with DRF's own
+renderer and parser against ``do_again_list.renderers``/``parsers`` on
+orjson and on the standard library fallback.
+
+Also times the streamed export (``iter_export``) on each backend, since it
+encodes through ``do_again_list.jsonlib`` too.
+
+    python benchmarks/json_rendering.py --activities 200 --occurances 20000
+"""
+
+import argparse
+import io
+import time
+import timeit
+
+from _setup import create_user, django_test_database, report
+from export_memory import seed
+
+
+def best_of(function, number: int, repeat: int = 5) -> float:
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=200)
+    parser.add_argument("--occurances", type=int, default=20_000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    with django_test_database():
+        from django.conf import settings
+        from rest_framework import parsers, renderers
+
+        from do_again_list import jsonlib
+        from do_again_list import parsers as app_parsers
+        from do_again_list import renderers as app_renderers
+        from do_again_list.models import Activity
+        from do_again_list.serializers import ActivitySerializer
+        from do_again_list.services import DataImportExportService
+
+        if jsonlib.orjson is None:
+            print("orjson is not installed; both backends are the standard library")
+
+        owner = create_user()
+        seed(owner, args.activities, args.occurances)
+        service = DataImportExportService()
+        payloads = {
+            "activity list": ActivitySerializer(
+                Activity.objects.filter(owner=owner),
+                many=True,
+            ).data,
+            "export": service.export(owner),
+        }
+
+        backends = [
+            ("drf", renderers.JSONRenderer(), parsers.JSONParser(), True),
+            ("stdlib", app_renderers.JSONRenderer(), app_parsers.JSONParser(), False),
+            ("orjson", app_renderers.JSONRenderer(), app_parsers.JSONParser(), True),
+        ]
+        rows = []
+        for name, payload in payloads.items():
+            body = renderers.JSONRenderer().render(payload)
+            for backend, renderer, body_parser, accelerated in backends:
+                settings.DO_AGAIN_LIST_JSON_ACCELERATED = accelerated
+                encode = best_of(lambda: renderer.render(payload), args.number)
+                decode = best_of(
+                    lambda: body_parser.parse(io.BytesIO(body)), args.number
+                )
+                rows.append(
+                    (
+                        name,
+                        f"{len(body) / 1024:,.0f} KiB",
+                        backend,
+                        f"{encode * 1000:,.2f} ms",
+                        f"{decode * 1000:,.2f} ms",
+                    )
+                )
+        report(
+            f"{args.activities} activities, {args.occurances} occurances",
+            rows,
+            ("payload", "size", "backend", "encode", "decode"),
+        )
+
+        rows = []
+        for backend, accelerated in (("stdlib", False), ("orjson", True)):
+            settings.DO_AGAIN_LIST_JSON_ACCELERATED = accelerated
+            start = time.perf_counter()
+            size = sum(len(chunk) for chunk in service.iter_export(owner))
+            rows.append(
+                (
+                    backend,
+                    f"{size / 1024:,.0f} KiB",
+                    f"{(time.perf_counter() - start) * 1000:,.0f} ms",
+                )
+            )
+        report("Streamed export (iter_export)", rows, ("backend", "size", "time"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Time to fetch one page of GET /occurances/ at increasing depth: the keyset
+cursor of ``OccuranceCursorPagination`` against the equivalent ``OFFSET``
+query it replaces.
+
+    python benchmarks/occurance_paging.py --occurances 100000 --page-size 100
+"""
+
+import argparse
+import time
+
+from _setup import create_user, django_test_database, report
+from export_memory import seed
+
+DEPTHS = (0.0, 0.25, 0.5, 0.9)
+
+
+def mean_ms(function, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - start) / number * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--occurances", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    with django_test_database():
+        from rest_framework.test import APIClient
+
+        from do_again_list.models import Occurance
+        from do_again_list.pagination import OccuranceCursorPagination
+
+        owner = create_user()
+        seed(owner, args.activities, args.occurances)
+        client = APIClient()
+        client.force_authenticate(owner)
+        ordered = Occurance.objects.filter(activity__owner=owner).order_by(
+            "-end_time", "-pk"
+        )
+        paginator = OccuranceCursorPagination()
+
+        rows = []
+        for depth in DEPTHS:
+            offset = int(args.occurances * depth)
+            last = ordered[offset - 1] if offset else None
+            params = {"page_size": args.page_size}
+            if last is not None:
+                params["cursor"] = paginator.encode_cursor((last.end_time, last.pk))
+
+            def keyset():
+                response = client.get("/api/do-again/occurances/", params)
+                assert response.status_code == 200
+
+            def offset_query():
+                list(ordered[offset : offset + args.page_size])
+
+            rows.append(
+                (
+                    f"{offset:,}",
+                    f"{mean_ms(keyset, args.number):,.2f} ms",
+                    f"{mean_ms(offset_query, args.number):,.2f} ms",
+                )
+            )
+        report(
+            f"{args.occurances:,} occurances, pages of {args.page_size}",
+            rows,
+            ("rows skipped", "keyset page (request)", "OFFSET page (query only)"),
+        )
+
+
+if __name__ == "__main__":
+    main()
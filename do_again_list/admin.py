@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Activity, Occurance
+from .models import Activity, Job, Occurance
 
 
 @admin.register(Activity)
@@ -17,3 +17,40 @@ class OccuranceAdmin(admin.ModelAdmin):
     ordering = ("-start_time",)
     date_hierarchy = "start_time"
     readonly_fields = ("start_time",)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        obj.activity.refresh_occurance_summary()
+        touched = Activity.objects.filter(pk=obj.activity_id)
+        touched.refresh_stats()
+        touched.refresh_daily_rollups()
+
+    def delete_model(self, request, obj):
+        activity = obj.activity
+        super().delete_model(request, obj)
+        activity.refresh_occurance_summary()
+        touched = Activity.objects.filter(pk=activity.pk)
+        touched.refresh_stats()
+        touched.refresh_daily_rollups()
+
+    def delete_queryset(self, request, queryset):
+        activities = list(Activity.objects.filter(occurances__in=queryset).distinct())
+        super().delete_queryset(request, queryset)
+        for activity in activities:
+            activity.refresh_occurance_summary()
+        touched = Activity.objects.filter(pk__in=[a.pk for a in activities])
+        touched.refresh_stats()
+        touched.refresh_daily_rollups()
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "owner", "kind", "status", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+    actions = ("requeue",)
+
+    @admin.action(description="Requeue (e.g. after the worker was killed)")
+    def requeue(self, request, queryset):
+        queryset.update(
+            status=Job.Status.QUEUED, started_at=None, finished_at=None, error=""
+        )
@@ -0,0 +1,181 @@
+"""
+Interval analytics over activities' completion times: how the time
+between completions is distributed, how regular it is, and when the next
+completion is due. Uses NumPy when it is installed (``pip install
+do-again-list[fast]``) and plain Python otherwise, with the same results;
+``DO_AGAIN_LIST_ANALYTICS_ACCELERATED = False`` forces plain Python.
+
+Completion times are read as ``(activity_id, end_time)`` tuples, ordered,
+in one query for any number of activities (``analyze``), never as model
+instances.
+
+The period is the median of the latest ``RECENT_INTERVALS`` intervals,
+so it follows a changing habit while ignoring the odd missed day, and the
+predicted ``next_time`` is the latest completion plus the period.
+Regularity is one minus the median absolute deviation of those intervals
+relative to the period: 1 for clockwork, 0 for no discernible rhythm.
+Nothing is estimated from fewer than ``MIN_INTERVALS`` intervals.
+"""
+
+import dataclasses
+import datetime
+import itertools
+import math
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING
+
+from do_again_list import models
+from do_again_list.conf import settings
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    try:
+        import numpy as np
+    except ImportError:  # pragma: no cover - depends on the environment
+        np = None
+
+MIN_INTERVALS = 3
+RECENT_INTERVALS = 30
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+@dataclasses.dataclass(frozen=True)
+class IntervalAnalysis:
+    completion_count: int = 0
+    last_end_time: datetime.datetime | None = None
+    mean_interval: datetime.timedelta | None = None
+    # percentile -> interval, over the whole history
+    interval_percentiles: dict[int, datetime.timedelta] = dataclasses.field(
+        default_factory=dict
+    )
+    period: datetime.timedelta | None = None
+    regularity: float | None = None
+    predicted_next_time: datetime.datetime | None = None
+
+
+def accelerated() -> bool:
+    """Whether NumPy is installed and enabled."""
+    return np is not None and settings.DO_AGAIN_LIST_ANALYTICS_ACCELERATED
+
+
+def summarize(end_times: Sequence[float]) -> IntervalAnalysis:
+    """Analyze ascending completion times, in seconds since the epoch."""
+    if accelerated():
+        return _summarize_numpy(np.asarray(end_times, dtype=float))
+    return _summarize_python(end_times)
+
+
+def analyze(activities: "models.ActivityQuerySet") -> dict[int, IntervalAnalysis]:
+    """Analyze every activity in the queryset from one read of its
+    completion times."""
+    activity_ids = list(activities.values_list("pk", flat=True))
+    rows = (
+        models.Occurance.objects.filter(
+            activity_id__in=activity_ids, end_time__isnull=False
+        )
+        .order_by("activity_id", "end_time")
+        .values_list("activity_id", "end_time")
+    )
+    results = dict.fromkeys(activity_ids, IntervalAnalysis())
+    if accelerated():
+        rows = list(rows)
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        times = np.fromiter(
+            (row[1].timestamp() for row in rows), dtype=float, count=len(rows)
+        )
+        # each activity's run of times starts where the id changes
+        starts = np.flatnonzero(np.diff(ids)) + 1
+        for group_ids, end_times in zip(np.split(ids, starts), np.split(times, starts)):
+            if len(group_ids):
+                results[int(group_ids[0])] = _summarize_numpy(end_times)
+    else:
+        for activity_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+            results[activity_id] = _summarize_python(
+                [end_time.timestamp() for _, end_time in group]
+            )
+    return results
+
+
+def predict_next_time(activity: models.Activity) -> datetime.datetime | None:
+    """When ``activity`` is next due going by its recent completions."""
+    recent = list(
+        models.Occurance.objects.filter(activity=activity, end_time__isnull=False)
+        .order_by("-end_time")
+        .values_list("end_time", flat=True)[: RECENT_INTERVALS + 1]
+    )
+    end_times = [end_time.timestamp() for end_time in reversed(recent)]
+    return summarize(end_times).predicted_next_time
+
+
+def _counted(end_times: "Sequence[float] | np.ndarray") -> IntervalAnalysis:
+    """The analysis of too few completions to estimate anything from."""
+    if not len(end_times):
+        return IntervalAnalysis()
+    return IntervalAnalysis(
+        completion_count=len(end_times), last_end_time=_datetime(end_times[-1])
+    )
+
+
+def _result(
+    end_times: "Sequence[float] | np.ndarray",
+    mean: float,
+    percentiles: Iterable[float],
+    period: float,
+    deviation: float,
+) -> IntervalAnalysis:
+    return IntervalAnalysis(
+        completion_count=len(end_times),
+        last_end_time=_datetime(end_times[-1]),
+        mean_interval=datetime.timedelta(seconds=float(mean)),
+        interval_percentiles={
+            percentile: datetime.timedelta(seconds=float(value))
+            for percentile, value in zip(PERCENTILES, percentiles)
+        },
+        period=datetime.timedelta(seconds=float(period)),
+        regularity=max(0.0, 1 - float(deviation) / float(period)) if period else None,
+        predicted_next_time=_datetime(end_times[-1] + float(period)),
+    )
+
+
+def _summarize_numpy(end_times: "np.ndarray") -> IntervalAnalysis:
+    intervals = np.diff(end_times)
+    if len(intervals) < MIN_INTERVALS:
+        return _counted(end_times)
+    recent = intervals[-RECENT_INTERVALS:]
+    period = np.median(recent)
+    return _result(
+        end_times,
+        intervals.mean(),
+        np.percentile(intervals, PERCENTILES),
+        period,
+        np.median(np.abs(recent - period)),
+    )
+
+
+def _summarize_python(end_times: Sequence[float]) -> IntervalAnalysis:
+    intervals = [later - earlier for earlier, later in itertools.pairwise(end_times)]
+    if len(intervals) < MIN_INTERVALS:
+        return _counted(end_times)
+    recent = intervals[-RECENT_INTERVALS:]
+    period = _percentile(sorted(recent), 50)
+    ordered = sorted(intervals)
+    return _result(
+        end_times,
+        math.fsum(intervals) / len(intervals),
+        [_percentile(ordered, percentile) for percentile in PERCENTILES],
+        period,
+        _percentile(sorted(abs(interval - period) for interval in recent), 50),
+    )
+
+
+def _percentile(ordered: Sequence[float], percentile: float) -> float:
+    """Linear interpolation between closest ranks, as ``numpy.percentile``."""
+    position = (len(ordered) - 1) * percentile / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _datetime(timestamp: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
@@ -6,4 +6,5 @@ class DoAgainListConfig(AppConfig):
     verbose_name = "IncrementalList"
 
     def ready(self):
+        import do_again_list.metrics  # noqa: F401 – count queries on new connections
         import do_again_list.signals  # noqa: F401 – register signal handlers
@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from appconf import AppConf
+from django.conf import settings  # noqa: F401 – re-exported with app defaults applied
+
+
+class DoAgainListConf(AppConf):
+    # Cache alias (see ``CACHES``) holding each user's GameState.
+    GAME_STATE_CACHE = "default"
+    # Seconds a cached GameState may be served before it is re-read.
+    GAME_STATE_CACHE_TIMEOUT = 60 * 5
+    # Seconds the changes feed's cursor lags behind the time it was read,
+    # so rows stamped by a transaction that committed after the read are
+    # still delivered next time. Must exceed the longest write transaction.
+    CHANGES_OVERLAP = 60 * 5
+    # Reject duration fields that don't parse instead of reading them as zero.
+    STRICT_DURATIONS = False
+    # Encode and decode JSON with orjson when it's installed.
+    JSON_ACCELERATED = True
+    # Compute interval analytics with NumPy when it's installed.
+    ANALYTICS_ACCELERATED = True
+    # Ending an activity suggests when it's next due from its history
+    # (``analytics.predict_next_time``), as ``Activity.predicted_next_time``.
+    PREDICT_NEXT_TIME = True
+    # Dotted path of the class fanning change events out to event streams
+    # (see ``do_again_list.events``).
+    EVENT_BROKER = "do_again_list.events.InProcessBroker"
+    # Cache alias (see ``CACHES``) where ``PostgresBroker`` records which
+    # users have an event stream open; it must be shared by every process.
+    EVENT_PRESENCE_CACHE = "default"
+    # Events an event stream may fall behind by before it's told to resync.
+    EVENT_QUEUE_SIZE = 100
+    # Seconds between keepalive comments on an idle event stream.
+    EVENT_KEEPALIVE = 15
+    # JSON responses smaller than this many bytes aren't worth gzipping.
+    GZIP_MIN_LENGTH = 1024
+    # Directory holding background job uploads and results, shared by the
+    # web workers and ``run_jobs``.
+    JOB_DIR = os.path.join(tempfile.gettempdir(), "do_again_list_jobs")
+    # Finished jobs and their files are deleted after this many seconds.
+    JOB_RETENTION = 60 * 60 * 24 * 7
+    # A running job whose worker has sent no heartbeat for this many seconds
+    # is taken to have died with its worker, and is failed.
+    JOB_HEARTBEAT_TIMEOUT = 5 * 60
+    # Directory where each process writes its request metrics for the
+    # metrics endpoint to add up (see ``do_again_list.metrics``); None keeps
+    # them per process.
+    METRICS_DIR = os.path.join(tempfile.gettempdir(), "do_again_list_metrics")
+    # Seconds between writes of a process's metrics file.
+    METRICS_WRITE_INTERVAL = 5
+
+    class Meta:
+        prefix = "do_again_list"
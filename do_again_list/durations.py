@@ -0,0 +1,107 @@
+"""
+Human readable durations such as ``"1w2d5h30m"``.
+
+Units are ``y`` (365 days), ``mo`` (30 days), ``w``, ``d``, ``h``, ``m`` and
+``s``; each takes a whole or decimal number. Inputs are scanned once by a
+single precompiled tokenizer, and both directions are memoized, since the
+same handful of values are parsed and formatted for every activity.
+
+By default text that isn't a duration is ignored, so garbage parses as 0.
+With ``strict=True`` the whole string must be durations, each unit at most
+once, and anything else raises ``DurationParseError``.
+"""
+
+import datetime
+import functools
+import re
+
+UNIT_SECONDS = {
+    "y": 365 * 24 * 60 * 60,
+    "mo": 30 * 24 * 60 * 60,
+    "w": 7 * 24 * 60 * 60,
+    "d": 24 * 60 * 60,
+    "h": 60 * 60,
+    "m": 60,
+    "s": 1,
+}
+
+_LARGER_UNITS = [
+    (unit, seconds) for unit, seconds in UNIT_SECONDS.items() if unit != "s"
+]
+
+_TOKEN = r"(\d+\.?\d*|\.\d+)(mo|[ywdhms])"
+_TOKENIZER = re.compile(_TOKEN)
+_STRICT = re.compile(rf"\s*(?:{_TOKEN}\s*)*")
+
+CACHE_SIZE = 1024
+
+
+class DurationParseError(ValueError):
+    pass
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_ms(value: str, strict: bool = False) -> float:
+    """Parse ``value`` into milliseconds. Blank values are 0.
+
+    Leniently, the first amount given for each unit counts and anything
+    unrecognized is skipped.
+    """
+    if strict and not _STRICT.fullmatch(value):
+        raise DurationParseError(f"Not a duration: {value!r}")
+    total = 0.0
+    seen = set()
+    for amount, unit in _TOKENIZER.findall(value):
+        if unit in seen:
+            if strict:
+                raise DurationParseError(f"Unit {unit!r} given twice: {value!r}")
+            continue
+        seen.add(unit)
+        total += float(amount) * UNIT_SECONDS[unit] * 1000
+    return total
+
+
+def parse(value: str | int | float, strict: bool = False) -> datetime.timedelta | None:
+    """Parse a duration string, or a number of seconds, into a timedelta.
+
+    Zero durations are returned as ``None``.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise DurationParseError(f"Not a duration: {value!r}")
+    return _parse(value, strict)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE, typed=True)
+def _parse(value: str | int | float, strict: bool) -> datetime.timedelta | None:
+    milliseconds = parse_ms(value, strict) if isinstance(value, str) else value * 1000
+    if milliseconds == 0:
+        return None
+    return datetime.timedelta(milliseconds=milliseconds)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def humanize_seconds(seconds: float) -> str:
+    """Format a number of seconds, e.g. ``90061`` as ``"1d1h1m1s"``. Zero
+    is the empty string.
+
+    Negative durations are never valid input, but may be stored, so they
+    render as ``utils.humanize_timedelta`` always did: the time of day left
+    over past the negative days, ``-90`` as ``"23h58m30s"``.
+    """
+    if seconds < 0:
+        seconds %= UNIT_SECONDS["d"]
+    if isinstance(seconds, float) and seconds.is_integer():
+        seconds = int(seconds)
+    parts = []
+    for unit, unit_seconds in _LARGER_UNITS:
+        count, seconds = divmod(seconds, unit_seconds)
+        if count:
+            parts.append(f"{int(count)}{unit}")
+    if seconds:
+        parts.append(f"{seconds}s")
+    return "".join(parts)
+
+
+def humanize(duration: datetime.timedelta) -> str:
+    """Format a timedelta to whole seconds, e.g. ``"2w3d4h"``."""
+    return humanize_seconds(duration.days * 24 * 60 * 60 + duration.seconds)
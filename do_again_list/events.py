@@ -0,0 +1,321 @@
+"""
+Per-user change events, pushed to the client over server-sent events
+(``views.event_stream``) so open tabs and devices see each other's changes
+without re-polling the lists.
+
+Writers call ``activity_changed``, ``occurance_ended``, ``activity_deleted``,
+``game_state_changed`` or ``data_imported``; each publishes once the
+surrounding transaction commits, so a stream never shows a change that was
+rolled back, and only while the user has a stream open. Events are plain
+dicts with a ``type``; an activity's carries the fields that changed,
+rendered as the API lists them, or all of them but ``stats`` when it was
+created::
+
+    {"type": "activity", "id": 3, "fields": {"state": "active", ...}}
+    {"type": "occurance_ended", "id": 9, "activity": 3, "start_time": ...,
+     "end_time": ...}
+    {"type": "activity_deleted", "id": 3}
+    {"type": "game_state", "fields": {"gold": 40, "xp": 120}}
+    {"type": "resync"}  # events were dropped or too many to send; refetch
+
+The broker is ``DO_AGAIN_LIST_EVENT_BROKER``, by default
+``InProcessBroker``, which only reaches streams served by the same process.
+With more than one process (several gunicorn workers, or the ``run_jobs``
+worker publishing imports) use ``PostgresBroker``, which passes events
+between them through PostgreSQL's LISTEN/NOTIFY and tracks who is listening
+in the ``DO_AGAIN_LIST_EVENT_PRESENCE_CACHE``. Tests swap in a stand-in
+through the setting.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any, Protocol
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from do_again_list import jsonlib, models, serializers
+from do_again_list.conf import settings
+
+logger = logging.getLogger(__name__)
+
+Event = dict[str, Any]
+
+RESYNC: Event = {"type": "resync"}
+
+
+class Subscription:
+    """One open stream's queue of events, read on the event loop that
+    opened it and fed from any thread."""
+
+    def __init__(self, user_id: int, maxsize: int) -> None:
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize)
+
+    def push(self, event: Event) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # the loop has closed; the stream is gone
+            pass
+
+    def _put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # a reader this far behind has to refetch anyway
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout: float) -> Event | None:
+        """The next event, or None if there was none within ``timeout``
+        seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class Broker(Protocol):
+    def publish(self, user_id: int, event: Event) -> None: ...
+
+    def has_subscribers(self, user_id: int) -> bool: ...
+
+    def subscribe(self, user_id: int) -> Subscription: ...
+
+    def unsubscribe(self, subscription: Subscription) -> None: ...
+
+
+class InProcessBroker:
+    """Fans each user's events out to the streams open in this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: dict[int, set[Subscription]] = defaultdict(set)
+
+    def publish(self, user_id: int, event: Event) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.push(event)
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return bool(self._subscriptions.get(user_id))
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Must be called on the event loop that will read the events."""
+        subscription = Subscription(user_id, settings.DO_AGAIN_LIST_EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+
+class PostgresBroker(InProcessBroker):
+    """Shares events between processes through PostgreSQL: each is sent
+    with ``pg_notify``, and every process with streams open listens on a
+    connection of its own and fans what arrives out to them. Needs psycopg
+    3.2 and the ``default`` database on PostgreSQL.
+
+    Which users have a stream open anywhere is kept in a shared cache, each
+    process refreshing its own users', so nothing is serialized or sent for
+    users nobody is watching."""
+
+    channel = "do_again_list_events"
+    # PostgreSQL refuses notification payloads from 8000 bytes
+    max_payload = 7999
+    # seconds between refreshes of who is listening in this process; a
+    # process that died stops counting after three
+    presence_interval = 30
+    presence_prefix = "do_again_list:events:listening"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._listener: threading.Thread | None = None
+
+    def publish(self, user_id: int, event: Event) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [self.channel, self.payload(user_id, event)]
+            )
+
+    def payload(self, user_id: int, event: Event) -> str:
+        payload = jsonlib.dumps_text({"user": user_id, "event": event})
+        if len(payload.encode()) > self.max_payload:
+            # the stream has to refetch what's too big to send
+            return jsonlib.dumps_text({"user": user_id, "event": RESYNC})
+        return payload
+
+    @property
+    def presence(self):
+        return caches[settings.DO_AGAIN_LIST_EVENT_PRESENCE_CACHE]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        """Whether a stream is open for ``user_id`` in any process."""
+        return self.presence.get(f"{self.presence_prefix}:{user_id}") is not None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="do_again_list-events", daemon=True
+                )
+                self._listener.start()
+        subscription = super().subscribe(user_id)
+        self._mark_present([user_id])
+        return subscription
+
+    def _mark_present(self, user_ids: Iterable[int]) -> None:
+        self.presence.set_many(
+            {f"{self.presence_prefix}:{user_id}": True for user_id in user_ids},
+            timeout=self.presence_interval * 3,
+        )
+
+    def deliver(self, payload: str) -> None:
+        """Hand a notification's payload to this process's streams."""
+        message = jsonlib.loads(payload)
+        super().publish(message["user"], message["event"])
+
+    def _listen(self) -> None:
+        import psycopg
+
+        params = connection.get_connection_params()
+        reconnecting = False
+        while True:
+            try:
+                with psycopg.connect(**params, autocommit=True) as listener:
+                    listener.execute(f"LISTEN {self.channel}")
+                    if reconnecting:
+                        # anything sent while disconnected is lost
+                        self._resync_all()
+                    reconnecting = True
+                    while True:
+                        for notify in listener.notifies(timeout=self.presence_interval):
+                            self.deliver(notify.payload)
+                        with self._lock:
+                            user_ids = list(self._subscriptions)
+                        self._mark_present(user_ids)
+            except psycopg.Error:
+                logger.warning("Event listener disconnected", exc_info=True)
+                reconnecting = True
+                time.sleep(1)
+
+    def _resync_all(self) -> None:
+        with self._lock:
+            subscriptions = [
+                subscription
+                for user_subscriptions in self._subscriptions.values()
+                for subscription in user_subscriptions
+            ]
+        for subscription in subscriptions:
+            subscription.push(RESYNC)
+
+
+_brokers: dict[str, Broker] = {}
+
+
+def get_broker() -> Broker:
+    path = settings.DO_AGAIN_LIST_EVENT_BROKER
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
+
+
+@receiver(setting_changed)
+def _reset_brokers(*, setting: str, **kwargs) -> None:
+    if setting == "DO_AGAIN_LIST_EVENT_BROKER":
+        _brokers.clear()
+
+
+def publish_on_commit(user_id: int, event: Event) -> None:
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
+
+
+# what an activity event carries for a new activity; the stats are
+# refetched with the list
+ACTIVITY_FIELDS = tuple(
+    name for name in serializers.ActivitySerializer.Meta.fields if name != "stats"
+)
+
+
+def activity_changed(
+    activity: models.Activity, fields: Iterable[str] = ACTIVITY_FIELDS
+) -> None:
+    """Publish the ``fields`` of ``activity`` that changed, by their API
+    names and rendered as the API renders them, if somebody is listening."""
+    if not get_broker().has_subscribers(activity.owner_id):
+        return
+    serializer_fields = serializers.ActivitySerializer(activity).fields
+    values = {}
+    for name in fields:
+        field = serializer_fields[name]
+        attribute = field.get_attribute(activity)
+        values[name] = None if attribute is None else field.to_representation(attribute)
+    publish_on_commit(
+        activity.owner_id, {"type": "activity", "id": activity.pk, "fields": values}
+    )
+
+
+def activity_deleted(*, owner_id: int, activity_id: int) -> None:
+    publish_on_commit(owner_id, {"type": "activity_deleted", "id": activity_id})
+
+
+def occurance_ended(occurance: models.Occurance, *, owner_id: int) -> None:
+    publish_on_commit(
+        owner_id,
+        {
+            "type": "occurance_ended",
+            "id": occurance.pk,
+            "activity": occurance.activity_id,
+            "start_time": occurance.start_time,
+            "end_time": occurance.end_time,
+        },
+    )
+
+
+def game_state_changed(owner_id: int, values: dict[str, Any]) -> None:
+    """Publish the new ``values`` of the changed game state fields. Values
+    that are expressions (``F("gold") + 5``) are read back after the commit,
+    and only if somebody is listening."""
+    pending = [
+        name for name, value in values.items() if hasattr(value, "resolve_expression")
+    ]
+
+    def publish() -> None:
+        broker = get_broker()
+        fields = dict(values)
+        if pending:
+            if not broker.has_subscribers(owner_id):
+                return
+            current = (
+                models.GameState.objects.filter(owner_id=owner_id)
+                .values(*pending)
+                .first()
+            )
+            if current is None:
+                return
+            fields.update(current)
+        broker.publish(owner_id, {"type": "game_state", "fields": fields})
+
+    transaction.on_commit(publish)
+
+
+def data_imported(owner_id: int) -> None:
+    """An import changes too much to send as deltas; have the streams
+    refetch."""
+    publish_on_commit(owner_id, RESYNC)
@@ -0,0 +1,235 @@
+"""
+Background jobs for data imports and exports.
+
+The API enqueues a ``Job`` (writing any upload under ``DO_AGAIN_LIST_JOB_DIR``)
+and ``manage.py run_jobs`` claims and runs it. While a job runs, its
+progress is written to a file beside its data rather than to the database,
+because an import holds a single transaction open until it finishes
+(see ``Job.current_progress``). The file is also rewritten every
+``_HEARTBEAT_INTERVAL`` seconds as a heartbeat, so a job whose worker died
+can be told from a slow one and failed (see ``fail_abandoned``).
+"""
+
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import IO
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import APIException, ParseError
+
+from do_again_list import jsonlib, ndjson, parsers, services
+from do_again_list.conf import settings
+from do_again_list.models import Activity, Job
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MEDIA_TYPES = ("application/json", ndjson.MEDIA_TYPE)
+EXPORT_FILENAMES = {1: "export.json", 2: "export.ndjson.gz"}
+
+_UPLOAD_FILENAME = "upload"
+# Seconds between progress file writes
+_PROGRESS_INTERVAL = 1.0
+# Seconds between progress file writes when the progress doesn't change
+_HEARTBEAT_INTERVAL = 30.0
+
+
+def export_path(job: Job) -> Path:
+    return job.directory / EXPORT_FILENAMES[job.params["version"]]
+
+
+def enqueue_export(owner, version: int) -> Job:
+    return Job.objects.create(
+        owner=owner, kind=Job.Kind.EXPORT, params={"version": version}
+    )
+
+
+def enqueue_import(owner, upload: IO[bytes], media_type: str) -> Job:
+    """Queue an import of ``upload``, which is copied to disk first."""
+    with transaction.atomic():
+        job = Job.objects.create(
+            owner=owner, kind=Job.Kind.IMPORT, params={"media_type": media_type}
+        )
+        directory = job.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(directory / _UPLOAD_FILENAME, "wb") as file:
+                shutil.copyfileobj(upload, file)
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+    return job
+
+
+def claim_next() -> Job | None:
+    """Mark the oldest queued job as running and return it.
+
+    The claim is a conditional update, so two workers never run one job.
+    """
+    queued = Job.objects.filter(status=Job.Status.QUEUED).order_by("created_at")
+    for job_id in queued.values_list("pk", flat=True)[:10]:
+        claimed = Job.objects.filter(pk=job_id, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+class _Progress:
+    def __init__(self, job: Job):
+        self.path = job.directory / Job.PROGRESS_FILENAME
+        self.value = 0
+        self._written_at = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def __call__(self, value: int) -> None:
+        self.value = value
+        if time.monotonic() - self._written_at >= _PROGRESS_INTERVAL:
+            self.write()
+
+    def write(self) -> None:
+        with self._lock:
+            self._written_at = time.monotonic()
+            # replaced atomically so readers never see a partial write
+            temporary = self.path.with_suffix(".tmp")
+            temporary.write_text(str(self.value))
+            os.replace(temporary, self.path)
+
+    def beat(self) -> None:
+        """Rewrite the file every ``_HEARTBEAT_INTERVAL`` seconds until
+        ``stop``; run in a thread, as the job may not report progress for
+        a long time."""
+        while not self._stopped.wait(_HEARTBEAT_INTERVAL):
+            try:
+                self.write()
+            except OSError:
+                logger.warning("Couldn't write the heartbeat of %s", self.path)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def run(job: Job) -> Job:
+    """Run a claimed job to completion, recording its outcome on the row."""
+    job.directory.mkdir(parents=True, exist_ok=True)
+    progress = _Progress(job)
+    progress.write()
+    heartbeat = threading.Thread(target=progress.beat, daemon=True)
+    heartbeat.start()
+    try:
+        if job.kind == Job.Kind.EXPORT:
+            job.result = _run_export(job, progress)
+        else:
+            job.result = _run_import(job, progress)
+    except APIException as exc:
+        job.status = Job.Status.FAILED
+        job.error = json.dumps(exc.detail)
+    except Exception:
+        logger.exception("Job %s failed", job.pk)
+        job.status = Job.Status.FAILED
+        job.error = "Internal error"
+    else:
+        job.status = Job.Status.SUCCEEDED
+    finally:
+        progress.stop()
+        heartbeat.join()
+    job.progress = progress.value
+    job.finished_at = timezone.now()
+    job.save()
+    (job.directory / Job.PROGRESS_FILENAME).unlink(missing_ok=True)
+    return job
+
+
+def _run_export(job: Job, progress: _Progress) -> dict:
+    service = services.DataImportExportService()
+    job.total = Activity.objects.filter(owner=job.owner).count()
+    job.save(update_fields=["total"])
+    if job.params["version"] == ndjson.VERSION:
+        chunks = service.iter_export_ndjson(job.owner, on_progress=progress)
+    else:
+        chunks = (
+            chunk.encode()
+            for chunk in service.iter_export(job.owner, on_progress=progress)
+        )
+    path = export_path(job)
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "wb") as file:
+        for chunk in chunks:
+            file.write(chunk)
+    os.replace(temporary, path)
+    return {"size": path.stat().st_size}
+
+
+def _run_import(job: Job, progress: _Progress) -> dict:
+    path = job.directory / _UPLOAD_FILENAME
+    try:
+        with open(path, "rb") as file:
+            if job.params["media_type"] == ndjson.MEDIA_TYPE:
+                upload = parsers.NDJSONImportParser().parse(file)
+            else:
+                try:
+                    upload = jsonlib.loads(file.read())
+                except ValueError as exc:
+                    raise ParseError(f"JSON parse error - {exc}") from exc
+                if isinstance(upload, dict) and isinstance(
+                    upload.get("activities"), list
+                ):
+                    job.total = len(upload["activities"])
+                    job.save(update_fields=["total"])
+            result = services.DataImportExportService().import_upload(
+                owner=job.owner, upload=upload, on_progress=progress
+            )
+    finally:
+        path.unlink(missing_ok=True)
+    return vars(result)
+
+
+def fail_abandoned() -> int:
+    """Fail running jobs with no heartbeat for
+    ``DO_AGAIN_LIST_JOB_HEARTBEAT_TIMEOUT`` seconds, whose worker died
+    before it could record their outcome. Returns how many were failed.
+
+    They aren't queued again: a job that killed its worker would keep
+    killing the next one. An interrupted import rolled back, so running it
+    again is up to the user.
+    """
+    now = timezone.now()
+    cutoff = now - datetime.timedelta(
+        seconds=settings.DO_AGAIN_LIST_JOB_HEARTBEAT_TIMEOUT
+    )
+    failed = 0
+    for job in Job.objects.filter(status=Job.Status.RUNNING, started_at__lt=cutoff):
+        try:
+            beat_at = (job.directory / Job.PROGRESS_FILENAME).stat().st_mtime
+        except OSError:
+            beat_at = None
+        if beat_at is not None and beat_at >= cutoff.timestamp():
+            continue
+        # conditional, in case the job finished meanwhile
+        failed += Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING).update(
+            status=Job.Status.FAILED,
+            error="The worker running this job stopped.",
+            finished_at=now,
+        )
+    return failed
+
+
+def purge_expired() -> int:
+    """Delete jobs that finished more than ``DO_AGAIN_LIST_JOB_RETENTION``
+    seconds ago, along with their files."""
+    cutoff = timezone.now() - datetime.timedelta(
+        seconds=settings.DO_AGAIN_LIST_JOB_RETENTION
+    )
+    expired = list(Job.objects.filter(finished_at__lt=cutoff))
+    for job in expired:
+        shutil.rmtree(job.directory, ignore_errors=True)
+    Job.objects.filter(pk__in=[job.pk for job in expired]).delete()
+    return len(expired)
@@ -0,0 +1,53 @@
+"""
+JSON encoding and decoding for the API, using orjson when it is installed
+(``pip install do-again-list[fast]``) and the standard library otherwise.
+
+Both backends produce compact UTF-8 with datetimes in DRF's format (``Z``
+for UTC); anything else neither encodes natively, such as timedeltas and
+Decimals, goes through DRF's ``JSONEncoder``, so the output is the same
+whichever is in use. ``DO_AGAIN_LIST_JSON_ACCELERATED = False`` forces the
+standard library.
+"""
+
+import json
+from typing import Any
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from do_again_list.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+_default = JSONEncoder().default
+
+
+def accelerated() -> bool:
+    """Whether orjson is installed and enabled."""
+    return orjson is not None and settings.DO_AGAIN_LIST_JSON_ACCELERATED
+
+
+def dumps(value: Any) -> bytes:
+    """Encode ``value`` as compact JSON.
+
+    Raises ``TypeError`` for values that can't be encoded.
+    """
+    if accelerated():
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        value, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def dumps_text(value: Any) -> str:
+    return dumps(value).decode()
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a JSON document. Raises ``ValueError`` if it's malformed."""
+    if accelerated():
+        return orjson.loads(data)
+    return json.loads(data)
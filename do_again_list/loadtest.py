@@ -0,0 +1,260 @@
+"""
+A load test that drives the API the way the frontend does, used by the
+``loadtest`` management command.
+
+Each synthetic user registers, logs out and back in, loads the game state
+and activity list, then creates, starts and ends activities, syncing the
+battle after each, ends the run and downloads the export. Users run in a
+thread pool, either in-process through Django's test client
+(``ClientSession``, which also counts each request's queries) or against a
+running server (``HTTPSession``). Paths come from ``reverse``, so the app
+can be mounted anywhere.
+"""
+
+import dataclasses
+import http.cookiejar
+import json
+import math
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Protocol
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+PASSWORD = "loadtest"
+
+
+@dataclasses.dataclass(frozen=True)
+class Sample:
+    endpoint: str
+    status: int
+    seconds: float
+    # None when the server is out of process
+    queries: int | None
+
+
+@dataclasses.dataclass(frozen=True)
+class EndpointSummary:
+    endpoint: str
+    requests: int
+    errors: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+    queries: float | None
+
+
+class Session(Protocol):
+    def send(
+        self, method: str, path: str, body: dict | None = None
+    ) -> tuple[int, bytes, int | None]:
+        """Make one request as this session's user; returns the status, the
+        body and the number of queries it made, if known."""
+        ...
+
+
+class ClientSession:
+    """Requests through Django's test client in this process."""
+
+    def __init__(self) -> None:
+        # a server error is a 500 to report, not an exception
+        self.client = Client(raise_request_exception=False)
+
+    def send(
+        self, method: str, path: str, body: dict | None = None
+    ) -> tuple[int, bytes, int | None]:
+        with CaptureQueriesContext(connection) as queries:
+            if method == "GET":
+                response = self.client.get(path)
+            else:
+                response = self.client.generic(
+                    method, path, json.dumps(body or {}), "application/json"
+                )
+            # a streamed body is only produced, and queried for, as it's read
+            content = (
+                b"".join(response.streaming_content)
+                if response.streaming
+                else response.content
+            )
+        return response.status_code, content, len(queries)
+
+
+class HTTPSession:
+    """Requests to a server at ``base_url``, with its own cookies."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies)
+        )
+
+    def send(
+        self, method: str, path: str, body: dict | None = None
+    ) -> tuple[int, bytes, int | None]:
+        headers = {"Content-Type": "application/json", "Referer": f"{self.base_url}/"}
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                headers["X-CSRFToken"] = cookie.value or ""
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=None if method == "GET" else json.dumps(body or {}).encode(),
+            headers=headers,
+            method=method,
+        )
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return response.status, response.read(), None
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read(), None
+        except OSError:
+            # refused, reset or timed out
+            return 0, b"", None
+
+
+class VirtualUser:
+    def __init__(
+        self, session: Session, username: str, record: Callable[[Sample], None]
+    ):
+        self.session = session
+        self.username = username
+        self.record = record
+
+    def call(
+        self, endpoint: str, method: str, path: str, body: dict | None = None
+    ) -> Any:
+        """Make a request, record it, and return its JSON body, or None if
+        it failed."""
+        start = time.perf_counter()
+        status, content, queries = self.session.send(method, path, body)
+        self.record(Sample(endpoint, status, time.perf_counter() - start, queries))
+        if not 200 <= status < 300:
+            return None
+        try:
+            return json.loads(content)
+        except ValueError:
+            return None
+
+    def run(self, iterations: int) -> None:
+        credentials = {"username": self.username, "password": PASSWORD}
+        # the first request sets the CSRF cookie, as the page load does
+        self.call("auth-user", "GET", reverse("do_again:do_again_api_auth_user"))
+        self.call(
+            "register",
+            "POST",
+            reverse("do_again:do_again_api_auth_register"),
+            credentials,
+        )
+        self.call("logout", "POST", reverse("do_again:do_again_api_auth_logout"))
+        self.call(
+            "login", "POST", reverse("do_again:do_again_api_auth_login"), credentials
+        )
+        self.call("game", "GET", reverse("gamestate-list"))
+        self.call("activities", "GET", reverse("activity-list"))
+        for iteration in range(iterations):
+            created = self.call(
+                "activity-create",
+                "POST",
+                reverse("activity-list"),
+                {"title": f"load test {iteration}", "repeats": True},
+            )
+            if created is None:
+                continue
+            pk = created["resource_ref"]["pk"]
+            # the client always sends the times the user picked
+            start_time = timezone.now().isoformat()
+            self.call(
+                "activity-start",
+                "POST",
+                reverse("activity-start", args=[pk]),
+                {"start_time": start_time},
+            )
+            self.call(
+                "activity-end",
+                "POST",
+                reverse("activity-end", args=[pk]),
+                {
+                    "start_time": start_time,
+                    "end_time": timezone.now().isoformat(),
+                    "kill_streak": iteration,
+                },
+            )
+            self.call(
+                "game-sync",
+                "POST",
+                reverse("gamestate-sync"),
+                {"gold": 5, "xp": 10, "streak": iteration + 1, "hero_hp": 10},
+            )
+        self.call("run-over", "POST", reverse("gamestate-run-over"))
+        self.call("export", "GET", reverse("data-export-data"))
+
+
+def run(
+    new_session: Callable[[], Session],
+    *,
+    users: int,
+    iterations: int,
+    concurrency: int,
+) -> tuple[list[Sample], float]:
+    """Run ``users`` virtual users, ``concurrency`` at a time; returns every
+    request's sample and the seconds the whole run took."""
+    samples: list[Sample] = []
+    lock = threading.Lock()
+    # unique names, so a run against a server can repeat
+    prefix = f"loadtest-{secrets.token_hex(4)}"
+
+    def record(sample: Sample) -> None:
+        with lock:
+            samples.append(sample)
+
+    def drive(index: int) -> None:
+        try:
+            VirtualUser(new_session(), f"{prefix}-{index}", record).run(iterations)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(drive, range(users)))
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples: Sequence[Sample], elapsed: float) -> list[EndpointSummary]:
+    """Per-endpoint figures, in the order the endpoints were first hit."""
+    by_endpoint: dict[str, list[Sample]] = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample.endpoint, []).append(sample)
+    summaries = []
+    for endpoint, endpoint_samples in by_endpoint.items():
+        latencies = sorted(sample.seconds * 1000 for sample in endpoint_samples)
+        queries = [s.queries for s in endpoint_samples if s.queries is not None]
+        summaries.append(
+            EndpointSummary(
+                endpoint=endpoint,
+                requests=len(endpoint_samples),
+                errors=sum(not 200 <= s.status < 300 for s in endpoint_samples),
+                throughput=len(endpoint_samples) / elapsed,
+                p50=percentile(latencies, 50),
+                p95=percentile(latencies, 95),
+                p99=percentile(latencies, 99),
+                queries=sum(queries) / len(queries) if queries else None,
+            )
+        )
+    return summaries
+
+
+def percentile(ordered: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of ascending values."""
+    rank = max(1, math.ceil(len(ordered) * percent / 100))
+    return ordered[rank - 1]
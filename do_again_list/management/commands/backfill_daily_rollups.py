@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from do_again_list.models import Activity, DailyRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the per-day completion counts and durations (DailyRollup) "
+        "behind the heatmap from each activity's completed occurances."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            help="Only rebuild rollups for activities owned by this user.",
+        )
+
+    def handle(self, *args, **options):
+        activities = Activity.objects.all()
+        if options["username"]:
+            owner = get_user_model().objects.get(username=options["username"])
+            activities = activities.filter(owner=owner)
+
+        activities.refresh_daily_rollups()
+        count = DailyRollup.objects.filter(activity__in=activities).count()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} daily rollups."))
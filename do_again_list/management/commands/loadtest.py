@@ -0,0 +1,142 @@
+import contextlib
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from do_again_list import loadtest
+
+
+@contextlib.contextmanager
+def _test_database():
+    """A throwaway database, created the way the test suite creates one."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if connection.vendor == "sqlite":
+            # a file rather than shared-cache memory, so threads can share it
+            test_settings = connection.settings_dict["TEST"]
+            test_settings["NAME"] = str(Path(tmp_dir) / "loadtest.sqlite3")
+            # take the write lock up front, so concurrent transactions wait
+            # for each other rather than fail on upgrading a read lock
+            connection.settings_dict["OPTIONS"] = {
+                **connection.settings_dict["OPTIONS"],
+                "transaction_mode": "IMMEDIATE",
+            }
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the API with synthetic users following the frontend's flow "
+        "(register and log in, create, start and end activities, sync the "
+        "battle, end the run, export) and report throughput, latency "
+        "percentiles and queries per request for each endpoint. Runs "
+        "in-process against a throwaway database unless --url is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=5,
+            help="Activities each user creates, starts and ends.",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=8, help="Users running at once."
+        )
+        parser.add_argument(
+            "--url",
+            help=(
+                "Load a running server at this base URL (e.g. "
+                "http://127.0.0.1:8000) instead. Its users are left in its "
+                "database, and queries aren't counted."
+            ),
+        )
+        parser.add_argument(
+            "--max-p95",
+            type=float,
+            help="Fail if any endpoint's p95 latency exceeds this many milliseconds.",
+        )
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            url = options["url"]
+            samples, elapsed = self._run(lambda: loadtest.HTTPSession(url), options)
+        else:
+            with _test_database():
+                samples, elapsed = self._run(loadtest.ClientSession, options)
+
+        summaries = loadtest.summarize(samples, elapsed)
+        self._report(summaries)
+        self.stdout.write(
+            f"\n{len(samples)} requests in {elapsed:.1f}s "
+            f"({len(samples) / elapsed:,.1f} req/s) from {options['users']} users."
+        )
+
+        failures = [
+            f"{summary.endpoint}: {summary.errors} failed requests"
+            for summary in summaries
+            if summary.errors
+        ]
+        if options["max_p95"] is not None:
+            failures += [
+                f"{summary.endpoint}: p95 {summary.p95:,.0f} ms"
+                for summary in summaries
+                if summary.p95 > options["max_p95"]
+            ]
+        if failures:
+            raise CommandError("Load test failed:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Load test passed."))
+
+    def _run(self, new_session, options):
+        return loadtest.run(
+            new_session,
+            users=options["users"],
+            iterations=options["iterations"],
+            concurrency=options["concurrency"],
+        )
+
+    def _report(self, summaries):
+        headers = (
+            "endpoint",
+            "requests",
+            "errors",
+            "req/s",
+            "p50",
+            "p95",
+            "p99",
+            "queries",
+        )
+        rows = [
+            (
+                summary.endpoint,
+                summary.requests,
+                summary.errors,
+                f"{summary.throughput:,.1f}",
+                f"{summary.p50:,.1f} ms",
+                f"{summary.p95:,.1f} ms",
+                f"{summary.p99:,.1f} ms",
+                "-" if summary.queries is None else f"{summary.queries:.1f}",
+            )
+            for summary in summaries
+        ]
+        widths = [
+            max(len(str(value)) for value in column) for column in zip(headers, *rows)
+        ]
+        for row in (headers, *rows):
+            self.stdout.write(
+                "  ".join(str(value).ljust(width) for value, width in zip(row, widths))
+            )
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from do_again_list.models import Activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized occurance summary (state, current start/end "
+        "time, last completed end time) stored on each Activity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            help="Only refresh activities owned by this user.",
+        )
+
+    def handle(self, *args, **options):
+        activities = Activity.objects.all()
+        if options["username"]:
+            owner = get_user_model().objects.get(username=options["username"])
+            activities = activities.filter(owner=owner)
+
+        count = 0
+        for activity in activities.iterator():
+            activity.refresh_occurance_summary()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {count} activities."))
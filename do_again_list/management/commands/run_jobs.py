@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from do_again_list import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (data imports and exports). Keeps polling "
+        "for new jobs until stopped, unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as the queue is empty.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait before checking an empty queue again.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                job = jobs.claim_next()
+                if job is not None:
+                    job = jobs.run(job)
+                    self.stdout.write(f"Job {job.pk} ({job.kind}): {job.status}")
+                    continue
+                abandoned = jobs.fail_abandoned()
+                if abandoned:
+                    self.stdout.write(f"Failed {abandoned} abandoned jobs.")
+                purged = jobs.purge_expired()
+                if purged:
+                    self.stdout.write(f"Purged {purged} expired jobs.")
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,397 @@
+"""
+Per-route request metrics, recorded by ``middleware.RequestMetricsMiddleware``
+and served to staff in the Prometheus text format by ``views.MetricsViewSet``.
+
+Each request is counted under its route (the URL name, such as
+``activity-end``), method and status, and its latency, DB query count, DB
+time and response size (as sent, so after ``JSONGZipMiddleware``) go into
+histograms with fixed buckets. Queries are counted through an execute
+wrapper on every connection, so those an async view makes from
+``sync_to_async`` threads count too. A streamed response is
+measured up to its headers: its body, and any queries made producing it,
+are not.
+
+Each process keeps its own counts in memory and writes them to its own
+file under ``DO_AGAIN_LIST_METRICS_DIR`` at most every
+``DO_AGAIN_LIST_METRICS_WRITE_INTERVAL`` seconds; the endpoint adds up
+every file, so the figures cover all gunicorn workers. The file name
+carries a random suffix besides the pid, so a recycled pid starts a new
+file rather than replacing a dead worker's counts. On exit a process adds
+its counts to ``exited.json`` and removes its file, and the endpoint does
+the same for the files of processes that died without doing so (POSIX
+only), so counters never go backwards and the directory doesn't grow with
+every worker ever started.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import dataclasses
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from pathlib import Path
+
+from django.core.files import locks
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from do_again_list.conf import settings
+
+logger = logging.getLogger(__name__)
+
+Labels = tuple[str, ...]
+
+HISTOGRAM_LABELS = ("route", "method")
+REQUEST_LABELS = ("route", "method", "status")
+REQUESTS = "do_again_list_requests_total"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# the counts of processes that have exited, see ``Store.retire``
+ARCHIVE = "exited.json"
+PROCESS_FILE = re.compile(r"(\d+)-[0-9a-f]+\.json")
+
+
+@dataclasses.dataclass(frozen=True)
+class Histogram:
+    name: str
+    help: str
+    buckets: tuple[float, ...]
+
+
+DURATION = Histogram(
+    "do_again_list_request_duration_seconds",
+    "Time to respond to a request, up to its headers.",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    "do_again_list_request_db_queries",
+    "Database queries made by a request.",
+    (0, 1, 2, 5, 10, 20, 50, 100),
+)
+DB_DURATION = Histogram(
+    "do_again_list_request_db_duration_seconds",
+    "Time a request spent in database queries.",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+RESPONSE_SIZE = Histogram(
+    "do_again_list_response_size_bytes",
+    "Size of a response body as sent, gzipped or not; streamed bodies aren't counted.",
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+HISTOGRAMS = (DURATION, DB_QUERIES, DB_DURATION, RESPONSE_SIZE)
+
+
+@dataclasses.dataclass
+class Usage:
+    """The database use of the request being handled."""
+
+    queries: int = 0
+    seconds: float = 0.0
+
+
+_usage: contextvars.ContextVar[Usage | None] = contextvars.ContextVar(
+    "do_again_list_metrics_usage", default=None
+)
+
+
+@contextlib.contextmanager
+def measure() -> Iterator[Usage]:
+    """Count the queries made in this context, including from threads it
+    hands work to with ``sync_to_async``."""
+    usage = Usage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def _count_query(execute, sql, params, many, context):
+    usage = _usage.get()
+    if usage is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        usage.queries += 1
+        usage.seconds += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def _install_query_counter(*, connection, **kwargs) -> None:
+    # the same wrapper object reconnects, so install once
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class Store:
+    """One process's counts. Histograms are kept as the count in each
+    bucket (the last one being ``+Inf``) followed by the sum."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.histograms: dict[str, dict[Labels, list[float]]] = {
+            histogram.name: {} for histogram in HISTOGRAMS
+        }
+        self.requests: dict[Labels, int] = {}
+        self.written_at = 0.0
+        self._file: tuple[int, str] | None = None
+
+    @property
+    def filename(self) -> str:
+        """This process's file, named afresh in a forked child."""
+        pid = os.getpid()
+        if self._file is None or self._file[0] != pid:
+            self._file = (pid, f"{pid}-{uuid.uuid4().hex[:12]}.json")
+        return self._file[1]
+
+    def observe(
+        self,
+        *,
+        route: str,
+        method: str,
+        status: int,
+        duration: float,
+        usage: Usage,
+        size: int | None,
+    ) -> None:
+        labels = (route, method)
+        with self.lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self._observe(DURATION, labels, duration)
+            self._observe(DB_QUERIES, labels, usage.queries)
+            self._observe(DB_DURATION, labels, usage.seconds)
+            if size is not None:
+                self._observe(RESPONSE_SIZE, labels, size)
+
+    def _observe(self, histogram: Histogram, labels: Labels, value: float) -> None:
+        series = self.histograms[histogram.name].get(labels)
+        if series is None:
+            series = self.histograms[histogram.name][labels] = [0] * (
+                len(histogram.buckets) + 2
+            )
+        bucket = next(
+            (i for i, bound in enumerate(histogram.buckets) if value <= bound),
+            len(histogram.buckets),
+        )
+        series[bucket] += 1
+        series[-1] += value
+
+    def snapshot(self) -> dict:
+        """The counts as a JSON document."""
+        with self.lock:
+            return _snapshot(self.histograms, self.requests)
+
+    def write(self, directory: str) -> None:
+        """Replace this process's file in ``directory`` with its counts."""
+        path = Path(directory)
+        # rename over the old file, so readers never see half of one
+        partial = path / f"{os.getpid()}-{threading.get_ident()}.json.tmp"
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            partial.write_text(json.dumps(self.snapshot()))
+            partial.replace(path / self.filename)
+        except OSError:
+            logger.warning("Couldn't write request metrics to %s", path, exc_info=True)
+
+    def retire(self, directory: str) -> None:
+        """Add this process's counts to the archive in ``directory`` and
+        remove its file, as it exits."""
+        path = Path(directory)
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            with _locked(path):
+                _archive(path, [self.snapshot()])
+                (path / self.filename).unlink(missing_ok=True)
+        except OSError:
+            logger.warning("Couldn't write request metrics to %s", path, exc_info=True)
+
+    def write_if_due(self) -> None:
+        directory = settings.DO_AGAIN_LIST_METRICS_DIR
+        if not directory:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now - self.written_at < settings.DO_AGAIN_LIST_METRICS_WRITE_INTERVAL:
+                return
+            self.written_at = now
+        self.write(directory)
+
+
+store = Store()
+
+
+@atexit.register
+def _retire_on_exit() -> None:
+    if settings.DO_AGAIN_LIST_METRICS_DIR and store.requests:
+        store.retire(settings.DO_AGAIN_LIST_METRICS_DIR)
+
+
+def collect() -> dict:
+    """Every process's counts added up: this one's as they are now, the
+    others' as last written and the exited ones' from the archive."""
+    snapshots = [store.snapshot()]
+    directory = settings.DO_AGAIN_LIST_METRICS_DIR
+    if directory and Path(directory).is_dir():
+        path = Path(directory)
+        # so no exiting process is counted both in its file and the archive
+        with _locked(path):
+            _archive_dead(path)
+            for file in path.glob("*.json"):
+                if file.name == store.filename:
+                    continue
+                snapshot = _read(file)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+    return merge(snapshots)
+
+
+@contextlib.contextmanager
+def _locked(directory: Path) -> Iterator[None]:
+    """Hold the lock on ``directory``'s archive."""
+    with open(directory / f"{ARCHIVE}.lock", "a") as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        try:
+            yield
+        finally:
+            locks.unlock(lock)
+
+
+def _archive(directory: Path, snapshots: list[dict]) -> None:
+    """Add ``snapshots`` to the archive; the caller holds the lock."""
+    archived = _read(directory / ARCHIVE)
+    if archived is not None:
+        snapshots = [archived, *snapshots]
+    collected = merge(snapshots)
+    partial = directory / f"{ARCHIVE}.{os.getpid()}.tmp"
+    partial.write_text(
+        json.dumps(_snapshot(collected["histograms"], collected["requests"]))
+    )
+    partial.replace(directory / ARCHIVE)
+
+
+def _archive_dead(directory: Path) -> None:
+    """Archive the files of processes that died without retiring, killed by
+    a signal say; the caller holds the lock."""
+    dead = [
+        file
+        for file in directory.glob("*.json")
+        if (match := PROCESS_FILE.fullmatch(file.name))
+        and not _alive(int(match.group(1)))
+    ]
+    if not dead:
+        return
+    _archive(directory, [s for s in map(_read, dead) if s is not None])
+    for file in dead:
+        file.unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    if os.name != "posix":
+        # signal 0 only probes on POSIX; elsewhere the files are kept
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read(file: Path) -> dict | None:
+    try:
+        return json.loads(file.read_text())
+    except (OSError, ValueError):
+        # removed or being replaced meanwhile
+        return None
+
+
+def _snapshot(
+    histograms: dict[str, dict[Labels, list[float]]], requests: dict[Labels, int]
+) -> dict:
+    return {
+        "histograms": {
+            name: [[list(labels), list(series)] for labels, series in by_labels.items()]
+            for name, by_labels in histograms.items()
+        },
+        "requests": [[list(labels), count] for labels, count in requests.items()],
+    }
+
+
+def merge(snapshots: list[dict]) -> dict:
+    """Add up ``Store.snapshot`` documents."""
+    histograms: dict[str, dict[Labels, list[float]]] = {h.name: {} for h in HISTOGRAMS}
+    requests: dict[Labels, int] = {}
+    for snapshot in snapshots:
+        for name, entries in snapshot["histograms"].items():
+            by_labels = histograms.setdefault(name, {})
+            for labels, series in entries:
+                total = by_labels.get(tuple(labels))
+                by_labels[tuple(labels)] = (
+                    list(series)
+                    if total is None
+                    else [a + b for a, b in zip(total, series)]
+                )
+        for labels, count in snapshot["requests"]:
+            requests[tuple(labels)] = requests.get(tuple(labels), 0) + count
+    return {"histograms": histograms, "requests": requests}
+
+
+def render(collected: dict) -> str:
+    """``collected`` in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {REQUESTS} Requests handled, by route, method and status.",
+        f"# TYPE {REQUESTS} counter",
+    ]
+    for labels, count in sorted(collected["requests"].items()):
+        lines.append(f"{REQUESTS}{_labels(REQUEST_LABELS, labels)} {count}")
+    for histogram in HISTOGRAMS:
+        lines += [
+            f"# HELP {histogram.name} {histogram.help}",
+            f"# TYPE {histogram.name} histogram",
+        ]
+        for labels, series in sorted(collected["histograms"][histogram.name].items()):
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, math.inf), series):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _number(bound)
+                lines.append(
+                    f"{histogram.name}_bucket"
+                    f"{_labels((*HISTOGRAM_LABELS, 'le'), (*labels, le))} {cumulative}"
+                )
+            lines += [
+                f"{histogram.name}_sum{_labels(HISTOGRAM_LABELS, labels)} "
+                f"{_number(series[-1])}",
+                f"{histogram.name}_count{_labels(HISTOGRAM_LABELS, labels)} {cumulative}",
+            ]
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(duration: float, usage: Usage) -> str:
+    """The ``Server-Timing`` header value for a request."""
+    return (
+        f'db;dur={usage.seconds * 1000:.1f};desc="{usage.queries} queries", '
+        f"total;dur={duration * 1000:.1f}"
+    )
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
@@ -0,0 +1,71 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.middleware.gzip import GZipMiddleware
+
+from do_again_list import metrics
+from do_again_list.conf import settings
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """Gzip JSON responses larger than ``DO_AGAIN_LIST_GZIP_MIN_LENGTH`` bytes.
+
+    Limited to JSON so HTML pages carrying CSRF tokens are never compressed
+    (see the BREACH note in Django's ``GZipMiddleware`` docs).
+    """
+
+    def process_response(self, request, response):
+        if not response.get("Content-Type", "").startswith("application/json"):
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.DO_AGAIN_LIST_GZIP_MIN_LENGTH
+        ):
+            return response
+        return super().process_response(request, response)
+
+
+class RequestMetricsMiddleware:
+    """Record each request's latency, DB use and response size in
+    ``metrics.store`` and report its timings in a ``Server-Timing`` header.
+
+    Goes first in ``MIDDLEWARE`` so the timings cover the other middleware.
+    Serves sync and async views alike, so the async ones stay async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with metrics.measure() as usage:
+            response = self.get_response(request)
+        return self._record(request, response, time.perf_counter() - start, usage)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with metrics.measure() as usage:
+            response = await self.get_response(request)
+        return self._record(request, response, time.perf_counter() - start, usage)
+
+    def _record(self, request, response, duration, usage):
+        match = request.resolver_match
+        metrics.store.observe(
+            # URL names rather than paths, so ids don't multiply the series
+            route=(match.view_name if match else None) or "unmatched",
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            usage=usage,
+            size=None if response.streaming else len(response.content),
+        )
+        metrics.store.write_if_due()
+        response["Server-Timing"] = metrics.server_timing(duration, usage)
+        return response
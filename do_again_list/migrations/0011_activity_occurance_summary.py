@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:22
+
+from django.db import migrations, models
+
+
+def backfill_occurance_summary(apps, schema_editor):
+    Activity = apps.get_model("do_again_list", "Activity")
+    Occurance = apps.get_model("do_again_list", "Occurance")
+    for activity in Activity.objects.all().iterator():
+        occurances = Occurance.objects.filter(activity=activity)
+        active = occurances.filter(end_time__isnull=True).first()
+        latest_completed = (
+            occurances.filter(end_time__isnull=False).order_by("-end_time").first()
+        )
+        if active is not None:
+            activity.state = "active"
+            activity.current_start_time = active.start_time
+            activity.current_end_time = None
+        elif latest_completed is not None:
+            activity.state = "inactive"
+            activity.current_start_time = latest_completed.start_time
+            activity.current_end_time = latest_completed.end_time
+        else:
+            activity.state = "pending"
+        activity.last_completed_end_time = (
+            latest_completed.end_time if latest_completed is not None else None
+        )
+        activity.save(
+            update_fields=[
+                "state",
+                "current_start_time",
+                "current_end_time",
+                "last_completed_end_time",
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('do_again_list', '0010_activity_is_break_impulse_resisted_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='current_end_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='current_start_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='last_completed_end_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('active', 'Active'), ('inactive', 'Inactive')], default='pending', max_length=16),
+        ),
+        migrations.RunPython(
+            backfill_occurance_summary,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
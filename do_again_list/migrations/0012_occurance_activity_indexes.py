@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:26
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def close_duplicate_open_occurances(apps, schema_editor):
+    """Keep only the most recently started open occurance per activity so the
+    partial unique constraint can be created. Older ones are closed at their
+    own start time."""
+    Occurance = apps.get_model("do_again_list", "Occurance")
+    duplicated = (
+        Occurance.objects.filter(end_time__isnull=True)
+        .values("activity")
+        .annotate(open_count=Count("id"))
+        .filter(open_count__gt=1)
+        .values_list("activity", flat=True)
+    )
+    for activity_id in duplicated:
+        stale = Occurance.objects.filter(
+            activity_id=activity_id, end_time__isnull=True
+        ).order_by("-start_time", "-id")[1:]
+        for occurance in stale:
+            occurance.end_time = occurance.start_time
+            occurance.save(update_fields=["end_time"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('do_again_list', '0011_activity_occurance_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['owner', 'title', 'is_built_in'], name='activity_owner_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurance',
+            index=models.Index(fields=['activity', '-end_time'], name='occurance_activity_end_idx'),
+        ),
+        migrations.RunPython(
+            close_duplicate_open_occurances,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='occurance',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True)), fields=('activity',), name='one_open_occurance_per_activity'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('do_again_list', '0014_job'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='occurance',
+            name='occurance_activity_end_idx',
+        ),
+        migrations.AddIndex(
+            model_name='occurance',
+            index=models.Index(fields=['activity', '-end_time', '-id'], name='occurance_activity_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occurance',
+            index=models.Index(fields=['-end_time', '-id'], name='occurance_end_id_idx'),
+        ),
+    ]
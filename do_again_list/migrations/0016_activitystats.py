@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:28
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+from do_again_list import stats
+
+
+def backfill_stats(apps, schema_editor):
+    Activity = apps.get_model("do_again_list", "Activity")
+    ActivityStats = apps.get_model("do_again_list", "ActivityStats")
+    Occurance = apps.get_model("do_again_list", "Occurance")
+    for activity in Activity.objects.all().iterator():
+        activity_stats = ActivityStats(activity=activity)
+        stats.replay(
+            activity_stats,
+            Occurance.objects.filter(activity=activity, end_time__isnull=False)
+            .order_by("end_time", "pk")
+            .values_list("planned_time", "start_time", "end_time"),
+            activity.max_time_between_events,
+        )
+        activity_stats.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('do_again_list', '0015_occurance_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completion_count', models.IntegerField(default=0)),
+                ('interval_count', models.IntegerField(default=0)),
+                ('interval_total', models.DurationField(default=datetime.timedelta(0))),
+                ('interval_histogram', models.JSONField(default=list)),
+                ('scheduled_count', models.IntegerField(default=0)),
+                ('on_time_count', models.IntegerField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('best_streak', models.IntegerField(default=0)),
+                ('activity', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='do_again_list.activity')),
+            ],
+            options={
+                'verbose_name_plural': 'activity stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:32
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('do_again_list', '0016_activitystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('total_duration', models.DurationField(default=datetime.timedelta(0))),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='do_again_list.activity')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'day'], name='dailyrollup_owner_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('activity', 'day'), name='one_rollup_per_activity_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('do_again_list', '0017_dailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['owner', 'state'], name='activity_owner_state_idx'),
+        ),
+    ]
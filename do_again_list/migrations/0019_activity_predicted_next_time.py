@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('do_again_list', '0018_activity_owner_state_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='predicted_next_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,14 +1,173 @@
 from typing import TYPE_CHECKING
 import datetime
+import itertools
+from pathlib import Path
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, TruncDate
 from django.utils import timezone
 
+from do_again_list import stats
+from do_again_list.conf import settings
+
 if TYPE_CHECKING:
     from django_stubs_ext.db.models.manager import RelatedManager
 
 
-class Activity(models.Model):
+OCCURANCE_SUMMARY_FIELDS = (
+    "state",
+    "current_start_time",
+    "current_end_time",
+    "last_completed_end_time",
+)
+
+
+class TrackedModel(models.Model):
+    """Records when each row last changed, for incremental client sync."""
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is not None:
+            # ``auto_now`` is only written when the field is listed
+            update_fields = {*update_fields, "updated_at"}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class ActivityQuerySet(models.QuerySet["Activity"]):
+    def with_occurance_summary(self) -> "ActivityQuerySet":
+        """Annotate each activity with its state and the times of its active
+        and most recently completed occurances, computed in a single query.
+
+        Only for rebuilding the stored summary columns (see
+        ``refresh_occurance_summaries``); everything else reads those.
+        """
+        active = Occurance.objects.filter(
+            activity=models.OuterRef("pk"), end_time__isnull=True
+        )
+        completed = Occurance.objects.filter(
+            activity=models.OuterRef("pk"), end_time__isnull=False
+        ).order_by("-end_time")
+        return self.annotate(
+            occurance_state=models.Case(
+                models.When(
+                    models.Exists(active), then=models.Value(Activity.State.ACTIVE)
+                ),
+                models.When(
+                    models.Exists(completed),
+                    then=models.Value(Activity.State.INACTIVE),
+                ),
+                default=models.Value(Activity.State.PENDING),
+                output_field=models.CharField(),
+            ),
+            active_start_time=models.Subquery(active.values("start_time")[:1]),
+            completed_start_time=models.Subquery(completed.values("start_time")[:1]),
+            completed_end_time=models.Subquery(completed.values("end_time")[:1]),
+        )
+
+    def with_due_time(self) -> "ActivityQuerySet":
+        """Annotate each activity with ``due_time``, the deadline the
+        client's list sorts by: ``next_time`` if set, else the last
+        completion plus ``max_time_between_events``, else the last
+        completion. Read from the stored summary columns."""
+        return self.annotate(
+            due_time=Coalesce(
+                "next_time",
+                models.F("last_completed_end_time")
+                + models.F("max_time_between_events"),
+                "last_completed_end_time",
+                output_field=models.DateTimeField(),
+            )
+        )
+
+    def refresh_occurance_summaries(self, batch_size: int = 500) -> int:
+        """Set-based ``Activity.refresh_occurance_summary`` for every activity
+        in the queryset: one annotated read and batched updates."""
+        now = timezone.now()
+        activities = []
+        for activity in self.with_occurance_summary():
+            activity.state = activity.occurance_state
+            if activity.state == Activity.State.ACTIVE:
+                activity.current_start_time = activity.active_start_time
+                activity.current_end_time = None
+            else:
+                activity.current_start_time = activity.completed_start_time
+                activity.current_end_time = activity.completed_end_time
+            activity.last_completed_end_time = activity.completed_end_time
+            activity.updated_at = now
+            activities.append(activity)
+        return self.model.objects.bulk_update(
+            activities, [*OCCURANCE_SUMMARY_FIELDS, "updated_at"], batch_size=batch_size
+        )
+
+    def refresh_stats(self, batch_size: int = 500) -> None:
+        """Rebuild the ``ActivityStats`` of every activity in the queryset
+        from its history, in one pass over its completed occurances.
+        Occurances that were started before being ended have no
+        ``planned_time``, so only their interval is scored."""
+        max_intervals = dict(self.values_list("pk", "max_time_between_events"))
+        completions = (
+            Occurance.objects.filter(
+                activity_id__in=max_intervals, end_time__isnull=False
+            )
+            .order_by("activity_id", "end_time", "pk")
+            .values_list("activity_id", "planned_time", "start_time", "end_time")
+            .iterator(chunk_size=2000)
+        )
+        by_activity = {
+            activity_id: ActivityStats(activity_id=activity_id)
+            for activity_id in max_intervals
+        }
+        for activity_id, rows in itertools.groupby(completions, key=lambda row: row[0]):
+            stats.replay(
+                by_activity[activity_id],
+                (row[1:] for row in rows),
+                max_intervals[activity_id],
+            )
+        ActivityStats.objects.bulk_create(
+            by_activity.values(),
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["activity"],
+            update_fields=ActivityStats.COUNTER_FIELDS,
+        )
+
+    def refresh_daily_rollups(self, batch_size: int = 500) -> None:
+        """Rebuild the ``DailyRollup`` rows of every activity in the queryset
+        from its completed occurances, grouped by day in the SQL."""
+        activities = self.values("pk")
+        rows = (
+            Occurance.objects.filter(activity__in=activities, end_time__isnull=False)
+            .annotate(day=TruncDate("end_time"))
+            .values("activity_id", "activity__owner_id", "day")
+            .annotate(
+                count=models.Count("pk"),
+                total_duration=models.Sum(
+                    models.F("end_time") - models.F("start_time"),
+                    output_field=models.DurationField(),
+                ),
+            )
+            .order_by()
+        )
+        rollups = [
+            DailyRollup(
+                owner_id=row["activity__owner_id"],
+                activity_id=row["activity_id"],
+                day=row["day"],
+                count=row["count"],
+                total_duration=row["total_duration"],
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            DailyRollup.objects.filter(activity__in=activities).delete()
+            DailyRollup.objects.bulk_create(rollups, batch_size=batch_size)
+
+
+class Activity(TrackedModel):
     class MoralQuality(models.TextChoices):
         GOOD = "good"
         NEUTRAL = "neutral"
@@ -29,6 +188,8 @@ class Activity(models.Model):
     ordering = models.IntegerField(default=0)
     default_duration = models.DurationField(default=datetime.timedelta(0))
     next_time = models.DateTimeField(null=True, blank=True)
+    # a suggestion from ``analytics.predict_next_time``, never scored
+    predicted_next_time = models.DateTimeField(null=True, blank=True)
     min_duration = models.DurationField(blank=True, null=True)
     max_time_between_events = models.DurationField(blank=True, null=True)
     value = models.FloatField(default=1.0)
@@ -36,6 +197,35 @@ class Activity(models.Model):
     is_break = models.BooleanField(default=False)
     impulse_resisted_count = models.IntegerField(default=0)
 
+    # ── Denormalized occurance summary ──
+    # Maintained by ``ActivityService.start``/``end`` so that listing activities
+    # doesn't need to query occurances. ``current_*`` mirror the active
+    # occurance if there is one, otherwise the most recently ended one.
+    state = models.CharField(
+        max_length=16, choices=State.choices, default=State.PENDING
+    )
+    current_start_time = models.DateTimeField(null=True, blank=True)
+    current_end_time = models.DateTimeField(null=True, blank=True)
+    last_completed_end_time = models.DateTimeField(null=True, blank=True)
+
+    objects = ActivityQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # built-ins and imports look activities up by title. ``is_built_in``
+            # goes last: SQLite renders boolean filters as a bare column, which
+            # can't use an index, so it must not sit in front of ``title``.
+            models.Index(
+                fields=["owner", "title", "is_built_in"],
+                name="activity_owner_title_idx",
+            ),
+            models.Index(
+                fields=["owner", "updated_at"], name="activity_owner_updated_idx"
+            ),
+            # the completed activities ranked by GET /activities/due/
+            models.Index(fields=["owner", "state"], name="activity_owner_state_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.display_name:
             self.display_name = self.title
@@ -47,14 +237,34 @@ class Activity(models.Model):
     if TYPE_CHECKING:
         occurances: RelatedManager["Occurance"]
 
-    @property
-    def state(self) -> State:
-        if self.occurances.all().count() == 0:
-            return self.__class__.State.PENDING
-        if self.occurances.filter(end_time__isnull=True).exists():
+    def refresh_occurance_summary(self, save: bool = True) -> None:
+        """Recompute the denormalized occurance summary from the database.
+
+        Only needed when occurances are written outside of ``ActivityService``
+        (admin, imports, fixtures).
+        """
+        active = self.occurances.filter(end_time__isnull=True).first()
+        latest_completed = (
+            self.occurances.filter(end_time__isnull=False).order_by("-end_time").first()
+        )
+        if active is not None:
             # at least one occurance has started and not ended
-            return self.__class__.State.ACTIVE
-        return self.__class__.State.INACTIVE
+            self.state = self.__class__.State.ACTIVE
+            self.current_start_time = active.start_time
+            self.current_end_time = None
+        elif latest_completed is not None:
+            self.state = self.__class__.State.INACTIVE
+            self.current_start_time = latest_completed.start_time
+            self.current_end_time = latest_completed.end_time
+        else:
+            self.state = self.__class__.State.PENDING
+            self.current_start_time = None
+            self.current_end_time = None
+        self.last_completed_end_time = (
+            latest_completed.end_time if latest_completed is not None else None
+        )
+        if save:
+            self.save(update_fields=OCCURANCE_SUMMARY_FIELDS)
 
     @property
     def moral_quality(self) -> MoralQuality:
@@ -63,9 +273,25 @@ class Activity(models.Model):
         return self.__class__.MoralQuality.NEUTRAL
 
 
-class Occurance(models.Model):
+class Occurance(TrackedModel):
     class Meta:
         ordering = ["-end_time"]
+        indexes = [
+            # id breaks ties for keyset pagination (OccuranceCursorPagination)
+            models.Index(
+                fields=["activity", "-end_time", "-id"],
+                name="occurance_activity_end_idx",
+            ),
+            models.Index(fields=["updated_at"], name="occurance_updated_idx"),
+            models.Index(fields=["-end_time", "-id"], name="occurance_end_id_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["activity"],
+                condition=models.Q(end_time__isnull=True),
+                name="one_open_occurance_per_activity",
+            ),
+        ]
 
     activity = models.ForeignKey(
         Activity, on_delete=models.CASCADE, related_name="occurances"
@@ -78,7 +304,87 @@ class Occurance(models.Model):
         return f"{self.activity.title} on {self.end_time}"
 
 
-class GameState(models.Model):
+class ActivityStats(models.Model):
+    """Completion statistics for an activity, kept up to date by
+    ``ActivityService.end`` (see ``do_again_list.stats``)."""
+
+    COUNTER_FIELDS = (
+        "completion_count",
+        "interval_count",
+        "interval_total",
+        "interval_histogram",
+        "scheduled_count",
+        "on_time_count",
+        "current_streak",
+        "best_streak",
+    )
+
+    activity = models.OneToOneField(
+        Activity, on_delete=models.CASCADE, related_name="stats"
+    )
+    completion_count = models.IntegerField(default=0)
+    # intervals between consecutive completions
+    interval_count = models.IntegerField(default=0)
+    interval_total = models.DurationField(default=datetime.timedelta(0))
+    interval_histogram = models.JSONField(default=list)
+    # completions that had a next_time or max_time_between_events to meet
+    scheduled_count = models.IntegerField(default=0)
+    on_time_count = models.IntegerField(default=0)
+    current_streak = models.IntegerField(default=0)
+    best_streak = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "activity stats"
+
+    def __str__(self):
+        return f"Stats for activity {self.activity_id}"
+
+    @property
+    def mean_interval(self) -> datetime.timedelta | None:
+        if not self.interval_count:
+            return None
+        return self.interval_total / self.interval_count
+
+    @property
+    def median_interval(self) -> datetime.timedelta | None:
+        return stats.histogram_median(self.interval_histogram)
+
+    @property
+    def on_time_rate(self) -> float | None:
+        if not self.scheduled_count:
+            return None
+        return self.on_time_count / self.scheduled_count
+
+
+class DailyRollup(models.Model):
+    """How often and for how long an activity was done on one day (by
+    ``end_time`` in the current time zone), kept up to date by
+    ``ActivityService.end`` so the heatmap never aggregates occurances."""
+
+    # denormalized from the activity so a user's year is one index range
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    activity = models.ForeignKey(
+        Activity, on_delete=models.CASCADE, related_name="daily_rollups"
+    )
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+    total_duration = models.DurationField(default=datetime.timedelta(0))
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "day"], name="dailyrollup_owner_day_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["activity", "day"], name="one_rollup_per_activity_day"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.activity_id} on {self.day}: {self.count}"
+
+
+class GameState(TrackedModel):
     owner = models.OneToOneField(get_user_model(), on_delete=models.PROTECT)
 
     xp = models.IntegerField(default=0)
@@ -164,3 +470,102 @@ class GameState(models.Model):
 
     def __str__(self):
         return f"GameState Lv{self.level} ATK:{self.total_attack()} DEF:{self.total_defense()}"
+
+
+class DeletedActivity(models.Model):
+    """Tombstone letting offline clients learn about deleted activities."""
+
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    activity_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["owner", "deleted_at"], name="deletedactivity_owner_idx"
+            ),
+        ]
+
+
+class Operation(models.Model):
+    """A client-generated operation that has already been applied.
+
+    Replaying an operation with the same ``operation_id`` returns the stored
+    response instead of applying it again.
+    """
+
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    operation_id = models.CharField(max_length=64)
+    status_code = models.IntegerField(default=200)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "operation_id"], name="unique_operation_per_owner"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.operation_id} ({self.owner})"
+
+
+class Job(models.Model):
+    """A data import or export run by the ``run_jobs`` worker instead of
+    inside a web request. Files live under ``DO_AGAIN_LIST_JOB_DIR``."""
+
+    class Kind(models.TextChoices):
+        IMPORT = "import"
+        EXPORT = "export"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED
+    )
+    params = models.JSONField(default=dict, blank=True)
+    # activities processed so far, out of ``total`` when that is known
+    progress = models.IntegerField(default=0)
+    total = models.IntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"], name="job_status_created_idx"
+            ),
+            models.Index(fields=["owner", "-created_at"], name="job_owner_created_idx"),
+        ]
+
+    # written by the worker while the job runs
+    PROGRESS_FILENAME = "progress"
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.DO_AGAIN_LIST_JOB_DIR) / str(self.pk)
+
+    @property
+    def current_progress(self) -> int:
+        """Live progress of a running job, else the progress stored when it
+        finished. Running imports hold their transaction open, so the live
+        value is kept in a file rather than on the row."""
+        if self.status != self.__class__.Status.RUNNING:
+            return self.progress
+        try:
+            return int((self.directory / self.PROGRESS_FILENAME).read_text())
+        except (OSError, ValueError):
+            return self.progress
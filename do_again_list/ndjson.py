@@ -0,0 +1,152 @@
+"""
+Version 2 of the data export: gzipped newline-delimited JSON.
+
+The first line is the envelope (version, export time, user and game
+state); every following line is one activity. An activity's occurances
+are stored as columns of whole epoch seconds rather than a list of
+objects::
+
+    {"title": "run", ..., "occurances": {
+        "start_time": [1700000000, 86400, 90000],  # first absolute, then deltas
+        "end_time": [1800, 1750, null],            # seconds after start_time
+        "planned_time": [-600, 0, 0]               # seconds after start_time
+    }}
+
+``planned_time`` is left out when no occurance has one.
+"""
+
+import datetime
+import gzip
+import io
+import math
+import zlib
+from collections.abc import Iterable, Iterator
+
+from do_again_list import jsonlib
+
+VERSION = 2
+MEDIA_TYPE = "application/x-ndjson"
+
+OccuranceRow = tuple[
+    datetime.datetime | None, datetime.datetime, datetime.datetime | None
+]
+
+
+def _seconds(value: datetime.datetime) -> int:
+    return math.floor(value.timestamp())
+
+
+def _datetime(seconds: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def encode_occurances(rows: Iterable[OccuranceRow]) -> dict[str, list]:
+    """Encode ``(planned_time, start_time, end_time)`` rows, ordered by
+    start_time, as delta-encoded columns."""
+    start_times: list[int] = []
+    end_times: list[int | None] = []
+    planned_times: list[int | None] = []
+    previous = 0
+    for planned_time, start_time, end_time in rows:
+        start = _seconds(start_time)
+        start_times.append(start - previous)
+        previous = start
+        end_times.append(None if end_time is None else _seconds(end_time) - start)
+        planned_times.append(
+            None if planned_time is None else _seconds(planned_time) - start
+        )
+    columns: dict[str, list] = {"start_time": start_times, "end_time": end_times}
+    if any(planned is not None for planned in planned_times):
+        columns["planned_time"] = planned_times
+    return columns
+
+
+def decode_occurances(columns: object) -> list[dict]:
+    """Inverse of ``encode_occurances``, giving the version 1 occurance dicts.
+
+    Raises ``ValueError`` if the columns are malformed.
+    """
+    if not isinstance(columns, dict):
+        raise ValueError("occurances must be an object of columns")
+    start_times = columns.get("start_time", [])
+    end_times = columns.get("end_time", [None] * len(start_times))
+    planned_times = columns.get("planned_time", [None] * len(start_times))
+    if not (
+        isinstance(start_times, list)
+        and isinstance(end_times, list)
+        and isinstance(planned_times, list)
+        and len(start_times) == len(end_times) == len(planned_times)
+    ):
+        raise ValueError("occurance columns must be lists of the same length")
+
+    occurances = []
+    start = 0
+    try:
+        for start_delta, end_delta, planned_delta in zip(
+            start_times, end_times, planned_times
+        ):
+            start += start_delta
+            occurances.append(
+                {
+                    "planned_time": (
+                        None
+                        if planned_delta is None
+                        else _datetime(start + planned_delta)
+                    ),
+                    "start_time": _datetime(start),
+                    "end_time": None
+                    if end_delta is None
+                    else _datetime(start + end_delta),
+                }
+            )
+    except (TypeError, OverflowError, OSError) as exc:
+        raise ValueError(f"invalid occurance time: {exc}") from exc
+    return occurances
+
+
+def dumps(document: dict) -> str:
+    return jsonlib.dumps_text(document) + "\n"
+
+
+def gzip_chunks(lines: Iterable[str], buffer_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Gzip ``lines`` on the fly, yielding roughly ``buffer_size`` bytes of
+    uncompressed input at a time."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    buffer: list[str] = []
+    buffered = 0
+    for line in lines:
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= buffer_size:
+            chunk = compressor.compress("".join(buffer).encode())
+            if chunk:
+                yield chunk
+            buffer.clear()
+            buffered = 0
+    yield compressor.compress("".join(buffer).encode()) + compressor.flush()
+
+
+def read_lines(body: bytes) -> Iterator[dict]:
+    """Yield each JSON line of a version 2 upload, gzipped or not.
+
+    Decompression is lazy, so only ``body`` itself is ever held in memory.
+    Raises ``ValueError`` for a line that is not a JSON object.
+    """
+    stream = (
+        gzip.GzipFile(fileobj=io.BytesIO(body))
+        if body[:2] == b"\x1f\x8b"
+        else io.BytesIO(body)
+    )
+    try:
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                document = jsonlib.loads(line)
+            except ValueError as exc:
+                raise ValueError(f"line {number}: {exc}") from exc
+            if not isinstance(document, dict):
+                raise ValueError(f"line {number}: expected a JSON object")
+            yield document
+    except (OSError, EOFError, zlib.error) as exc:
+        raise ValueError(f"invalid gzip data: {exc}") from exc
@@ -0,0 +1,150 @@
+import base64
+import binascii
+import datetime
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+Position = tuple[datetime.datetime | None, int]
+
+
+class OccuranceCursorPagination(BasePagination):
+    """Keyset pagination over occurances, newest first.
+
+    Open occurances (no ``end_time``, at most one per activity) come first
+    by ``id``, then completed ones by ``(end_time, id)``, all descending;
+    the open ones are read separately because databases disagree on where
+    nulls sort. The opaque ``cursor`` holds the position of the last row of
+    the previous page, and each page is read from there with a range
+    condition on ``occurance_end_id_idx`` (or ``occurance_activity_end_idx``
+    when filtered by activity) rather than an ``OFFSET``, so every page
+    costs the same however deep it is. Paging is forward only.
+
+    Pages are opt-in: unless a request passes ``page_size`` or ``cursor``,
+    it gets every row as a plain list, the response clients had before.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> list | None:
+        if not any(
+            param in request.query_params
+            for param in (self.cursor_query_param, self.page_size_query_param)
+        ):
+            return None
+        self.request = request
+        page_size = self.get_page_size(request)
+        # one extra row tells whether there's another page
+        page = self._rows_after(queryset, self.decode_cursor(request), page_size + 1)
+        self.next_position: Position | None = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = (page[-1].end_time, page[-1].pk)
+        return page
+
+    def _rows_after(
+        self, queryset: QuerySet, position: Position | None, limit: int
+    ) -> list:
+        rows = []
+        if position is None or position[0] is None:
+            open_rows = queryset.filter(end_time__isnull=True)
+            if position is not None:
+                open_rows = open_rows.filter(pk__lt=position[1])
+            rows = list(open_rows.order_by("-pk")[:limit])
+            position = None
+        if len(rows) < limit:
+            completed = queryset.filter(end_time__isnull=False)
+            if position is not None:
+                end_time, pk = position
+                # the redundant bound lets the index seek straight to the cursor
+                completed = completed.filter(
+                    Q(end_time__lt=end_time) | Q(end_time=end_time, pk__lt=pk),
+                    end_time__lte=end_time,
+                )
+            rows += completed.order_by("-end_time", "-pk")[: limit - len(rows)]
+        return rows
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request) -> Position | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            end_time, _, pk = (
+                base64.urlsafe_b64decode(encoded.encode()).decode().partition("|")
+            )
+            position = (parse_datetime(end_time) if end_time else None, int(pk))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message) from None
+        if end_time and position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position: Position) -> str:
+        end_time, pk = position
+        text = f"{end_time.isoformat() if end_time else ''}|{pk}"
+        return base64.urlsafe_b64encode(text.encode()).decode()
+
+    def get_next_link(self) -> str | None:
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        page = {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+        return {"oneOf": [schema, page]}
+
+    def get_schema_operation_parameters(self, view) -> list[dict]:
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": (
+                    "The pagination cursor value. Passing this or "
+                    f"{self.page_size_query_param} returns a page of results "
+                    "with the link to the next, rather than a plain list."
+                ),
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": (
+                    f"Number of results to return per page (at most "
+                    f"{self.max_page_size})."
+                ),
+                "schema": {"type": "integer"},
+            },
+        ]
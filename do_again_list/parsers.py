@@ -0,0 +1,69 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from do_again_list import jsonlib, ndjson
+
+
+@dataclass
+class StreamedImport:
+    """A version 2 upload: the envelope, and its activities decoded lazily
+    into the version 1 shape."""
+
+    envelope: dict
+    activities: Iterator[dict]
+
+
+class JSONParser(parsers.JSONParser):
+    """DRF's ``JSONParser``, decoding with ``do_again_list.jsonlib``.
+
+    Bodies are read whole rather than through a text decoder, so only UTF-8
+    is accepted when orjson is in use.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not jsonlib.accelerated():
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return jsonlib.loads(stream.read() if stream is not None else b"")
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from exc
+
+
+class NDJSONImportParser(BaseParser):
+    """Parses version 2 exports (see ``do_again_list.ndjson``), gzipped or not.
+
+    Only the first line is read up front; a malformed later line raises
+    ``ParseError`` while the activities are being consumed.
+    """
+
+    media_type = ndjson.MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None) -> StreamedImport:
+        lines = self._lines(stream.read() if stream is not None else b"")
+        try:
+            envelope = next(lines)
+        except StopIteration:
+            raise ParseError("Empty upload.") from None
+        if envelope.get("version") != ndjson.VERSION:
+            raise ParseError(f"Expected a version {ndjson.VERSION} export.")
+        return StreamedImport(envelope=envelope, activities=self._activities(lines))
+
+    def _lines(self, body: bytes) -> Iterator[dict]:
+        try:
+            yield from ndjson.read_lines(body)
+        except ValueError as exc:
+            raise ParseError(f"NDJSON parse error - {exc}") from exc
+
+    def _activities(self, lines: Iterator[dict]) -> Iterator[dict]:
+        for activity in lines:
+            try:
+                activity["occurances"] = ndjson.decode_occurances(
+                    activity.get("occurances", {})
+                )
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error - {exc}") from exc
+            yield activity
@@ -0,0 +1,35 @@
+from rest_framework import renderers
+
+from do_again_list import jsonlib
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """DRF's ``JSONRenderer``, encoding with ``do_again_list.jsonlib``.
+
+    Indented output (the browsable API, or ``; indent=`` in the Accept
+    header) and non-default ``COMPACT_JSON``/``UNICODE_JSON`` settings are
+    left to DRF, as are values orjson rejects, such as integers too large
+    for 64 bits.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            not jsonlib.accelerated()
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = jsonlib.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like DRF, escape the two characters that are valid JSON but not
+        # valid JavaScript.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
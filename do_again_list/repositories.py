@@ -0,0 +1,104 @@
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from do_again_list import events, models
+from do_again_list.conf import settings
+
+
+class GameStateRepository:
+    """Cache-backed access to each user's singleton ``GameState``.
+
+    Reads are served from the cache configured by
+    ``DO_AGAIN_LIST_GAME_STATE_CACHE``. Writes go straight to the database
+    and invalidate the cached entry, both immediately and once the
+    surrounding transaction commits, so other workers never keep serving a
+    state that was read before the write became visible.
+
+    Invalidating also replaces the owner's generation token, and an entry
+    is only served under the token that was current before its row was
+    read, so a read that races a write can't cache what it read for longer
+    than that write. Write paths that depend on the current values read
+    the row with ``get_current`` rather than from the cache.
+    """
+
+    key_prefix = "do_again_list:game_state"
+
+    @property
+    def cache(self):
+        return caches[settings.DO_AGAIN_LIST_GAME_STATE_CACHE]
+
+    def _key(self, owner_id: int) -> str:
+        return f"{self.key_prefix}:{owner_id}"
+
+    def _generation_key(self, owner_id: int) -> str:
+        return f"{self.key_prefix}:{owner_id}:generation"
+
+    def get(self, owner) -> tuple[models.GameState, bool]:
+        """Return ``(game_state, created)`` like ``get_or_create``."""
+        key, generation_key = self._key(owner.pk), self._generation_key(owner.pk)
+        cached = self.cache.get_many([key, generation_key])
+        generation = cached.get(generation_key)
+        entry = cached.get(key)
+        if entry is not None and generation is not None and entry[0] == generation:
+            return entry[1], False
+        if generation is None:
+            self.cache.add(generation_key, uuid.uuid4().hex, timeout=self._timeout)
+            generation = self.cache.get(generation_key)
+        game_state, created = models.GameState.objects.get_or_create(owner=owner)
+        self.cache.set(key, (generation, game_state), timeout=self._timeout)
+        return game_state, created
+
+    def get_current(self, owner, *, lock: bool = False) -> models.GameState:
+        """The owner's row read from the database, never the cache, for
+        writes that depend on its current values. ``lock`` selects it for
+        update, which needs a transaction."""
+        queryset = models.GameState.objects.all()
+        if lock:
+            queryset = queryset.select_for_update()
+        game_state, _ = queryset.get_or_create(owner=owner)
+        return game_state
+
+    @property
+    def _timeout(self) -> int:
+        return settings.DO_AGAIN_LIST_GAME_STATE_CACHE_TIMEOUT
+
+    def save(self, game_state: models.GameState, **kwargs) -> models.GameState:
+        game_state.save(**kwargs)
+        self.invalidate(game_state.owner_id)
+        update_fields = kwargs.get("update_fields") or [
+            field.attname
+            for field in game_state._meta.concrete_fields
+            if not field.primary_key and field.name not in ("owner", "updated_at")
+        ]
+        events.game_state_changed(
+            game_state.owner_id,
+            {name: getattr(game_state, name) for name in update_fields},
+        )
+        return game_state
+
+    def update(self, owner_id: int, *, condition: Q | None = None, **values) -> int:
+        """Write ``values`` (which may be ``F()`` expressions) to the owner's
+        row without reading it first, only if it matches ``condition``.
+        Returns the number of rows updated."""
+        queryset = models.GameState.objects.filter(owner_id=owner_id)
+        if condition is not None:
+            queryset = queryset.filter(condition)
+        updated = queryset.update(updated_at=timezone.now(), **values)
+        self.invalidate(owner_id)
+        if updated:
+            events.game_state_changed(owner_id, values)
+        return updated
+
+    def invalidate(self, owner_id: int) -> None:
+        def invalidate() -> None:
+            self.cache.set(
+                self._generation_key(owner_id), uuid.uuid4().hex, timeout=self._timeout
+            )
+            self.cache.delete(self._key(owner_id))
+
+        invalidate()
+        transaction.on_commit(invalidate)
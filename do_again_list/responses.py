@@ -0,0 +1,95 @@
+"""
+Response bodies for the game actions, built straight from the models and
+``services.GameEffect`` instead of through a serializer.
+
+The serializers in ``serializers`` (``ActivityResponseSerializer``,
+``ErrorResponseSerializer`` and ``RunOverResponseSerializer``) still
+describe these bodies in the API schema, but running them meant validating
+our own output on every start/end/create, which cost more than the action
+itself. The functions here must produce exactly what those serializers
+would; ``tests/test_responses.py`` holds them to it.
+"""
+
+from rest_framework import serializers
+
+from do_again_list import models, services
+
+# Model fields in the order ``GameStateSerializer`` renders them, after the
+# ``id``, the computed stats and ``updated_at``
+_GAME_STATE_FIELDS = tuple(
+    field.attname
+    for field in models.GameState._meta.concrete_fields
+    if field.name
+    not in ("id", "owner", "updated_at", "bonus_xp", "bonus_xp_updated_at")
+)
+_DATETIME = serializers.DateTimeField()
+
+
+def render_game_state(game_state: models.GameState) -> dict:
+    """What ``GameStateSerializer(game_state).data`` gives."""
+    data = {
+        "id": game_state.pk,
+        "total_attack": game_state.total_attack(),
+        "total_defense": game_state.total_defense(),
+        "total_speed": game_state.total_speed(),
+        "xp_to_next_level": game_state.xp_to_next_level(),
+        "max_hp": game_state.max_hp(),
+        "bonus_xp": int(game_state._compute_bonus_xp()),
+        "updated_at": _DATETIME.to_representation(game_state.updated_at),
+    }
+    for name in _GAME_STATE_FIELDS:
+        data[name] = getattr(game_state, name)
+    return data
+
+
+def _stat_modifier(stat_modifier: services.StatModifier) -> dict:
+    return {
+        "attack": stat_modifier.attack,
+        "defense": stat_modifier.defense,
+        "speed": stat_modifier.speed,
+    }
+
+
+def render_activity_action(
+    game_state: models.GameState, game_effect: services.GameEffect
+) -> dict:
+    """Body of a successful activity action (``ActivityResponseSerializer``)."""
+    spawn_enemy = game_effect.spawn_enemy
+    resource_ref = game_effect.resource_ref
+    return {
+        "success": True,
+        "error": None,
+        "game": render_game_state(game_state),
+        "messages": [str(message) for message in game_effect.messages],
+        "spawn_enemy": None
+        if spawn_enemy is None
+        else {
+            "level": spawn_enemy.level,
+            "stat_modifier": _stat_modifier(spawn_enemy.stat_modifier),
+        },
+        "hero_buffs": [
+            {"stat": buff.stat.value, "amount": buff.amount, "label": buff.label}
+            for buff in game_effect.hero_buffs
+        ],
+        "pending_heal": game_effect.pending_heal,
+        "pending_fatigue": game_effect.pending_fatigue,
+        "resource_ref": None
+        if resource_ref is None
+        else {"klass": resource_ref.klass, "pk": resource_ref.pk},
+    }
+
+
+def render_error(message: str) -> dict:
+    """Body of a failed action (``ErrorResponseSerializer``)."""
+    return {"success": False, "error": message}
+
+
+def render_run_over(
+    game_state: models.GameState, *, souls_earned: int, level_reached: int
+) -> dict:
+    """Body of POST /game/run_over/ (``RunOverResponseSerializer``)."""
+    return {
+        "game": render_game_state(game_state),
+        "souls_earned": souls_earned,
+        "level_reached": level_reached,
+    }
@@ -1,24 +1,70 @@
 import datetime
+from collections.abc import Iterable, Iterator
 
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from do_again_list import models
-from do_again_list.utils import humanize_timedelta, parse_time_offset
+from do_again_list import durations, models
+from do_again_list.conf import settings
 
 
 class HumanReadableDurationField(serializers.DurationField):
+    """A duration written like "1d5h30m" (see ``do_again_list.durations``).
+
+    Unless ``strict`` (by default ``DO_AGAIN_LIST_STRICT_DURATIONS``), values
+    that aren't durations are read as zero rather than rejected.
+    """
+
+    default_error_messages = {
+        "invalid_duration": (
+            'Not a duration. Use units y, mo, w, d, h, m and s, like "1d5h30m".'
+        ),
+    }
+
+    def __init__(self, *, strict: bool | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.strict = strict
+
     def to_representation(self, value: datetime.timedelta) -> str:
-        return humanize_timedelta(value)
+        return durations.humanize(value)
 
     def to_internal_value(self, data: datetime.timedelta | str) -> datetime.timedelta:
         if isinstance(data, datetime.timedelta):
             return data
-        internal = parse_time_offset(data)
+        strict = (
+            settings.DO_AGAIN_LIST_STRICT_DURATIONS
+            if self.strict is None
+            else self.strict
+        )
+        try:
+            internal = durations.parse(data, strict=strict)
+        except durations.DurationParseError:
+            if strict:
+                self.fail("invalid_duration")
+            internal = None
         if internal is None:
             return datetime.timedelta()
         return internal
 
 
+class ActivityStatsSerializer(serializers.ModelSerializer):
+    mean_interval = HumanReadableDurationField(read_only=True, allow_null=True)
+    median_interval = HumanReadableDurationField(read_only=True, allow_null=True)
+    on_time_rate = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta:  # type: ignore
+        model = models.ActivityStats
+        fields = (
+            "completion_count",
+            "mean_interval",
+            "median_interval",
+            "on_time_rate",
+            "current_streak",
+            "best_streak",
+        )
+        read_only_fields = fields
+
+
 class ActivitySerializer(serializers.ModelSerializer):
     default_duration = HumanReadableDurationField(allow_null=True, required=False)
     min_duration = HumanReadableDurationField(allow_null=True, required=False)
@@ -28,6 +74,7 @@ class ActivitySerializer(serializers.ModelSerializer):
     start_time = serializers.SerializerMethodField()
     end_time = serializers.SerializerMethodField()
     state = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
 
     class Meta: # type: ignore
         model = models.Activity
@@ -39,6 +86,7 @@ class ActivitySerializer(serializers.ModelSerializer):
             "ordering",
             "default_duration",
             "next_time",
+            "predicted_next_time",
             "min_duration",
             "max_time_between_events",
             "value",
@@ -49,32 +97,42 @@ class ActivitySerializer(serializers.ModelSerializer):
             "start_time",
             "end_time",
             "state",
+            "stats",
+        )
+        read_only_fields = (
+            "id",
+            "is_built_in",
+            "impulse_resisted_count",
+            "predicted_next_time",
+            "start_time",
+            "end_time",
+            "state",
+            "stats",
         )
-        read_only_fields = ("id", "is_built_in", "impulse_resisted_count", "start_time", "end_time", "state")
-
-    def _latest_occurance(self, obj: models.Activity) -> models.Occurance | None:
-        """Return the active (end_time IS NULL) occurrence if one exists,
-        otherwise the most-recently-ended occurrence."""
-        active = obj.occurances.filter(end_time__isnull=True).first()
-        if active is not None:
-            return active
-        return obj.occurances.first()  # ordered by -end_time via Meta
 
     def get_start_time(self, obj: models.Activity) -> str | None:
-        latest = self._latest_occurance(obj)
-        if latest and latest.start_time:
-            return latest.start_time.isoformat()
+        if obj.current_start_time:
+            return obj.current_start_time.isoformat()
         return None
 
     def get_end_time(self, obj: models.Activity) -> str | None:
-        latest = self._latest_occurance(obj)
-        if latest and latest.end_time:
-            return latest.end_time.isoformat()
+        if obj.current_end_time:
+            return obj.current_end_time.isoformat()
         return None
 
     def get_state(self, obj: models.Activity) -> str:
         return obj.state
 
+    @extend_schema_field(ActivityStatsSerializer)
+    def get_stats(self, obj: models.Activity) -> dict:
+        """Read from ``select_related("stats")``; an activity that has never
+        been completed has no stats row and reports zeros."""
+        try:
+            activity_stats = obj.stats
+        except models.ActivityStats.DoesNotExist:
+            activity_stats = models.ActivityStats(activity=obj)
+        return ActivityStatsSerializer(activity_stats).data
+
 
 class OccuranceSerializer(serializers.ModelSerializer):
     class Meta: # type: ignore
@@ -142,13 +200,32 @@ class MetaUpgradeSerializer(serializers.Serializer):
     upgrade = serializers.ChoiceField(choices=["attack", "defense", "speed", "hp", "game_speed"])
 
 
+class DueActivitySerializer(ActivitySerializer):
+    """An entry of GET /activities/due/."""
+
+    due_time = serializers.DateTimeField(read_only=True)
+
+    class Meta(ActivitySerializer.Meta):  # type: ignore
+        fields = (*ActivitySerializer.Meta.fields, "due_time")
+        read_only_fields = (*ActivitySerializer.Meta.read_only_fields, "due_time")
+
+
 class ActivityActionSerializer(serializers.Serializer):
+    # Client-generated id; replaying an operation returns the original response
+    operation_id = serializers.CharField(max_length=64, required=False)
     kill_streak = serializers.IntegerField(default=0)
     start_time = serializers.DateTimeField(allow_null=True, required=False)
     end_time = serializers.DateTimeField(allow_null=True, required=False)
     next_time = serializers.DateTimeField(allow_null=True, required=False)
 
 
+class ActivityBatchOperationSerializer(ActivityActionSerializer):
+    """One entry of the list posted to POST /activities/batch/."""
+
+    id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=["start", "end", "set_next"])
+
+
 class StatModifierSerializer(serializers.Serializer):
     attack = serializers.IntegerField()
     defense = serializers.IntegerField()
@@ -195,6 +272,51 @@ class ErrorResponseSerializer(serializers.Serializer):
     error = serializers.CharField()
 
 
+class ChangesSerializer(serializers.Serializer):
+    """Response body for GET /changes/."""
+
+    cursor = serializers.CharField()
+    activities = ActivitySerializer(many=True)
+    occurances = OccuranceSerializer(many=True)
+    deleted_activities = serializers.ListField(child=serializers.IntegerField())
+    game = GameStateSerializer(allow_null=True)
+
+
+class IntervalAnalysisSerializer(serializers.Serializer):
+    """One entry of GET /activities/analytics/ (``analytics.IntervalAnalysis``)."""
+
+    activity = serializers.IntegerField()
+    completion_count = serializers.IntegerField()
+    last_end_time = serializers.DateTimeField(allow_null=True)
+    mean_interval = HumanReadableDurationField(allow_null=True)
+    interval_percentiles = serializers.DictField(child=HumanReadableDurationField())
+    period = HumanReadableDurationField(allow_null=True)
+    regularity = serializers.FloatField(allow_null=True)
+    predicted_next_time = serializers.DateTimeField(allow_null=True)
+
+
+class HeatmapQuerySerializer(serializers.Serializer):
+    """Query parameters for GET /heatmap/."""
+
+    activity = serializers.IntegerField(required=False)
+    end = serializers.DateField(required=False)
+
+
+class HeatmapDaySerializer(serializers.Serializer):
+    day = serializers.DateField()
+    count = serializers.IntegerField()
+    total_duration = HumanReadableDurationField()
+
+
+class HeatmapSerializer(serializers.Serializer):
+    """Response body for GET /heatmap/; days without completions are left out."""
+
+    activity = serializers.IntegerField(allow_null=True)
+    start = serializers.DateField()
+    end = serializers.DateField()
+    days = HeatmapDaySerializer(many=True)
+
+
 # ─── Import / Export ─────────────────────────────────────────────────────────
 
 
@@ -248,11 +370,82 @@ class DataImportSerializer(serializers.Serializer):
     ``activities`` are merged by title: existing activities are updated,
     unknown ones are created.  Occurrences are deduplicated by start_time.
     ``game_state`` fully replaces the current run-state when provided.
+
+    ``is_valid`` only checks the envelope; the activities are validated a
+    chunk at a time by ``iter_activities`` while they are being imported.
+    Version 2 (NDJSON) uploads are parsed by ``NDJSONImportParser`` and
+    validated the same way.
     """
+
+    # Activities plus occurances validated per chunk
+    CHUNK_SIZE = 5000
+
     version = serializers.IntegerField(default=1)
-    activities = ActivityImportSerializer(many=True, required=False, default=list)
+    activities = serializers.ListField(
+        child=serializers.DictField(), required=False, default=list
+    )
     game_state = GameStateImportSerializer(required=False, allow_null=True, default=None)
 
+    def iter_activities(
+        self, activities: Iterable[dict] | None = None, chunk_size: int = CHUNK_SIZE
+    ) -> Iterator[dict]:
+        """Yield each activity validated by ``ActivityImportSerializer``.
+
+        ``activities`` defaults to the validated payload's; a version 2 upload
+        passes its lazily parsed activities instead. Once an activity is
+        invalid nothing more is yielded, and after the last one
+        ``ValidationError`` is raised with every activity's errors, shaped as
+        validating them all at once would shape them.
+        """
+        if activities is None:
+            activities = self.validated_data["activities"]
+        failures: dict[int, dict] = {}
+        aligned = True
+        chunk: list[dict] = []
+        start = rows = 0
+        for activity in activities:
+            chunk.append(activity)
+            occurances = (
+                activity.get("occurances") if isinstance(activity, dict) else None
+            )
+            rows += 1 + (len(occurances) if isinstance(occurances, list) else 0)
+            if rows >= chunk_size:
+                aligned &= self._validate_chunk(chunk, start, failures)
+                if not failures:
+                    yield from chunk
+                start += len(chunk)
+                chunk = []
+                rows = 0
+        if chunk:
+            aligned &= self._validate_chunk(chunk, start, failures)
+            if not failures:
+                yield from chunk
+            start += len(chunk)
+        if failures:
+            # older DRF versions give a list aligned with the input, newer
+            # ones a dict of just the failures
+            errors = (
+                [failures.get(index, {}) for index in range(start)]
+                if aligned
+                else failures
+            )
+            raise serializers.ValidationError({"activities": errors})
+
+    def _validate_chunk(
+        self, activities: list[dict], offset: int, failures: dict[int, dict]
+    ) -> bool:
+        """Replace ``activities`` with their validated data, or add their
+        errors to ``failures`` by index in the upload. Returns whether DRF
+        aligned the errors with the input."""
+        chunk = ActivityImportSerializer(data=activities, many=True)
+        if chunk.is_valid():
+            activities[:] = chunk.validated_data
+            return True
+        errors = chunk.errors
+        indexed = errors.items() if isinstance(errors, dict) else enumerate(errors)
+        failures.update({offset + index: error for index, error in indexed if error})
+        return not isinstance(errors, dict)
+
 
 class OccuranceExportSerializer(serializers.ModelSerializer):
     class Meta: # type: ignore
@@ -289,3 +482,28 @@ class DataImportResultSerializer(serializers.Serializer):
     activities_updated = serializers.IntegerField()
     occurances_added = serializers.IntegerField()
     game_state_updated = serializers.BooleanField()
+
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(source="current_progress", read_only=True)
+
+    class Meta:  # type: ignore
+        model = models.Job
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "params",
+            "progress",
+            "total",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+
+class JobExportSerializer(serializers.Serializer):
+    version = serializers.ChoiceField(choices=[1, 2], default=1)
@@ -2,10 +2,27 @@ from __future__ import annotations
 
 import datetime
 import enum
+import itertools
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import asdict, dataclass, field, fields
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
-from do_again_list import models, serializers
+from do_again_list import (
+    analytics,
+    durations,
+    events,
+    jsonlib,
+    models,
+    ndjson,
+    serializers,
+    stats,
+)
+from do_again_list.conf import settings
+from do_again_list.parsers import StreamedImport
+from do_again_list.repositories import GameStateRepository
 
 # Title of the built-in activity that is triggered when a new Activity is added.
 ADD_TO_LIST_TITLE = "Add to list"
@@ -93,14 +110,35 @@ class GameEffect:
     pending_fatigue: bool = False
     resource_ref: ResourceRef | None = None
 
+    def __add__(self, other: GameEffect) -> GameEffect:
+        """Combine the effects of several actions into one response.
+
+        The game state deltas are summed with ``Addable.__add__``; flags are
+        OR-ed, lists concatenated, and the later enemy/resource wins.
+        """
+        self.game_state_delta += other.game_state_delta
+        self.spawn_enemy = other.spawn_enemy or self.spawn_enemy
+        self.hero_buffs += other.hero_buffs
+        self.reset_streak |= other.reset_streak
+        self.messages += other.messages
+        self.pending_heal |= other.pending_heal
+        self.pending_fatigue |= other.pending_fatigue
+        self.resource_ref = other.resource_ref or self.resource_ref
+        return self
+
 
 class ActivityLifecycleException(Exception):
     pass
 
 
+# the ActivitySerializer fields starting or ending an activity changes
+_TIME_FIELDS = ("state", "start_time", "end_time")
+
+
 class ActivityService:
     def create(self, serializer: serializers.ActivitySerializer, owner) -> GameEffect:
         instance = serializer.save(owner=owner)
+        events.activity_changed(instance)
 
         # Auto-complete the "Add to List" built-in activity
         add_to_list = models.Activity.objects.filter(
@@ -116,16 +154,6 @@ class ActivityService:
         effect.resource_ref = ResourceRef(klass="Activity", pk=instance.pk)
         return effect
 
-    def _get_latest_completed_occurrance(
-        self, activity: models.Activity
-    ) -> models.Occurance | None:
-        try:
-            return models.Occurance.objects.filter(
-                activity=activity, end_time__isnull=False
-            ).latest("end_time")
-        except models.Occurance.DoesNotExist:
-            return None
-
     def start(
         self, *, activity: models.Activity, start_time: datetime.datetime, **kwargs
     ) -> GameEffect:
@@ -148,6 +176,12 @@ class ActivityService:
         occurance.start_time = start_time
         occurance.save()
 
+        activity.state = models.Activity.State.ACTIVE
+        activity.current_start_time = start_time
+        activity.current_end_time = None
+        activity.save(update_fields=models.OCCURANCE_SUMMARY_FIELDS)
+        events.activity_changed(activity, _TIME_FIELDS)
+
         return game_effect
 
     def end(
@@ -166,13 +200,10 @@ class ActivityService:
         if activity.is_break and activity.impulse_resisted_count > 0:
             game_effect.game_state_delta.souls += activity.impulse_resisted_count
             activity.impulse_resisted_count = 0
-        latest_completed_occurance = self._get_latest_completed_occurrance(
-            activity=activity
-        )
+        previous_completed_end_time = activity.last_completed_end_time
 
         previous_next_time = activity.next_time
         activity.next_time = next_time
-        activity.save()
         try:
             occurance = models.Occurance.objects.get(activity=activity, end_time=None)
         except models.Occurance.DoesNotExist:
@@ -187,19 +218,62 @@ class ActivityService:
         occurance.end_time = end_time
         occurance.save()
 
-        interval_ok = True
-        duration_ok = True
+        if (
+            previous_completed_end_time is None
+            or end_time >= previous_completed_end_time
+        ):
+            activity.state = models.Activity.State.INACTIVE
+            activity.current_start_time = occurance.start_time
+            activity.current_end_time = end_time
+            activity.last_completed_end_time = end_time
+        else:
+            # back-dated completion, the latest occurance is an older one
+            activity.refresh_occurance_summary(save=False)
+        # suggest when it's next due from the history, this completion
+        # included; kept apart from next_time, so it's never scored
+        activity.predicted_next_time = (
+            analytics.predict_next_time(activity)
+            if settings.DO_AGAIN_LIST_PREDICT_NEXT_TIME
+            else None
+        )
+        activity.save()
+        events.activity_changed(
+            activity,
+            (
+                *_TIME_FIELDS,
+                "next_time",
+                "predicted_next_time",
+                "impulse_resisted_count",
+            ),
+        )
+        events.occurance_ended(occurance, owner_id=activity.owner_id)
+
+        on_time = stats.is_on_time(
+            start_time=occurance.start_time,
+            end_time=end_time,
+            planned_time=previous_next_time,
+            previous_end_time=previous_completed_end_time,
+            max_time_between_events=activity.max_time_between_events,
+        )
+        self._record_completion(
+            activity=activity,
+            interval=end_time - previous_completed_end_time
+            if previous_completed_end_time is not None
+            and end_time >= previous_completed_end_time
+            else None,
+            on_time=on_time,
+        )
+        self._record_daily_rollup(
+            activity=activity,
+            day=timezone.localdate(end_time),
+            duration=end_time - occurance.start_time,
+        )
+
         # Apply bonuses
-        if previous_next_time is not None:
-            # compare when this occurance was scheduled to begin
-            interval_ok = occurance.start_time < previous_next_time
+        interval_ok = on_time is not False
+        duration_ok = True
         if activity.min_duration is not None:
             duration_ok = end_time - occurance.start_time >= activity.min_duration
-        if latest_completed_occurance is not None:
-            # compare when this occurance _ought_ to occur absent an explicit schedule
-            time_since_last_occurance = end_time - latest_completed_occurance.end_time # type: ignore
-            if activity.max_time_between_events is not None:
-                interval_ok &= time_since_last_occurance <= activity.max_time_between_events
 
         stat_modifier = StatModifier()
         buff_label = activity.title + f" [{activity.moral_quality}]"
@@ -241,12 +315,61 @@ class ActivityService:
         # Quest token is awarded when the spawned enemy is killed (handled client-side)
         return game_effect
 
+    def _record_completion(
+        self,
+        *,
+        activity: models.Activity,
+        interval: datetime.timedelta | None,
+        on_time: bool | None,
+    ) -> None:
+        with transaction.atomic():
+            activity_stats, _ = (
+                models.ActivityStats.objects.select_for_update().get_or_create(
+                    activity=activity
+                )
+            )
+            stats.record_completion(activity_stats, interval=interval, on_time=on_time)
+            activity_stats.save()
+
+    def _record_daily_rollup(
+        self,
+        *,
+        activity: models.Activity,
+        day: datetime.date,
+        duration: datetime.timedelta,
+    ) -> None:
+        rollups = models.DailyRollup.objects.filter(activity=activity, day=day)
+        # a single UPDATE in the common case; the row is created on the
+        # day's first completion
+        if rollups.update(
+            count=F("count") + 1, total_duration=F("total_duration") + duration
+        ):
+            return
+        with transaction.atomic():
+            rollup, created = (
+                models.DailyRollup.objects.select_for_update().get_or_create(
+                    activity=activity,
+                    day=day,
+                    defaults={
+                        "owner_id": activity.owner_id,
+                        "count": 1,
+                        "total_duration": duration,
+                    },
+                )
+            )
+            if not created:
+                # lost the race to create it
+                rollup.count += 1
+                rollup.total_duration += duration
+                rollup.save(update_fields=["count", "total_duration"])
+
     def set_next(
         self, *, activity: models.Activity, next_time: datetime.datetime, **kwargs
     ) -> GameEffect:
         game_effect = GameEffect()
         activity.next_time = next_time
         activity.save()
+        events.activity_changed(activity, ["next_time"])
         return game_effect
 
 
@@ -254,17 +377,148 @@ class GameStateService:
     def update(
         self, *, game_state: models.GameState, game_effect: GameEffect
     ) -> models.GameState:
-        for _field in models.GameState._meta.get_fields():
-            try:
-                delta = getattr(game_effect.game_state_delta, _field.name)
-            except AttributeError:
-                continue
-            setattr(game_state, _field.name, getattr(game_state, _field.name) + delta)
+        """Apply ``game_effect`` as a single ``UPDATE ... SET col = col + delta``
+        touching only the columns that change, so concurrent requests can't
+        overwrite each other's deltas."""
+        values: dict = {}
+        for _field in fields(GameStateDelta):
+            delta = getattr(game_effect.game_state_delta, _field.name)
+            if delta:
+                values[_field.name] = F(_field.name) + delta
         if game_effect.reset_streak:
-            game_state.streak = 0
-        game_state.save()
+            values["streak"] = 0
+        if values:
+            GameStateRepository().update(game_state.owner_id, **values)
+        if game_effect.game_state_delta.xp:
+            self._resolve_level_ups(game_state=game_state)
+        elif values:
+            game_state.refresh_from_db(fields=list(values))
         return game_state
 
+    def sync(
+        self,
+        *,
+        owner,
+        gold: int,
+        xp: int,
+        streak: int,
+        hero_hp: int,
+        quest_tokens: int,
+    ) -> models.GameState:
+        """Apply battle results reported by the client."""
+        repository = GameStateRepository()
+        if xp > 0:
+            # XP may level the hero up, which needs the current row
+            repository.get(owner)
+            with transaction.atomic():
+                game_state = models.GameState.objects.select_for_update().get(
+                    owner=owner
+                )
+                game_state.gold += gold
+                game_state.quest_tokens += quest_tokens
+                game_state.streak = streak
+                game_state.hero_hp = hero_hp
+                game_state.add_xp(xp + game_state.consume_bonus_xp())
+                repository.save(game_state, update_fields=_SYNC_FIELDS)
+            return game_state
+        values = {
+            "gold": F("gold") + gold,
+            "quest_tokens": F("quest_tokens") + quest_tokens,
+            "streak": streak,
+            "hero_hp": hero_hp,
+        }
+        if not repository.update(owner.pk, **values):
+            # first write for this user
+            repository.get(owner)
+            repository.update(owner.pk, **values)
+        return models.GameState.objects.get(owner=owner)
+
+    def spend(
+        self,
+        *,
+        owner,
+        currency: str,
+        cost: int,
+        expected: dict | None = None,
+        **values,
+    ) -> models.GameState | None:
+        """Take ``cost`` from the ``currency`` field (``souls`` or
+        ``quest_tokens``) and set ``values``, in one UPDATE that only matches
+        while the balance covers the cost and the fields in ``expected``
+        still hold those values. Returns the new state, or None if nothing
+        was spent."""
+        updated = GameStateRepository().update(
+            owner.pk,
+            condition=Q(**{f"{currency}__gte": cost}, **(expected or {})),
+            **{currency: F(currency) - cost},
+            **values,
+        )
+        if not updated:
+            return None
+        return models.GameState.objects.get(owner=owner)
+
+    def run_over(self, *, owner) -> tuple[models.GameState, int, int]:
+        """End the current run: convert progress to souls, then wipe
+        run-local state, on the locked row. Returns the new state, the souls
+        earned and the level reached."""
+        repository = GameStateRepository()
+        with transaction.atomic():
+            game_state = repository.get_current(owner, lock=True)
+            level_reached = game_state.level
+            souls_earned = game_state.souls_for_run()
+            game_state.souls += souls_earned
+            # Reset run-local state
+            game_state.xp = 0
+            game_state.gold = 0
+            game_state.level = 1
+            game_state.base_attack = 1
+            game_state.base_defense = 0
+            game_state.base_speed = 1
+            game_state.streak = 0
+            game_state.items = []
+            game_state.hero_hp = -1
+            repository.save(
+                game_state,
+                update_fields=[
+                    "souls",
+                    "xp",
+                    "gold",
+                    "level",
+                    "base_attack",
+                    "base_defense",
+                    "base_speed",
+                    "streak",
+                    "items",
+                    "hero_hp",
+                ],
+            )
+        return game_state, souls_earned, level_reached
+
+    def _resolve_level_ups(self, *, game_state: models.GameState) -> None:
+        """Level the hero up for any XP past the threshold under a row lock,
+        then refresh ``game_state`` from the database."""
+        with transaction.atomic():
+            locked = (
+                models.GameState.objects.select_for_update()
+                .only("owner", "xp", "level")
+                .get(pk=game_state.pk)
+            )
+            if locked.add_xp(0):
+                GameStateRepository().save(locked, update_fields=["xp", "level"])
+        game_state.refresh_from_db()
+
+
+_SYNC_FIELDS = (
+    "gold",
+    "quest_tokens",
+    "streak",
+    "hero_hp",
+    "xp",
+    "level",
+    "bonus_xp",
+    "bonus_xp_updated_at",
+)
+
 
 # ─── Import / Export ─────────────────────────────────────────────────────────
 
@@ -311,110 +565,360 @@ _GAME_STATE_FIELDS = (
 )
 
 
+# Called with the number of activities processed so far
+ProgressCallback = Callable[[int], None]
+
+_EXPORT_DURATION_FIELDS = (
+    "default_duration",
+    "min_duration",
+    "max_time_between_events",
+)
+# in the order they're exported
+_EXPORT_ACTIVITY_FIELDS = (
+    "title",
+    "display_name",
+    "code_name",
+    "ordering",
+    "next_time",
+    "value",
+    "repeats",
+    "is_built_in",
+    *_EXPORT_DURATION_FIELDS,
+)
+
+
+def _occurance_dict(row: ndjson.OccuranceRow) -> dict:
+    planned_time, start_time, end_time = row
+    return {
+        "planned_time": planned_time.isoformat() if planned_time else None,
+        "start_time": start_time.isoformat() if start_time else None,
+        "end_time": end_time.isoformat() if end_time else None,
+    }
+
+
 class DataImportExportService:
+    # Rows fetched per query while exporting
+    EXPORT_CHUNK_SIZE = 2000
+    # Bytes of JSON collected before a streamed chunk is handed to the server
+    EXPORT_BUFFER_SIZE = 64 * 1024
+    # Activities plus occurances written per batch while importing
+    IMPORT_BATCH_SIZE = 1000
+
     def export(self, owner) -> dict:
-        from django.utils import timezone
+        return {
+            **self._export_header(owner),
+            "activities": [
+                {**activity_dict, "occurances": [_occurance_dict(row) for row in rows]}
+                for activity_dict, rows in self._iter_export_activities(owner)
+            ],
+            "game_state": self._export_game_state(owner),
+        }
 
-        activities = (
-            models.Activity.objects.filter(owner=owner)
-            .prefetch_related("occurances")
-            .order_by("ordering", "pk")
+    def iter_export(
+        self,
+        owner,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        on_progress: ProgressCallback | None = None,
+    ) -> Iterator[str]:
+        """Yield the same document as ``export`` as JSON text.
+
+        Neither the document nor any one activity's history is ever held in
+        memory whole, so memory use does not grow with the size of the history.
+        ``on_progress`` is called with the number of activities written so far.
+        """
+        buffer: list[str] = []
+        buffered = 0
+        for piece in self._iter_export_json(owner, chunk_size, on_progress):
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= self.EXPORT_BUFFER_SIZE:
+                yield "".join(buffer)
+                buffer.clear()
+                buffered = 0
+        yield "".join(buffer)
+
+    def _iter_export_json(
+        self, owner, chunk_size: int, on_progress: ProgressCallback | None
+    ) -> Iterator[str]:
+        yield jsonlib.dumps_text(self._export_header(owner))[:-1] + ', "activities": ['
+        for index, (activity_dict, rows) in enumerate(
+            self._iter_export_activities(owner, chunk_size, on_progress)
+        ):
+            yield ("," if index else "") + jsonlib.dumps_text(activity_dict)[:-1]
+            yield ', "occurances": ['
+            for row_index, row in enumerate(rows):
+                yield ("," if row_index else "") + jsonlib.dumps_text(
+                    _occurance_dict(row)
+                )
+            yield "]}"
+        yield (
+            '], "game_state": '
+            + jsonlib.dumps_text(self._export_game_state(owner))
+            + "}"
         )
-        game_state, _ = models.GameState.objects.get_or_create(owner=owner)
-
-        activity_data = []
-        for activity in activities:
-            occurances = [
-                {
-                    "planned_time": o.planned_time.isoformat() if o.planned_time else None,
-                    "start_time": o.start_time.isoformat() if o.start_time else None,
-                    "end_time": o.end_time.isoformat() if o.end_time else None,
-                }
-                for o in activity.occurances.order_by("start_time")
-            ]
-            duration_fields = (
-                "default_duration",
-                "min_duration",
-                "max_time_between_events",
-            )
-            from do_again_list.utils import humanize_timedelta
-
-            activity_dict: dict = {
-                "title": activity.title,
-                "display_name": activity.display_name,
-                "code_name": activity.code_name,
-                "ordering": activity.ordering,
-                "next_time": activity.next_time.isoformat() if activity.next_time else None,
-                "value": activity.value,
-                "repeats": activity.repeats,
-                "is_built_in": activity.is_built_in,
-                "occurances": occurances,
+
+    def iter_export_ndjson(
+        self,
+        owner,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        on_progress: ProgressCallback | None = None,
+    ) -> Iterator[bytes]:
+        """Yield the version 2 export (see ``do_again_list.ndjson``), gzipped."""
+        return ndjson.gzip_chunks(
+            self._iter_export_ndjson_lines(owner, chunk_size, on_progress),
+            self.EXPORT_BUFFER_SIZE,
+        )
+
+    def _iter_export_ndjson_lines(
+        self, owner, chunk_size: int, on_progress: ProgressCallback | None
+    ) -> Iterator[str]:
+        yield ndjson.dumps(
+            {
+                **self._export_header(owner, version=ndjson.VERSION),
+                "game_state": self._export_game_state(owner),
             }
-            for field_name in duration_fields:
-                val = getattr(activity, field_name)
-                activity_dict[field_name] = humanize_timedelta(val) if val is not None else None
-            activity_data.append(activity_dict)
+        )
+        for activity_dict, rows in self._iter_export_activities(
+            owner, chunk_size, on_progress
+        ):
+            activity_dict["occurances"] = ndjson.encode_occurances(rows)
+            yield ndjson.dumps(activity_dict)
 
+    def _export_header(self, owner, version: int = 1) -> dict:
         return {
-            "version": 1,
+            "version": version,
             "exported_at": timezone.now().isoformat(),
             "user": {
                 "username": owner.username,
                 "email": owner.email,
             },
-            "activities": activity_data,
-            "game_state": {field_name: getattr(game_state, field_name) for field_name in _GAME_STATE_FIELDS},
         }
 
-    def do_import(self, *, owner, validated_data: dict) -> DataImportResult:
-        result = DataImportResult()
-
-        for activity_data in validated_data.get("activities", []):
-            occurances_data = activity_data.pop("occurances", [])
-            title = activity_data["title"]
+    def _export_game_state(self, owner) -> dict:
+        game_state, _ = GameStateRepository().get(owner)
+        return {field_name: getattr(game_state, field_name) for field_name in _GAME_STATE_FIELDS}
 
-            activity, created = models.Activity.objects.get_or_create(
-                owner=owner,
-                title=title,
-                defaults={k: activity_data.get(k) for k in _ACTIVITY_FIELDS},
+    def _iter_export_activities(
+        self,
+        owner,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        on_progress: ProgressCallback | None = None,
+    ) -> Iterator[tuple[dict, Iterator[ndjson.OccuranceRow]]]:
+        """Yield each activity's fields with an iterator over its occurances'
+        ``(planned_time, start_time, end_time)``.
+
+        Activities are read joined to their occurances, one row per occurance
+        ordered by activity then start time, through a single cursor rather
+        than prefetched, so a single activity with a very long history is
+        streamed too. Being one query, it reads one snapshot: activities
+        reordered or added meanwhile can't split an activity from its
+        occurances. Each occurance iterator is only valid until the next
+        activity is requested.
+        """
+        rows = (
+            models.Activity.objects.filter(owner=owner)
+            .order_by("ordering", "pk", "occurances__start_time")
+            .values_list(
+                "pk",
+                *_EXPORT_ACTIVITY_FIELDS,
+                "occurances__planned_time",
+                "occurances__start_time",
+                "occurances__end_time",
+            )
+            .iterator(chunk_size=chunk_size)
+        )
+        fields_end = 1 + len(_EXPORT_ACTIVITY_FIELDS)
+        for exported, (_, activity_rows) in enumerate(
+            itertools.groupby(rows, key=lambda row: row[0]), start=1
+        ):
+            first = next(activity_rows)
+            activity_dict = dict(zip(_EXPORT_ACTIVITY_FIELDS, first[1:fields_end]))
+            if activity_dict["next_time"] is not None:
+                activity_dict["next_time"] = activity_dict["next_time"].isoformat()
+            for field_name in _EXPORT_DURATION_FIELDS:
+                val = activity_dict[field_name]
+                activity_dict[field_name] = (
+                    durations.humanize(val) if val is not None else None
+                )
+            # an activity without occurances is one row of nulls
+            occurances = (
+                row[fields_end:]
+                for row in itertools.chain([first], activity_rows)
+                if row[fields_end + 1] is not None
             )
+            # groupby skips whatever the caller leaves unread
+            yield activity_dict, occurances
+            if on_progress is not None:
+                on_progress(exported)
 
-            if created:
+    def import_upload(
+        self,
+        *,
+        owner,
+        upload: dict | StreamedImport,
+        on_progress: ProgressCallback | None = None,
+    ) -> DataImportResult:
+        """Validate and import a parsed upload: a version 1 document, or a
+        version 2 one from ``NDJSONImportParser``."""
+        activities = None
+        whole_seconds = isinstance(upload, StreamedImport)
+        if isinstance(upload, StreamedImport):
+            upload, activities = upload.envelope, upload.activities
+        serializer = serializers.DataImportSerializer(data=upload)
+        serializer.is_valid(raise_exception=True)
+        return self.do_import(
+            owner=owner,
+            activities=serializer.iter_activities(activities),
+            game_state=serializer.validated_data["game_state"],
+            on_progress=on_progress,
+            whole_seconds=whole_seconds,
+        )
+
+    def do_import(
+        self,
+        *,
+        owner,
+        activities: Iterable[dict],
+        game_state: dict | None = None,
+        on_progress: ProgressCallback | None = None,
+        whole_seconds: bool = False,
+    ) -> DataImportResult:
+        """Merge validated activity dicts (see ``DataImportSerializer``) into
+        ``owner``'s data.
+
+        Occurances are deduplicated by start time. With ``whole_seconds``,
+        for uploads whose times were rounded (version 2 exports), stored
+        occurances match them to the second.
+
+        ``activities`` may be a lazy iterable; it is consumed in batches of
+        about ``IMPORT_BATCH_SIZE`` activities plus occurances, each written
+        with a handful of bulk queries. Everything happens in one transaction,
+        so an error anywhere, including a validation error raised while
+        ``activities`` is consumed, leaves the user's data untouched.
+        ``on_progress`` is called with the number of activities imported so far.
+        """
+        result = DataImportResult()
+        with transaction.atomic():
+            by_title: dict[str, models.Activity] = {}
+            for activity in models.Activity.objects.filter(owner=owner).order_by("-pk"):
+                # the oldest of any duplicate titles wins
+                by_title[activity.title] = activity
+
+            batch: list[dict] = []
+            rows = imported = 0
+            for activity_data in activities:
+                batch.append(activity_data)
+                rows += 1 + len(activity_data.get("occurances", []))
+                if rows >= self.IMPORT_BATCH_SIZE:
+                    self._import_batch(owner, batch, by_title, result, whole_seconds)
+                    imported += len(batch)
+                    if on_progress is not None:
+                        on_progress(imported)
+                    batch = []
+                    rows = 0
+            if batch:
+                self._import_batch(owner, batch, by_title, result, whole_seconds)
+                if on_progress is not None:
+                    on_progress(imported + len(batch))
+
+            if game_state:
+                repository = GameStateRepository()
+                game_state_obj = repository.get_current(owner, lock=True)
+                for field_name in _GAME_STATE_FIELDS:
+                    if field_name in game_state:
+                        setattr(game_state_obj, field_name, game_state[field_name])
+                repository.save(game_state_obj)
+                result.game_state_updated = True
+            events.data_imported(owner.pk)
+
+        return result
+
+    def _import_batch(
+        self,
+        owner,
+        batch: list[dict],
+        by_title: dict[str, models.Activity],
+        result: DataImportResult,
+        whole_seconds: bool = False,
+    ) -> None:
+        now = timezone.now()
+        to_create: list[models.Activity] = []
+        to_update: dict[int, models.Activity] = {}
+        entries: list[tuple[models.Activity, list[dict]]] = []
+        for activity_data in batch:
+            title = activity_data["title"]
+            activity_fields = {
+                field_name: activity_data[field_name]
+                for field_name in _ACTIVITY_FIELDS
+                if field_name in activity_data
+            }
+            activity = by_title.get(title)
+            if activity is None:
+                activity = models.Activity(owner=owner, title=title, **activity_fields)
+                by_title[title] = activity
+                to_create.append(activity)
                 result.activities_created += 1
             else:
-                for field_name in _ACTIVITY_FIELDS:
-                    if field_name in activity_data:
-                        setattr(activity, field_name, activity_data[field_name])
-                activity.save()
+                for field_name, value in activity_fields.items():
+                    setattr(activity, field_name, value)
+                if activity.pk is not None:
+                    to_update[activity.pk] = activity
                 result.activities_updated += 1
+            # the bulk writes skip Activity.save(), which defaults this
+            activity.display_name = activity.display_name or activity.title
+            entries.append((activity, activity_data.get("occurances", [])))
+
+        models.Activity.objects.bulk_create(
+            to_create, batch_size=self.IMPORT_BATCH_SIZE
+        )
+        for activity in to_update.values():
+            activity.updated_at = now
+        models.Activity.objects.bulk_update(
+            to_update.values(),
+            [*_ACTIVITY_FIELDS, "updated_at"],
+            batch_size=self.IMPORT_BATCH_SIZE,
+        )
 
-            # Deduplicate occurrences by start_time
-            existing_start_times = set(
-                models.Occurance.objects.filter(activity=activity).values_list(
-                    "start_time", flat=True
+        # Deduplicate occurrences by start_time, against the database and
+        # against earlier entries in the upload
+        start_times: dict[int, set] = defaultdict(set)
+        open_activity_ids: set[int] = set()
+        for activity_id, start_time, end_time in models.Occurance.objects.filter(
+            activity_id__in={activity.pk for activity, _ in entries}
+        ).values_list("activity_id", "start_time", "end_time"):
+            if whole_seconds:
+                start_time = start_time.replace(microsecond=0)
+            start_times[activity_id].add(start_time)
+            if end_time is None:
+                open_activity_ids.add(activity_id)
+
+        new_occurances = []
+        for activity, occurances_data in entries:
+            for o in occurances_data:
+                if o["start_time"] in start_times[activity.pk]:
+                    continue
+                if o.get("end_time") is None:
+                    # only one occurance per activity may be in progress
+                    if activity.pk in open_activity_ids:
+                        continue
+                    open_activity_ids.add(activity.pk)
+                start_times[activity.pk].add(o["start_time"])
+                new_occurances.append(
+                    models.Occurance(
+                        activity=activity,
+                        planned_time=o.get("planned_time"),
+                        start_time=o["start_time"],
+                        end_time=o.get("end_time"),
+                    )
                 )
+        if new_occurances:
+            models.Occurance.objects.bulk_create(
+                new_occurances, batch_size=self.IMPORT_BATCH_SIZE
             )
-            new_occurances = [
-                models.Occurance(
-                    activity=activity,
-                    planned_time=o.get("planned_time"),
-                    start_time=o["start_time"],
-                    end_time=o.get("end_time"),
-                )
-                for o in occurances_data
-                if o["start_time"] not in existing_start_times
-            ]
-            if new_occurances:
-                models.Occurance.objects.bulk_create(new_occurances)
-                result.occurances_added += len(new_occurances)
-
-        game_state_data = validated_data.get("game_state")
-        if game_state_data:
-            game_state, _ = models.GameState.objects.get_or_create(owner=owner)
-            for field_name in _GAME_STATE_FIELDS:
-                if field_name in game_state_data:
-                    setattr(game_state, field_name, game_state_data[field_name])
-            game_state.save()
-            result.game_state_updated = True
-
-        return result
+            result.occurances_added += len(new_occurances)
+            touched = models.Activity.objects.filter(
+                pk__in={o.activity_id for o in new_occurances}
+            )
+            touched.refresh_occurance_summaries()
+            touched.refresh_stats()
+            touched.refresh_daily_rollups()
@@ -0,0 +1,127 @@
+"""
+Per-activity completion statistics (``models.ActivityStats``).
+
+``ActivityService.end`` updates them with ``record_completion`` in constant
+time, so nothing ever scans an activity's history to report them.
+``replay`` rebuilds them from the history instead, for occurances written
+some other way (imports, the admin).
+
+The median interval comes from a histogram with logarithmic buckets,
+``BUCKETS_PER_DOUBLING`` per power of two seconds, so it is exact to
+within about 9% while its size only grows with the longest interval.
+A completion is on time if it started before the activity's planned
+``next_time`` and came within ``max_time_between_events`` of the previous
+one, whichever of the two applies; streaks count consecutive on-time
+completions and ignore completions with neither.
+
+A back-dated completion (ending before the latest one) is counted, but
+adds no interval until the stats are rebuilt.
+"""
+
+import datetime
+import itertools
+import math
+from collections.abc import Iterable
+from typing import Protocol
+
+BUCKETS_PER_DOUBLING = 4
+
+# (planned_time, start_time, end_time) of a completed occurance
+Completion = tuple[datetime.datetime | None, datetime.datetime, datetime.datetime]
+
+
+class Stats(Protocol):
+    completion_count: int
+    interval_count: int
+    interval_total: datetime.timedelta
+    interval_histogram: list[int]
+    scheduled_count: int
+    on_time_count: int
+    current_streak: int
+    best_streak: int
+
+
+def interval_bucket(interval: datetime.timedelta) -> int:
+    seconds = interval.total_seconds()
+    if seconds < 1:
+        return 0
+    return int(math.log2(seconds) * BUCKETS_PER_DOUBLING)
+
+
+def histogram_median(histogram: list[int]) -> datetime.timedelta | None:
+    """The midpoint of the bucket holding the median, or None if empty."""
+    half = sum(histogram) / 2
+    if not half:
+        return None
+    for bucket, seen in enumerate(itertools.accumulate(histogram)):
+        if seen >= half:
+            break
+    return datetime.timedelta(seconds=2 ** ((bucket + 0.5) / BUCKETS_PER_DOUBLING))
+
+
+def is_on_time(
+    *,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    planned_time: datetime.datetime | None,
+    previous_end_time: datetime.datetime | None,
+    max_time_between_events: datetime.timedelta | None,
+) -> bool | None:
+    """Whether a completion kept to its schedule, or None if it had none."""
+    has_interval = previous_end_time is not None and max_time_between_events is not None
+    if planned_time is None and not has_interval:
+        return None
+    on_time = True
+    if planned_time is not None:
+        # compare when this occurance was scheduled to begin
+        on_time = start_time < planned_time
+    if has_interval:
+        # compare when this occurance _ought_ to occur absent an explicit schedule
+        on_time &= end_time - previous_end_time <= max_time_between_events
+    return on_time
+
+
+def record_completion(
+    stats: Stats, *, interval: datetime.timedelta | None, on_time: bool | None
+) -> None:
+    stats.completion_count += 1
+    if interval is not None:
+        stats.interval_count += 1
+        stats.interval_total += interval
+        bucket = interval_bucket(interval)
+        histogram = stats.interval_histogram
+        if bucket >= len(histogram):
+            histogram.extend([0] * (bucket + 1 - len(histogram)))
+        histogram[bucket] += 1
+    if on_time is not None:
+        stats.scheduled_count += 1
+        if on_time:
+            stats.on_time_count += 1
+            stats.current_streak += 1
+            stats.best_streak = max(stats.best_streak, stats.current_streak)
+        else:
+            stats.current_streak = 0
+
+
+def replay(
+    stats: Stats,
+    completions: Iterable[Completion],
+    max_time_between_events: datetime.timedelta | None,
+) -> None:
+    """Record ``completions``, ordered by end_time, onto empty ``stats``."""
+    previous_end_time = None
+    for planned_time, start_time, end_time in completions:
+        record_completion(
+            stats,
+            interval=None
+            if previous_end_time is None
+            else end_time - previous_end_time,
+            on_time=is_on_time(
+                start_time=start_time,
+                end_time=end_time,
+                planned_time=planned_time,
+                previous_end_time=previous_end_time,
+                max_time_between_events=max_time_between_events,
+            ),
+        )
+        previous_end_time = end_time
@@ -10,6 +10,10 @@ router.register(r"activities", views.ActivityViewSet)
 router.register(r"occurances", views.OccuranceViewSet)
 router.register(r"game", views.GameStateViewSet)
 router.register(r"data", views.DataImportExportView, basename="data")
+router.register(r"changes", views.ChangesViewSet, basename="changes")
+router.register(r"jobs", views.JobViewSet, basename="jobs")
+router.register(r"heatmap", views.HeatmapViewSet, basename="heatmap")
+router.register(r"metrics", views.MetricsViewSet, basename="metrics")
 
 # === LEGACY === #
 
@@ -20,4 +24,5 @@ urlpatterns = [
     ),
     path("api/auth/login/", views.api_auth_login, name="do_again_api_auth_login"),
     path("api/auth/logout/", views.api_auth_logout, name="do_again_api_auth_logout"),
+    path("api/events/", views.event_stream, name="do_again_api_events"),
 ]
@@ -1,28 +1,107 @@
-import json
-from dataclasses import asdict
+import dataclasses
+import datetime
+import hashlib
+import io
+from collections.abc import AsyncIterator, Callable, Iterable, Sequence
 from typing import Any, cast
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
 # from django.db.models.manager import BaseManager
+from django.db.models import Count, Max, Sum
 from django.db.models.query import QuerySet
-from django.http import JsonResponse
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseBase,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_GET, require_POST
 from django_filters import rest_framework as filters
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound, UnsupportedMediaType, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
-
-from . import serializers, services
-from .models import Activity, GameState, Occurance
+from rest_framework.settings import api_settings
+
+from . import (
+    analytics,
+    events,
+    jobs,
+    jsonlib,
+    metrics,
+    pagination,
+    parsers,
+    repositories,
+    responses,
+    serializers,
+    services,
+)
+from .conf import settings
+from .models import (
+    Activity,
+    ActivityStats,
+    DailyRollup,
+    DeletedActivity,
+    GameState,
+    Job,
+    Occurance,
+    Operation,
+)
 
 # === Django Rest Framework Viewsets === #
 
 
+def conditional_response(
+    request: Request,
+    *,
+    version: object,
+    last_modified: datetime.datetime | None,
+    build: Callable[[], HttpResponseBase],
+) -> HttpResponseBase:
+    """Answer with 304 Not Modified when the client already holds ``version``.
+
+    ``version`` must change whenever the response body would, so the list
+    endpoints pass the newest ``updated_at`` plus a row count (the count
+    catches deletes, which leave no newer timestamp behind), or for a page,
+    the ids and timestamps of its rows. The ETag also
+    covers the user and the full path, so filtered and paginated variants
+    are validated independently. ``build`` only runs on a cache miss.
+
+    ``Last-Modified`` is sent for information only: it has one-second
+    resolution and misses deletes, so ``If-Modified-Since`` is not honoured.
+    """
+    digest = hashlib.md5(
+        f"{request.user.pk}:{request.get_full_path()}:{version}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    etag = quote_etag(digest)
+    last_modified_timestamp = (
+        int(last_modified.timestamp()) if last_modified is not None else None
+    )
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response["ETag"] = etag
+    if last_modified_timestamp is not None:
+        response["Last-Modified"] = http_date(last_modified_timestamp)
+    # Always revalidate: the data is per-user and changes at any time.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 class ActivityFilter(filters.FilterSet):
     """
     These can be refined a lot more, but first we should sort out the types
@@ -42,46 +121,51 @@ class ActivityFilter(filters.FilterSet):
         ]
 
 
+# States from which each activity action may be taken
+ALLOWABLE_STATES: dict[str, tuple[Activity.State, ...]] = {
+    "start": (Activity.State.INACTIVE, Activity.State.PENDING),
+    "end": (Activity.State.ACTIVE, Activity.State.INACTIVE, Activity.State.PENDING),
+    "set_next": (
+        Activity.State.ACTIVE,
+        Activity.State.INACTIVE,
+        Activity.State.PENDING,
+    ),
+}
+
+
 class ActivityViewSet(viewsets.ModelViewSet):
     queryset = Activity.objects.all()
     serializer_class = serializers.ActivitySerializer
     filterset_class = ActivityFilter
     permission_classes = [IsAuthenticated]
+    game_state_repository = repositories.GameStateRepository()
+    due_limit = 5
 
     def get_queryset(self) -> QuerySet[Activity]:
         user = self.request.user
-        return Activity.objects.filter(owner=user).prefetch_related("occurances")
+        return Activity.objects.filter(owner=user).select_related("stats")
 
-    def _get_response_serializer(
-        self, *, game_effect: services.GameEffect
-    ) -> serializers.ActivityResponseSerializer:
-        game_state, _ = GameState.objects.get_or_create(owner=self.request.user)
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        # Starting or ending an occurance saves its activity too, so the
+        # activity rows alone version the whole list including its state.
+        version = Activity.objects.filter(owner=request.user).aggregate(
+            updated_at=Max("updated_at"), count=Count("pk")
+        )
+        return conditional_response(
+            request,
+            version=f"{version['updated_at']}:{version['count']}",
+            last_modified=version["updated_at"],
+            build=lambda: super(ActivityViewSet, self).list(request, *args, **kwargs),
+        )
+
+    def _render_action(self, *, game_effect: services.GameEffect) -> dict:
+        """Apply ``game_effect`` to the user's game state and render the
+        response body (see ``do_again_list.responses``)."""
+        game_state, _ = self.game_state_repository.get(self.request.user)
         game_state = services.GameStateService().update(
             game_state=game_state, game_effect=game_effect
         )
-        serializer: serializers.ActivityResponseSerializer = cast(
-            serializers.ActivityResponseSerializer,
-            serializers.ActivityResponseSerializer(
-                data={
-                    "game": game_state,
-                    "success": True,
-                    "error": None,
-                    "messages": game_effect.messages,
-                    "spawn_enemy": asdict(game_effect.spawn_enemy)
-                    if game_effect.spawn_enemy is not None
-                    else None,
-                    "hero_buffs": [asdict(buff) for buff in game_effect.hero_buffs],
-                    "pending_heal": game_effect.pending_heal,
-                    "pending_fatigue": game_effect.pending_fatigue,
-                    "resource_ref": asdict(game_effect.resource_ref)
-                    if game_effect.resource_ref is not None
-                    else None,
-                },
-                context={},
-            )
-        )
-        serializer.is_valid(raise_exception=True)
-        return serializer
+        return responses.render_activity_action(game_state, game_effect)
 
     def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """
@@ -101,16 +185,12 @@ class ActivityViewSet(viewsets.ModelViewSet):
             )
             # send game response
             return Response(
-                self._get_response_serializer(game_effect=game_effect).data,
+                self._render_action(game_effect=game_effect),
                 status=201,
             )
         except services.ActivityLifecycleException as exc:
             # send error response
-            error_serializer = serializers.ErrorResponseSerializer(
-                data={"success": False, "error": str(exc)}
-            )
-            error_serializer.is_valid(raise_exception=True)
-            return Response(error_serializer.data, status=400)
+            return Response(responses.render_error(str(exc)), status=400)
 
     # --- Custom Actions --- #
 
@@ -129,10 +209,6 @@ class ActivityViewSet(viewsets.ModelViewSet):
         return self._generic_activity_action(
             activity=self.get_object(),
             action="start",
-            allowable_states=(
-                Activity.State.INACTIVE,
-                Activity.State.PENDING,
-            ),
         )
 
     @extend_schema(
@@ -150,11 +226,6 @@ class ActivityViewSet(viewsets.ModelViewSet):
         return self._generic_activity_action(
             activity=self.get_object(),
             action="end",
-            allowable_states=(
-                Activity.State.ACTIVE,
-                Activity.State.INACTIVE,
-                Activity.State.PENDING,
-            ),
         )
 
     @extend_schema(
@@ -172,45 +243,157 @@ class ActivityViewSet(viewsets.ModelViewSet):
         return self._generic_activity_action(
             activity=self.get_object(),
             action="set_next",
-            allowable_states=(
-                Activity.State.ACTIVE,
-                Activity.State.INACTIVE,
-                Activity.State.PENDING,
-            ),
         )
 
-    def _generic_activity_action(
-        self,
-        activity: Activity,
-        action: str,
-        allowable_states: tuple[Activity.State, ...],
-    ) -> Response:
-        if activity.state not in allowable_states:
-            serializer = serializers.ErrorResponseSerializer(
-                data={
-                    "success": False,
-                    "error": (
-                        f"Cannot `{action}` for an activity in state `{activity.state}`"
-                    ),
-                }
-            )
-            serializer.is_valid(raise_exception=True)
-            return Response(serializer.data, status=400)
+    def _generic_activity_action(self, activity: Activity, action: str) -> Response:
         serializer = self.get_serializer(data=self.request.data) # type: ignore
         serializer.is_valid(raise_exception=True)
+        operation_id = serializer.validated_data.pop("operation_id", None)
+        # a replayed operation gets its original response, whatever the state now
+        replayed = self._replay(
+            [operation_id], self._applied_operations([operation_id])
+        )
+        if replayed is not None:
+            return replayed
+        if activity.state not in ALLOWABLE_STATES[action]:
+            return Response(
+                responses.render_error(
+                    f"Cannot `{action}` for an activity in state `{activity.state}`"
+                ),
+                status=400,
+            )
         try:
-            game_effect = getattr(services.ActivityService(), action)(
-                activity=activity, **serializer.validated_data
+            with transaction.atomic():
+                game_effect = getattr(services.ActivityService(), action)(
+                    activity=activity, **serializer.validated_data
+                )
+                data = self._render_action(game_effect=game_effect)
+                self._record_operations([operation_id], data)
+            return Response(data)
+        except services.ActivityLifecycleException as exc:
+            return Response(responses.render_error(str(exc)), status=400)
+        except IntegrityError:
+            # a concurrent replay of the same operation got there first
+            replayed = self._replay(
+                [operation_id], self._applied_operations([operation_id])
             )
-            return Response(
-                self._get_response_serializer(game_effect=game_effect).data,
+            if replayed is None:
+                raise
+            return replayed
+
+    def _applied_operations(
+        self, operation_ids: Sequence[str | None]
+    ) -> dict[str, Operation]:
+        operation_ids = [op_id for op_id in operation_ids if op_id is not None]
+        if not operation_ids:
+            return {}
+        return {
+            operation.operation_id: operation
+            for operation in Operation.objects.filter(
+                owner=self.request.user, operation_id__in=operation_ids
             )
+        }
+
+    def _replay(
+        self, operation_ids: Sequence[str | None], applied: dict[str, Operation]
+    ) -> Response | None:
+        """Return the stored response if every operation was already applied."""
+        if not operation_ids or not all(op_id in applied for op_id in operation_ids):
+            return None
+        operation = applied[operation_ids[-1]]  # type: ignore[index]
+        return Response(operation.response, status=operation.status_code)
+
+    def _record_operations(self, operation_ids: Sequence[str | None], data) -> None:
+        Operation.objects.bulk_create(
+            Operation(owner=self.request.user, operation_id=op_id, response=data)
+            for op_id in operation_ids
+            if op_id is not None
+        )
+
+    @extend_schema(
+        request=serializers.ActivityBatchOperationSerializer(many=True),
+        responses={
+            200: serializers.ActivityResponseSerializer,
+            400: serializers.ErrorResponseSerializer,
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        serializer_class=serializers.ActivityBatchOperationSerializer,
+    )
+    def batch(self, request):
+        """Apply a list of start/end/set_next operations in one transaction.
+
+        The resulting game effects are combined and applied to the game
+        state once. If any operation fails, none of them are applied.
+        """
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        operation_ids = [
+            operation.pop("operation_id", None)
+            for operation in serializer.validated_data
+        ]
+        applied = self._applied_operations(operation_ids)
+        replayed = self._replay(operation_ids, applied)
+        if replayed is not None:
+            return replayed
+        # skip operations applied by an earlier, partially delivered batch
+        pending = [
+            (index, operation, operation_id)
+            for index, (operation, operation_id) in enumerate(
+                zip(serializer.validated_data, operation_ids)
+            )
+            if operation_id not in applied
+        ]
+        activities = self.get_queryset().in_bulk(
+            {operation["id"] for _, operation, _ in pending}
+        )
+        game_effect = services.GameEffect()
+        try:
+            with transaction.atomic():
+                for index, operation, _ in pending:
+                    activity_id = operation.pop("id")
+                    action = operation.pop("action")
+                    activity = activities.get(activity_id)
+                    if activity is None:
+                        raise services.ActivityLifecycleException(
+                            f"Operation {index}: activity {activity_id} not found"
+                        )
+                    if activity.state not in ALLOWABLE_STATES[action]:
+                        raise services.ActivityLifecycleException(
+                            f"Operation {index}: cannot `{action}` for an activity"
+                            f" in state `{activity.state}`"
+                        )
+                    game_effect += getattr(services.ActivityService(), action)(
+                        activity=activity, **operation
+                    )
+                data = self._render_action(game_effect=game_effect)
+                self._record_operations(
+                    [operation_id for _, _, operation_id in pending], data
+                )
         except services.ActivityLifecycleException as exc:
-            error_serializer = serializers.ErrorResponseSerializer(
-                data={"success": False, "error": str(exc)}
+            return Response(responses.render_error(str(exc)), status=400)
+        except IntegrityError:
+            replayed = self._replay(
+                operation_ids, self._applied_operations(operation_ids)
+            )
+            if replayed is None:
+                raise
+            return replayed
+        return Response(data)
+
+    def perform_update(self, serializer: serializers.ActivitySerializer) -> None:
+        super().perform_update(serializer)
+        events.activity_changed(serializer.instance, serializer.validated_data)
+
+    def perform_destroy(self, instance: Activity) -> None:
+        with transaction.atomic():
+            DeletedActivity.objects.create(
+                owner=instance.owner, activity_id=instance.pk
             )
-            error_serializer.is_valid(raise_exception=True)
-            return Response(error_serializer.data, status=400)
+            events.activity_deleted(owner_id=instance.owner_id, activity_id=instance.pk)
+            super().perform_destroy(instance)
 
     @action(detail=True, methods=["post"])
     def resist_impulse(self, request, pk):
@@ -219,61 +402,154 @@ class ActivityViewSet(viewsets.ModelViewSet):
             return Response({"success": False, "error": "Not a break activity"}, status=400)
         activity.impulse_resisted_count += 1
         activity.save()
+        events.activity_changed(activity, ["impulse_resisted_count"])
         return Response(self.get_serializer(activity).data)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "limit", int, required=False, description="At most 100, 5 by default."
+            )
+        ],
+        responses=serializers.DueActivitySerializer(many=True),
+    )
+    @action(detail=False, methods=["get"])
+    def due(self, request: Request) -> Response:
+        """The completed activities that are most overdue or due soonest,
+        ranked by ``due_time`` in the database."""
+        try:
+            limit = min(int(request.query_params.get("limit", self.due_limit)), 100)
+        except ValueError:
+            raise ValidationError({"limit": "A whole number is required."}) from None
+        activities = (
+            Activity.objects.filter(owner=request.user, state=Activity.State.INACTIVE)
+            .with_due_time()
+            .select_related("stats")
+            .order_by("due_time", "pk")[: max(limit, 0)]
+        )
+        return Response(serializers.DueActivitySerializer(activities, many=True).data)
+
+    @extend_schema(responses=serializers.IntervalAnalysisSerializer(many=True))
+    @action(detail=False, methods=["get"])
+    def analytics(self, request: Request) -> Response:
+        """Interval analytics for every activity (or those the filters
+        match), from one read of their completion times."""
+        activities = self.filter_queryset(Activity.objects.filter(owner=request.user))
+        return Response(
+            serializers.IntervalAnalysisSerializer(
+                [
+                    {"activity": activity_id, **dataclasses.asdict(analysis)}
+                    for activity_id, analysis in analytics.analyze(activities).items()
+                ],
+                many=True,
+            ).data
+        )
+
+    @extend_schema(responses=serializers.ActivityStatsSerializer)
+    @action(detail=True, methods=["get"])
+    def stats(self, request: Request, pk=None) -> Response:
+        activity = self.get_object()
+        try:
+            activity_stats = activity.stats
+        except ActivityStats.DoesNotExist:
+            activity_stats = ActivityStats(activity=activity)
+        return Response(serializers.ActivityStatsSerializer(activity_stats).data)
+
 
 class OccuranceFilter(filters.FilterSet):
     class Meta:
         model = Occurance
-        fields = ["activity", "start_time", "end_time"]
+        # ranges are half-open, e.g. ?end_time__gte=2024-01-01&end_time__lt=2024-02-01
+        fields = {
+            "activity": ["exact"],
+            "start_time": ["exact", "gte", "lt"],
+            "end_time": ["exact", "gte", "lt", "isnull"],
+        }
 
 
 class OccuranceViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Occurance.objects.all()
     serializer_class = serializers.OccuranceSerializer
     filterset_class = OccuranceFilter
+    pagination_class = pagination.OccuranceCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self) -> QuerySet[Occurance]:
         user = self.request.user
         return Occurance.objects.filter(activity__owner=user)
 
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        # A page is cheap to read but not to serialize, so it is versioned by
+        # its own rows (and where the next page starts) rather than by the
+        # user's whole history.
+        paginator = cast(pagination.OccuranceCursorPagination, self.paginator)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is None:
+            # not asked for pages: every row, versioned like the activities
+            latest = queryset.aggregate(updated_at=Max("updated_at"), count=Count("pk"))
+            return conditional_response(
+                request,
+                version=f"{latest['updated_at']}:{latest['count']}",
+                last_modified=latest["updated_at"],
+                build=lambda: Response(self.get_serializer(queryset, many=True).data),
+            )
+        version = [(occurance.pk, str(occurance.updated_at)) for occurance in page]
+        return conditional_response(
+            request,
+            version=f"{version}:{paginator.get_next_link()}",
+            last_modified=max(
+                (occurance.updated_at for occurance in page), default=None
+            ),
+            build=lambda: paginator.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            ),
+        )
+
 
 class GameStateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     queryset = GameState.objects.all()
     serializer_class = serializers.GameStateSerializer
     permission_classes = [IsAuthenticated]
+    game_state_repository = repositories.GameStateRepository()
 
     def get_queryset(self) -> QuerySet[GameState]:
         user = self.request.user
         return GameState.objects.filter(owner=user)
 
-    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        game_state, created = GameState.objects.get_or_create(owner=request.user)
-        data = serializers.GameStateSerializer(game_state).data
-        # Signal the frontend to spawn a welcome enemy on first login
-        data["spawn_first_enemy"] = created
-        return Response([data])
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        game_state, created = self.game_state_repository.get(request.user)
+
+        def build() -> Response:
+            data = serializers.GameStateSerializer(game_state).data
+            # Signal the frontend to spawn a welcome enemy on first login
+            data["spawn_first_enemy"] = created
+            return Response([data])
+
+        if created:
+            return build()
+        # bonus_xp accrues with time alone, so it is part of the version
+        return conditional_response(
+            request,
+            version=f"{game_state.updated_at}:{int(game_state._compute_bonus_xp())}",
+            last_modified=None,
+            build=build,
+        )
 
     @action(detail=False, methods=["post"])
     def sync(self, request: Request) -> Response:
         """Sync battle results (gold earned, xp earned, current streak, hero HP)."""
-        game_state, _ = GameState.objects.get_or_create(owner=request.user)
-        gold = max(0, int(request.data.get("gold", 0))) # type: ignore
-        xp = max(0, int(request.data.get("xp", 0))) # type: ignore
-        streak = max(0, int(request.data.get("streak", 0))) # type: ignore
-        hero_hp = int(request.data.get("hero_hp", -1)) # type: ignore
-        quest_tokens = max(0, int(request.data.get("quest_tokens", 0))) # type: ignore
-        game_state.gold += gold
-        game_state.streak = streak
-        game_state.hero_hp = hero_hp
-        if xp > 0:
-            xp += game_state.consume_bonus_xp()
-        game_state.add_xp(xp)
-        game_state.quest_tokens += quest_tokens
-        game_state.save()
+        game_state = services.GameStateService().sync(
+            owner=request.user,
+            gold=max(0, int(request.data.get("gold", 0))),  # type: ignore
+            xp=max(0, int(request.data.get("xp", 0))),  # type: ignore
+            streak=max(0, int(request.data.get("streak", 0))),  # type: ignore
+            hero_hp=int(request.data.get("hero_hp", -1)),  # type: ignore
+            quest_tokens=max(0, int(request.data.get("quest_tokens", 0))),  # type: ignore
+        )
         return Response(serializers.GameStateSerializer(game_state).data)
 
+    @extend_schema(responses=serializers.RunOverResponseSerializer)
     @action(detail=False, methods=["post"])
     def run_over(self, request: Request) -> Response:
         """End the current run: convert progress to souls, then wipe run-local state.
@@ -281,26 +557,14 @@ class GameStateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         Permanent fields (souls, perm_*) are preserved.
         Run-local fields (xp, gold, level, base_*, streak, items, hero_hp) are reset.
         """
-        game_state, _ = GameState.objects.get_or_create(owner=request.user)
-        level_reached = game_state.level
-        souls_earned = game_state.souls_for_run()
-        game_state.souls += souls_earned
-        # Reset run-local state
-        game_state.xp = 0
-        game_state.gold = 0
-        game_state.level = 1
-        game_state.base_attack = 1
-        game_state.base_defense = 0
-        game_state.base_speed = 1
-        game_state.streak = 0
-        game_state.items = []
-        game_state.hero_hp = -1
-        game_state.save()
-        serializer = serializers.RunOverResponseSerializer(
-            data={"game": serializers.GameStateSerializer(game_state).data, "souls_earned": souls_earned, "level_reached": level_reached}
+        game_state, souls_earned, level_reached = services.GameStateService().run_over(
+            owner=request.user
+        )
+        return Response(
+            responses.render_run_over(
+                game_state, souls_earned=souls_earned, level_reached=level_reached
+            )
         )
-        serializer.is_valid(raise_exception=True)
-        return Response(serializer.data)
 
     @action(detail=False, methods=["post"])
     def accept_quest(self, request: Request) -> Response:
@@ -309,15 +573,16 @@ class GameStateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         Expects body: { "cost": <int> }
         Returns updated GameState.
         """
-        game_state, _ = GameState.objects.get_or_create(owner=request.user)
         cost = max(1, int(request.data.get("cost", 1)))
-        if game_state.quest_tokens < cost:
+        game_state = services.GameStateService().spend(
+            owner=request.user, currency="quest_tokens", cost=cost
+        )
+        if game_state is None:
+            balance = self.game_state_repository.get_current(request.user).quest_tokens
             return Response(
-                {"error": f"Not enough quest tokens. Need {cost}, have {game_state.quest_tokens}."},
+                {"error": f"Not enough quest tokens. Need {cost}, have {balance}."},
                 status=400,
             )
-        game_state.quest_tokens -= cost
-        game_state.save()
         return Response(serializers.GameStateSerializer(game_state).data)
 
     @action(detail=False, methods=["post"])
@@ -330,7 +595,8 @@ class GameStateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         serializer.is_valid(raise_exception=True)
         upgrade: str = serializer.validated_data["upgrade"]
 
-        game_state, _ = GameState.objects.get_or_create(owner=request.user)
+        # the cost depends on the current level, so read the row itself
+        game_state = self.game_state_repository.get_current(request.user)
 
         if upgrade == "game_speed":
             _tier_costs = {1: 10, 2: 20, 4: 40}
@@ -341,37 +607,166 @@ class GameStateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
                     {"error": "Game speed is already at maximum."},
                     status=400,
                 )
+            field_name = "max_game_speed"
+            current_level = current_max
+            next_level = _tier_next[current_max]
             cost = _tier_costs[current_max]
-            if game_state.souls < cost:
-                return Response(
-                    {"error": f"Not enough souls. Need {cost}, have {game_state.souls}."},
-                    status=400,
-                )
-            game_state.souls -= cost
-            game_state.max_game_speed = _tier_next[current_max]
-            game_state.save()
-            return Response(serializers.GameStateSerializer(game_state).data)
-
-        field_map = {
-            "attack": "perm_attack",
-            "defense": "perm_defense",
-            "speed": "perm_speed",
-            "hp": "perm_hp",
-        }
-        field_name = field_map[upgrade]
-        current_level: int = getattr(game_state, field_name)
-        cost = GameState.upgrade_cost(current_level)
+        else:
+            field_map = {
+                "attack": "perm_attack",
+                "defense": "perm_defense",
+                "speed": "perm_speed",
+                "hp": "perm_hp",
+            }
+            field_name = field_map[upgrade]
+            current_level = getattr(game_state, field_name)
+            next_level = current_level + 1
+            cost = GameState.upgrade_cost(current_level)
 
         if game_state.souls < cost:
             return Response(
                 {"error": f"Not enough souls. Need {cost}, have {game_state.souls}."},
                 status=400,
             )
+        upgraded = services.GameStateService().spend(
+            owner=request.user,
+            currency="souls",
+            cost=cost,
+            # unless another request upgraded or spent meanwhile
+            expected={field_name: current_level},
+            **{field_name: next_level},
+        )
+        if upgraded is None:
+            return Response(
+                {"error": "The game state changed meanwhile; try again."},
+                status=409,
+            )
+        return Response(serializers.GameStateSerializer(upgraded).data)
 
-        game_state.souls -= cost
-        setattr(game_state, field_name, current_level + 1)
-        game_state.save()
-        return Response(serializers.GameStateSerializer(game_state).data)
+
+class ChangesViewSet(viewsets.GenericViewSet):
+    """
+    GET /api/do-again/changes/?cursor=<cursor>
+
+    Everything that changed since ``cursor``: activities, occurances, deleted
+    activity ids and the game state (``null`` if unchanged). Each response
+    carries the cursor to pass next time; without one everything is returned.
+
+    Rows are stamped when they're saved, not when their transaction commits,
+    so the cursor handed out lags ``DO_AGAIN_LIST_CHANGES_OVERLAP`` seconds
+    behind the read. Changes are therefore delivered more than once, and one
+    is only skipped if its transaction ran longer than that.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[OpenApiParameter("cursor", str, required=False)],
+        responses={200: serializers.ChangesSerializer},
+    )
+    def list(self, request: Request) -> Response:
+        # taken before reading, and far enough back that transactions still
+        # open now are read again next time
+        until = timezone.now() - datetime.timedelta(
+            seconds=settings.DO_AGAIN_LIST_CHANGES_OVERLAP
+        )
+        since = None
+        if "cursor" in request.query_params:
+            try:
+                since = _EPOCH + datetime.timedelta(
+                    microseconds=int(request.query_params["cursor"])
+                )
+            except (TypeError, ValueError, OverflowError):
+                return Response({"error": "Invalid cursor."}, status=400)
+
+        activities = Activity.objects.filter(owner=request.user).select_related("stats")
+        occurances = Occurance.objects.filter(activity__owner=request.user)
+        deleted = DeletedActivity.objects.filter(owner=request.user)
+        game_states = GameState.objects.filter(owner=request.user)
+        if since is not None:
+            activities = activities.filter(updated_at__gte=since)
+            occurances = occurances.filter(updated_at__gte=since)
+            deleted = deleted.filter(deleted_at__gte=since)
+            game_states = game_states.filter(updated_at__gte=since)
+        else:
+            deleted = deleted.none()
+        game_state = game_states.first()
+
+        return Response(
+            serializers.ChangesSerializer(
+                {
+                    "cursor": str(
+                        (until - _EPOCH) // datetime.timedelta(microseconds=1)
+                    ),
+                    "activities": activities,
+                    "occurances": occurances,
+                    "deleted_activities": deleted.values_list("activity_id", flat=True),
+                    "game": game_state,
+                }
+            ).data
+        )
+
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class HeatmapViewSet(viewsets.GenericViewSet):
+    """
+    GET /api/do-again/heatmap/?activity=<id>&end=<date>
+
+    Completions per day for the year (365 days) ending on ``end``, today by
+    default, for one activity or summed over all of the user's activities.
+    Read from ``DailyRollup``, so it costs one row per active day whatever
+    the size of the history.
+    """
+
+    permission_classes = [IsAuthenticated]
+    days = 365
+
+    @extend_schema(
+        parameters=[serializers.HeatmapQuerySerializer],
+        responses={200: serializers.HeatmapSerializer},
+    )
+    def list(self, request: Request) -> Response:
+        query = serializers.HeatmapQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        activity_id = query.validated_data.get("activity")
+        end = query.validated_data.get("end") or timezone.localdate()
+        start = end - datetime.timedelta(days=self.days - 1)
+
+        rollups = DailyRollup.objects.filter(
+            owner=request.user, day__gte=start, day__lte=end
+        )
+        if activity_id is not None:
+            rollups = rollups.filter(activity_id=activity_id)
+        days = (
+            rollups.values("day")
+            .annotate(count=Sum("count"), total_duration=Sum("total_duration"))
+            .order_by("day")
+        )
+        return Response(
+            serializers.HeatmapSerializer(
+                {"activity": activity_id, "start": start, "end": end, "days": days}
+            ).data
+        )
+
+
+class MetricsViewSet(viewsets.ViewSet):
+    """
+    GET /api/do-again/metrics/
+
+    Request metrics for every worker, in the Prometheus text format (see
+    ``do_again_list.metrics``). Staff only; a scraper can log in with HTTP
+    basic authentication.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses={(200, metrics.CONTENT_TYPE): OpenApiTypes.STR})
+    def list(self, request: Request) -> HttpResponse:
+        return HttpResponse(
+            metrics.render(metrics.collect()), content_type=metrics.CONTENT_TYPE
+        )
 
 
 # ─── Auth ────────────────────────────────────────────────────────────────────
@@ -379,10 +774,11 @@ class GameStateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
 
 @ensure_csrf_cookie
 @require_GET
-def api_auth_user(request):
+async def api_auth_user(request):
     """Return the current user, or null if anonymous."""
-    if request.user.is_authenticated:
-        return JsonResponse({"user": {"username": request.user.username}})
+    user = await request.auser()
+    if user.is_authenticated:
+        return JsonResponse({"user": {"username": user.username}})
     return JsonResponse({"user": None})
 
 
@@ -391,7 +787,7 @@ def api_auth_user(request):
 def api_auth_register(request):
     """Create a new user account and log in."""
     try:
-        data = json.loads(request.body)
+        data = jsonlib.loads(request.body)
         username = data.get("username", "").strip()
         password = data.get("password", "")
         if not username or not password:
@@ -416,7 +812,7 @@ def api_auth_register(request):
 def api_auth_login(request):
     """Log in with username/password."""
     try:
-        data = json.loads(request.body)
+        data = jsonlib.loads(request.body)
         username = data.get("username", "").strip()
         password = data.get("password", "")
         user = authenticate(request, username=username, password=password)
@@ -438,29 +834,108 @@ def api_auth_logout(request):
     return JsonResponse({"success": True})
 
 
+# ─── Events ──────────────────────────────────────────────────────────────────
+
+
+@require_GET
+async def event_stream(request) -> HttpResponseBase:
+    """Server-sent events carrying the current user's changes as they commit
+    (see ``do_again_list.events``). Needs an ASGI server to stay open."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=403)
+    broker = events.get_broker()
+    # subscribed before responding, so nothing after this request is missed
+    subscription = broker.subscribe(user.pk)
+    return StreamingHttpResponse(
+        _sse_messages(broker, subscription),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _sse_messages(
+    broker: events.Broker, subscription: events.Subscription
+) -> AsyncIterator[str]:
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            event = await subscription.get(settings.DO_AGAIN_LIST_EVENT_KEEPALIVE)
+            if event is None:
+                # keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {jsonlib.dumps_text(event)}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
 # ─── Import / Export ─────────────────────────────────────────────────────────
 
 
+def _streamed(request: Request, chunks: Iterable[bytes]) -> Iterable | AsyncIterator:
+    """``chunks`` as streaming content for ``request``'s server. Under ASGI
+    Django reads a sync iterator to the end before sending any of it, so
+    there the chunks are pulled one at a time in the request's thread."""
+    if not isinstance(request._request, ASGIRequest):
+        return chunks
+
+    async def pull() -> AsyncIterator[bytes]:
+        iterator = iter(chunks)
+        next_chunk = sync_to_async(next, thread_sensitive=True)
+        try:
+            while (chunk := await next_chunk(iterator, None)) is not None:
+                yield chunk
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await sync_to_async(close, thread_sensitive=True)()
+
+    return pull()
+
+
 class DataImportExportView(viewsets.GenericViewSet):
     """
     GET  /api/data/export/  — download all user data as JSON
+    GET  /api/data/export/?version=2  — download it as gzipped NDJSON
     POST /api/data/import/  — upload a previously-exported JSON blob to restore data
+    POST /api/data/import/  — or a version 2 export, as application/x-ndjson
     """
 
     permission_classes = [IsAuthenticated]
+    parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, parsers.NDJSONImportParser]
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "version", int, enum=[1, 2], description="Export format, 1 by default."
+            )
+        ]
+    )
     @action(detail=False, methods=["get"], url_path="export")
-    def export_data(self, request: Request) -> Response:
-        data = services.DataImportExportService().export(owner=request.user)
-        return Response(data)
+    def export_data(self, request: Request) -> StreamingHttpResponse:
+        service = services.DataImportExportService()
+        version = request.query_params.get("version", "1")
+        if version == "2":
+            response = StreamingHttpResponse(
+                _streamed(request, service.iter_export_ndjson(owner=request.user)),
+                content_type="application/gzip",
+            )
+            filename = f"do-again-list-{timezone.now():%Y-%m-%d}.ndjson.gz"
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+        if version != "1":
+            raise ValidationError({"version": "Must be 1 or 2."})
+        # Streamed so a long history never sits in memory as one document
+        return StreamingHttpResponse(
+            _streamed(request, service.iter_export(owner=request.user)),
+            content_type="application/json",
+        )
 
     @action(detail=False, methods=["post"], url_path="import")
     def import_data(self, request: Request) -> Response:
-        serializer = serializers.DataImportSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        result = services.DataImportExportService().do_import(
-            owner=request.user,
-            validated_data=serializer.validated_data,
+        result = services.DataImportExportService().import_upload(
+            owner=request.user, upload=request.data
         )
         result_serializer = serializers.DataImportResultSerializer(
             data={
@@ -472,3 +947,63 @@ class DataImportExportView(viewsets.GenericViewSet):
         )
         result_serializer.is_valid(raise_exception=True)
         return Response(result_serializer.data)
+
+
+class JobViewSet(
+    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """
+    Imports and exports run in the background by ``manage.py run_jobs``.
+
+    POST /api/jobs/export/  — queue an export ({"version": 1 or 2})
+    POST /api/jobs/import/  — queue an import of the request body, sent as for
+                              /api/data/import/
+    GET  /api/jobs/{id}/    — poll status and progress
+    GET  /api/jobs/{id}/download/  — fetch a finished export
+    """
+
+    queryset = Job.objects.all()
+    serializer_class = serializers.JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self) -> QuerySet[Job]:
+        return Job.objects.filter(owner=self.request.user).order_by("-created_at")
+
+    @extend_schema(
+        request=serializers.JobExportSerializer,
+        responses={202: serializers.JobSerializer},
+    )
+    @action(detail=False, methods=["post"])
+    def export(self, request: Request) -> Response:
+        serializer = serializers.JobExportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = jobs.enqueue_export(request.user, serializer.validated_data["version"])
+        return Response(self.get_serializer(job).data, status=202)
+
+    @extend_schema(request=None, responses={202: serializers.JobSerializer})
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_data(self, request: Request) -> Response:
+        media_type = (request.content_type or "").split(";")[0].strip()
+        if media_type not in jobs.IMPORT_MEDIA_TYPES:
+            raise UnsupportedMediaType(media_type)
+        # copied to disk unparsed; the worker validates it
+        job = jobs.enqueue_import(
+            request.user, request.stream or io.BytesIO(), media_type
+        )
+        return Response(self.get_serializer(job).data, status=202)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request: Request, pk=None) -> FileResponse:
+        job = self.get_object()
+        if job.kind != Job.Kind.EXPORT or job.status != Job.Status.SUCCEEDED:
+            raise NotFound("This job has no download.")
+        path = jobs.export_path(job)
+        if not path.exists():
+            raise NotFound("The export has expired.")
+        response = FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=f"do-again-list-{job.finished_at:%Y-%m-%d}{''.join(path.suffixes)}",
+        )
+        response.streaming_content = _streamed(request, response.streaming_content)
+        return response
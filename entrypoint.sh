@@ -2,4 +2,7 @@
 set -e
 
 python test_project/manage.py collectstatic --noinput
-exec gunicorn test_project.wsgi:application --bind 0.0.0.0:8000 --workers 2
+# ASGI so event streams (/do_again/api/events/) stay open without holding a
+# worker; the workers share events through PostgresBroker
+exec gunicorn test_project.asgi:application --worker-class uvicorn_worker.UvicornWorker \
+    --bind 0.0.0.0:8000 --workers 2
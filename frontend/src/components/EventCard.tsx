@@ -69,8 +69,12 @@ export function EventCard({ event, now, onUpdate, onDelete, onOpenSettings, onRe
       const endDate = new Date(event.end_time);
       text += '\nEnd: ' + endDate.toLocaleString('en-US', DATE_OPTS);
     }
+    if (!event.next_time && event.predicted_next_time) {
+      const suggested = new Date(event.predicted_next_time);
+      text += '\nSuggested next: ' + suggested.toLocaleString('en-US', DATE_OPTS);
+    }
     return text;
-  }, [event.start_time, event.end_time]);
+  }, [event.start_time, event.end_time, event.next_time, event.predicted_next_time]);
 
   return (
     <div
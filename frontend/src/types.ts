@@ -7,6 +7,7 @@ export interface DoAgainEvent {
   start_time: string | null;
   end_time: string | null;
   next_time: string | null;
+  predicted_next_time: string | null;
   default_duration: string;
   min_duration: string;
   max_time_between_events: string;
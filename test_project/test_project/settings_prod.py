@@ -27,6 +27,22 @@ DATABASES = {
     }
 }
 
+# Cache — a volume shared by the gunicorn workers and the run_jobs worker, so
+# GameState invalidation (e.g. by a background import) reaches all of them
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("DJANGO_CACHE_DIR", "/var/lib/do_again_list/cache"),
+    }
+}
+
+# Change events pass between the gunicorn workers and the run_jobs worker
+# through PostgreSQL, so every event stream sees every change
+DO_AGAIN_LIST_EVENT_BROKER = "do_again_list.events.PostgresBroker"
+
+# Background job files — a volume shared by the app and the run_jobs worker
+DO_AGAIN_LIST_JOB_DIR = os.environ.get("DJANGO_JOB_DIR", "/var/lib/do_again_list/jobs")
+
 # Static files — served by whitenoise
 STORAGES = {
     "staticfiles": {
@@ -34,7 +50,11 @@ STORAGES = {
     },
 }
 
-MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")  # noqa: F405
+# directly after SecurityMiddleware, as whitenoise asks
+MIDDLEWARE.insert(  # noqa: F405
+    MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,  # noqa: F405
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+)
 
 STATIC_ROOT = "/app/staticfiles"
 
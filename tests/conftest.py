@@ -1,8 +1,50 @@
+import datetime
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
 from rest_framework.test import APIClient
 
-from do_again_list import models
+from do_again_list import events, models
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # primary keys are reused between tests, so cached rows must not leak
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def job_dir(settings, tmp_path):
+    settings.DO_AGAIN_LIST_JOB_DIR = str(tmp_path / "jobs")
+    return tmp_path / "jobs"
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmp_path):
+    settings.DO_AGAIN_LIST_METRICS_DIR = str(tmp_path / "metrics")
+    return tmp_path / "metrics"
+
+
+class RecordingBroker:
+    """Stands in for ``events.InProcessBroker``, keeping what's published."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, user_id, event):
+        self.published.append((user_id, event))
+
+    def has_subscribers(self, user_id):
+        return True
+
+
+@pytest.fixture
+def event_broker(settings) -> RecordingBroker:
+    settings.DO_AGAIN_LIST_EVENT_BROKER = "conftest.RecordingBroker"
+    return events.get_broker()
 
 
 @pytest.fixture
@@ -74,6 +116,8 @@ def occurance_factory(activity):
 
     def _factory(activity=activity, **kwargs) -> models.Occurance:
         resource, _ = resource_model.objects.get_or_create(activity=activity, **kwargs)
+        # occurances created outside ActivityService must refresh the summary
+        activity.refresh_occurance_summary()
         resources.append(resource)
         return resource
 
@@ -111,3 +155,51 @@ def game_state_factory(user):
 @pytest.fixture
 def game_state(game_state_factory, activity_factory):
     return game_state_factory()
+
+
+@pytest.fixture
+def bulk_seed(db):
+    """Seed an owner with ``n_activities`` x ``n_occurances`` completed
+    occurances using a handful of bulk inserts."""
+
+    def _seed(owner, n_activities: int, n_occurances: int) -> list[models.Activity]:
+        now = timezone.now()
+        activities = []
+        for index in range(n_activities):
+            ends = [
+                now - datetime.timedelta(days=index + 1, hours=hour)
+                for hour in range(n_occurances)
+            ]
+            activities.append(
+                models.Activity(
+                    owner=owner,
+                    title=f"seeded-{index}",
+                    display_name=f"seeded-{index}",
+                    ordering=index,
+                    max_time_between_events=datetime.timedelta(days=1),
+                    state=(
+                        models.Activity.State.INACTIVE
+                        if ends
+                        else models.Activity.State.PENDING
+                    ),
+                    current_start_time=ends[0] - datetime.timedelta(minutes=30)
+                    if ends
+                    else None,
+                    current_end_time=ends[0] if ends else None,
+                    last_completed_end_time=ends[0] if ends else None,
+                )
+            )
+        activities = models.Activity.objects.bulk_create(activities)
+        models.Occurance.objects.bulk_create(
+            models.Occurance(
+                activity=activity,
+                start_time=now
+                - datetime.timedelta(days=index + 1, hours=hour, minutes=30),
+                end_time=now - datetime.timedelta(days=index + 1, hours=hour),
+            )
+            for index, activity in enumerate(activities)
+            for hour in range(n_occurances)
+        )
+        return activities
+
+    return _seed
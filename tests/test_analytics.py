@@ -0,0 +1,125 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+from hypothesis import given
+from hypothesis import strategies as st
+from rest_framework.test import APIClient
+
+from do_again_list import analytics
+from do_again_list import models as m
+from do_again_list import services as s
+
+DAY = 24 * 60 * 60
+START = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def backend(request, settings):
+    settings.DO_AGAIN_LIST_ANALYTICS_ACCELERATED = request.param
+    if request.param and analytics.np is None:
+        pytest.skip("numpy is not installed")
+    return request.param
+
+
+class TestSummarize:
+    def test_daily(self, backend):
+        end_times = [START + day * DAY for day in range(10)]
+        analysis = analytics.summarize(end_times)
+        assert analysis.completion_count == 10
+        assert analysis.period == datetime.timedelta(days=1)
+        assert analysis.regularity == 1
+        assert analysis.interval_percentiles[90] == datetime.timedelta(days=1)
+        assert analysis.predicted_next_time == datetime.datetime(
+            2025, 1, 11, tzinfo=datetime.timezone.utc
+        )
+
+    def test_distribution(self, backend):
+        # intervals of 1, 2, 3, 4 and 10 days
+        end_times = [START + day * DAY for day in (0, 1, 3, 6, 10, 20)]
+        analysis = analytics.summarize(end_times)
+        assert analysis.mean_interval == datetime.timedelta(days=4)
+        assert analysis.interval_percentiles == {
+            10: datetime.timedelta(days=1.4),
+            25: datetime.timedelta(days=2),
+            50: datetime.timedelta(days=3),
+            75: datetime.timedelta(days=4),
+            90: datetime.timedelta(days=7.6),
+        }
+        assert analysis.period == datetime.timedelta(days=3)
+        assert analysis.regularity == pytest.approx(2 / 3)
+
+    @pytest.mark.parametrize("count", [0, 1, 3])
+    def test_too_few_intervals(self, backend, count):
+        analysis = analytics.summarize([START + day * DAY for day in range(count)])
+        assert analysis.completion_count == count
+        assert analysis.period is None
+        assert analysis.predicted_next_time is None
+
+    @pytest.mark.skipif(analytics.np is None, reason="numpy is not installed")
+    @given(st.lists(st.integers(min_value=0, max_value=10**7), max_size=60))
+    def test_backends_agree(self, offsets):
+        end_times = [START + offset for offset in sorted(offsets)]
+        numpy_result = analytics._summarize_numpy(analytics.np.asarray(end_times))
+        python_result = analytics._summarize_python(end_times)
+        assert numpy_result.period == python_result.period
+        assert numpy_result.interval_percentiles == python_result.interval_percentiles
+        assert numpy_result.predicted_next_time == python_result.predicted_next_time
+
+
+class TestAnalyze:
+    def test_batch_matches_single(self, backend, user, bulk_seed, activity_factory):
+        seeded = bulk_seed(user, 3, 6)
+        idle = activity_factory(title="idle")
+        results = analytics.analyze(m.Activity.objects.filter(owner=user))
+        assert results[idle.pk] == analytics.IntervalAnalysis()
+        for activity in seeded:
+            end_times = activity.occurances.order_by("end_time").values_list(
+                "end_time", flat=True
+            )
+            assert results[activity.pk] == analytics.summarize(
+                [end_time.timestamp() for end_time in end_times]
+            )
+            assert results[activity.pk].period == datetime.timedelta(hours=1)
+
+
+class TestPredictNextTime:
+    def _complete_hourly(self, activity, count: int, **kwargs) -> datetime.datetime:
+        end_time = timezone.now() - datetime.timedelta(hours=count)
+        for _ in range(count):
+            end_time += datetime.timedelta(hours=1)
+            activity.refresh_from_db()
+            s.ActivityService().end(activity=activity, end_time=end_time, **kwargs)
+        activity.refresh_from_db()
+        return end_time
+
+    def test_end_proposes_next_time(self, activity):
+        last = self._complete_hourly(activity, 5)
+        assert activity.predicted_next_time == last + datetime.timedelta(hours=1)
+        # AND the schedule the user sets, which is scored, is left alone
+        assert activity.next_time is None
+
+    def test_explicit_next_time_kept(self, activity):
+        next_time = timezone.now() + datetime.timedelta(days=3)
+        last = self._complete_hourly(activity, 5, next_time=next_time)
+        assert activity.next_time == next_time
+        assert activity.predicted_next_time == last + datetime.timedelta(hours=1)
+
+    def test_disabled(self, activity, settings):
+        settings.DO_AGAIN_LIST_PREDICT_NEXT_TIME = False
+        self._complete_hourly(activity, 5)
+        assert activity.predicted_next_time is None
+
+
+class TestAnalyticsE2E:
+    def test_analytics(self, backend, user_api_client: APIClient, user, bulk_seed):
+        seeded = bulk_seed(user, 2, 5)
+        response = user_api_client.get("/api/do-again/activities/analytics/")
+        assert response.status_code == 200
+        by_activity = {entry["activity"]: entry for entry in response.json()}
+        assert {activity.pk for activity in seeded} <= set(by_activity)
+        entry = by_activity[seeded[0].pk]
+        assert entry["completion_count"] == 5
+        assert entry["period"] == "1h"
+        assert entry["interval_percentiles"]["50"] == "1h"
+        assert entry["regularity"] == 1
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.utils import timezone
+
+from do_again_list import models
+
+
+@pytest.fixture
+def history(user, bulk_seed, game_state):
+    activities = bulk_seed(user, 3, 4)
+    models.Occurance.objects.create(activity=activities[0], start_time=timezone.now())
+    return activities
+
+
+class TestStreamingUnderAsgi:
+    def test_export_streams_chunks(self, user, history):
+        # GIVEN a client served through Django's ASGI handler
+        client = AsyncClient()
+        async_to_sync(client.aforce_login)(user)
+        # WHEN the export is downloaded
+        response = async_to_sync(client.get)("/api/do-again/data/export/")
+
+        async def read() -> bytes:
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        # THEN it is streamed from an async iterator, not buffered whole
+        assert response.is_async
+        exported = json.loads(async_to_sync(read)())
+        assert len(exported["activities"]) == len(history) + 1
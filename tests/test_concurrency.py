@@ -0,0 +1,160 @@
+"""
+Parallel writes to the same GameState must not lose updates.
+
+``benchmarks/game_sync.py`` measures the throughput side of the same change.
+"""
+
+import threading
+
+import pytest
+from django.db import connection, connections
+from django.db.models import F
+from rest_framework.test import APIClient
+
+from do_again_list import models, repositories, services
+
+
+def _run_in_threads(target, count: int) -> list[BaseException]:
+    errors: list[BaseException] = []
+    barrier = threading.Barrier(count)
+
+    def _worker():
+        try:
+            barrier.wait()
+            target()
+        except BaseException as exc:  # noqa: BLE001 – reported by the test
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=_worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentGameStateWrites:
+    @pytest.mark.skipif(
+        connection.vendor == "sqlite",
+        reason="SQLite reports table locks to concurrent writers instead of waiting",
+    )
+    def test_parallel_syncs(self, user, game_state_factory):
+        # GIVEN a game state with no gold
+        # WHEN several tabs sync battle results at the same time
+        # THEN every sync's gold and quest tokens are kept
+        game_state_factory()
+
+        def _sync():
+            client = APIClient()
+            client.force_authenticate(user)
+            response = client.post(
+                "/api/do-again/game/sync/",
+                {"gold": 3, "xp": 0, "streak": 1, "hero_hp": 10, "quest_tokens": 1},
+                format="json",
+            )
+            assert response.status_code == 200, response.content
+
+        errors = _run_in_threads(_sync, 8)
+        assert not errors, errors
+        game_state = models.GameState.objects.get(owner=user)
+        assert game_state.gold == 24
+        assert game_state.quest_tokens == 8
+
+    def test_stale_instance_does_not_clobber(self, game_state_factory):
+        # GIVEN two requests holding the same (soon stale) game state
+        # WHEN both apply a delta
+        # THEN both deltas are kept and untouched columns are not rewritten
+        game_state = game_state_factory(items=["sword"])
+        first = models.GameState.objects.get(pk=game_state.pk)
+        second = models.GameState.objects.get(pk=game_state.pk)
+        models.GameState.objects.filter(pk=game_state.pk).update(items=["shield"])
+        for stale in (first, second):
+            services.GameStateService().update(
+                game_state=stale,
+                game_effect=services.GameEffect(
+                    game_state_delta=services.GameStateDelta(gold=5, xp=10)
+                ),
+            )
+        game_state.refresh_from_db()
+        assert game_state.gold == 10
+        assert game_state.xp == 20
+        assert game_state.items == ["shield"]
+
+
+class TestStaleCachedGameState:
+    """Another request's write lands after this one's GameState was cached
+    and before it spends, as it would if they ran in parallel; the spend
+    must build on the row, not on the cached copy."""
+
+    @pytest.fixture
+    def client(self, user) -> APIClient:
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def _cache_then_write(self, user, **values) -> None:
+        repositories.GameStateRepository().get(user)
+        # bypassing the repository, so the cached copy goes stale
+        models.GameState.objects.filter(owner=user).update(**values)
+
+    def test_accept_quest_keeps_delta(self, user, client, game_state_factory):
+        game_state = game_state_factory(quest_tokens=3)
+        self._cache_then_write(user, quest_tokens=F("quest_tokens") + 5)
+        response = client.post("/api/do-again/game/accept_quest/", {"cost": 2})
+        assert response.status_code == 200
+        game_state.refresh_from_db()
+        assert game_state.quest_tokens == 6
+        assert response.json()["quest_tokens"] == 6
+
+    def test_accept_quest_cannot_overspend(self, user, client, game_state_factory):
+        game_state = game_state_factory(quest_tokens=1)
+        # the other request spent the last token
+        self._cache_then_write(user, quest_tokens=0)
+        response = client.post("/api/do-again/game/accept_quest/", {"cost": 1})
+        assert response.status_code == 400
+        assert response.json()["error"] == "Not enough quest tokens. Need 1, have 0."
+        game_state.refresh_from_db()
+        assert game_state.quest_tokens == 0
+
+    def test_meta_upgrade_keeps_delta(self, user, client, game_state_factory):
+        game_state = game_state_factory(souls=20)
+        self._cache_then_write(user, souls=F("souls") + 10)
+        response = client.post(
+            "/api/do-again/game/meta_upgrade/", {"upgrade": "attack"}
+        )
+        assert response.status_code == 200
+        game_state.refresh_from_db()
+        assert (game_state.souls, game_state.perm_attack) == (20, 1)
+
+    def test_meta_upgrade_conflict(self, user, client, game_state_factory, monkeypatch):
+        # GIVEN another request that upgrades between this one's read and spend
+        game_state_factory(souls=30)
+        repository = repositories.GameStateRepository
+        read = repository.get_current
+
+        def read_then_upgrade(self, owner, **kwargs):
+            current = read(self, owner, **kwargs)
+            models.GameState.objects.filter(owner=owner).update(
+                souls=F("souls") - 10, perm_attack=1
+            )
+            return current
+
+        monkeypatch.setattr(repository, "get_current", read_then_upgrade)
+        response = client.post(
+            "/api/do-again/game/meta_upgrade/", {"upgrade": "attack"}
+        )
+        # THEN the upgrade isn't bought twice at the old price
+        assert response.status_code == 409
+        game_state = models.GameState.objects.get(owner=user)
+        assert (game_state.souls, game_state.perm_attack) == (20, 1)
+
+    def test_run_over_keeps_delta(self, user, client, game_state_factory):
+        game_state = game_state_factory(souls=5)
+        self._cache_then_write(user, souls=F("souls") + 10)
+        response = client.post("/api/do-again/game/run_over/")
+        assert response.status_code == 200
+        game_state.refresh_from_db()
+        assert game_state.souls == 15 + response.json()["souls_earned"]
@@ -0,0 +1,164 @@
+import datetime
+import re
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from do_again_list import durations
+from do_again_list import models as m
+from do_again_list import serializers as s
+
+
+def legacy_parse_ms(value: str) -> float:
+    """The seven-regex parser durations.parse_ms replaced."""
+    total = 0.0
+    for pattern, seconds in (
+        (r"([\d\.]+)y", 365 * 24 * 60 * 60),
+        (r"([\d\.]+)mo", 30 * 24 * 60 * 60),
+        (r"([\d\.]+)w", 7 * 24 * 60 * 60),
+        (r"([\d\.]+)d", 24 * 60 * 60),
+        (r"([\d\.]+)h", 60 * 60),
+        (r"([\d\.]+)m(?!o)", 60),
+        (r"([\d\.]+)s", 1),
+    ):
+        match = re.search(pattern, value)
+        if match:
+            total += float(match.group(1)) * seconds * 1000
+    return total
+
+
+whole_seconds = st.integers(min_value=0, max_value=200 * 365 * 24 * 60 * 60)
+amounts = st.one_of(
+    st.integers(min_value=0, max_value=10_000).map(str),
+    st.decimals(min_value=0, max_value=1000, places=2).map(str),
+)
+# distinct units in any order, as a user might type them
+duration_strings = st.lists(
+    st.tuples(amounts, st.sampled_from(list(durations.UNIT_SECONDS))),
+    max_size=7,
+    unique_by=lambda token: token[1],
+).map(lambda tokens: "".join(amount + unit for amount, unit in tokens))
+
+
+class TestParse:
+    @given(duration_strings)
+    def test_matches_legacy_parser(self, value):
+        assert durations.parse_ms(value) == pytest.approx(legacy_parse_ms(value))
+        assert durations.parse_ms(value, strict=True) == durations.parse_ms(value)
+
+    @given(st.text())
+    def test_lenient_never_raises(self, value):
+        assert durations.parse_ms(value) >= 0
+
+    @given(st.text(alphabet="0123456789.ymowdhs x-:", max_size=12))
+    def test_strict_accepts_only_durations(self, value):
+        tokens = re.findall(r"(?:\d+\.?\d*|\.\d+)(?:mo|[ywdhms])", value)
+        units = [re.sub(r"[\d.]", "", token) for token in tokens]
+        valid = re.fullmatch(
+            r"\s*(?:(?:\d+\.?\d*|\.\d+)(?:mo|[ywdhms])\s*)*", value
+        ) and len(set(units)) == len(units)
+        if valid:
+            durations.parse_ms(value, strict=True)
+        else:
+            with pytest.raises(durations.DurationParseError):
+                durations.parse_ms(value, strict=True)
+
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [
+            ("", 0),
+            ("1d 5h", (29 * 60 * 60) * 1000),
+            ("2mo", 60 * 24 * 60 * 60 * 1000),
+            ("1.5m", 90_000),
+            ("30", 0),
+            ("5 h", 0),
+        ],
+    )
+    def test_examples(self, value, expected):
+        assert durations.parse_ms(value) == expected
+
+    @pytest.mark.parametrize("value", ["30", "5 h", "1h1h", "soon", "1d,2h"])
+    def test_strict_rejects(self, value):
+        with pytest.raises(durations.DurationParseError):
+            durations.parse_ms(value, strict=True)
+
+    def test_numbers_are_seconds(self):
+        assert durations.parse(90) == datetime.timedelta(seconds=90)
+        assert durations.parse(1.5) == datetime.timedelta(seconds=1.5)
+        assert durations.parse(0) is None
+
+    @pytest.mark.parametrize("value", [True, None, [], {"h": 1}])
+    def test_other_types_rejected(self, value):
+        with pytest.raises(durations.DurationParseError):
+            durations.parse(value)
+
+
+class TestHumanize:
+    @given(whole_seconds)
+    def test_round_trip(self, seconds):
+        assert durations.parse_ms(durations.humanize_seconds(seconds)) == seconds * 1000
+
+    def test_longer_than_a_day(self):
+        assert durations.humanize_seconds(400 * 24 * 60 * 60 + 61) == "1y1mo5d1m1s"
+        assert durations.humanize(datetime.timedelta(days=9, seconds=1.5)) == "1w2d1s"
+
+    def test_fractional_seconds(self):
+        assert durations.humanize_seconds(90.5) == "1m30.5s"
+        assert durations.humanize_seconds(3600.0) == "1h"
+
+    def test_negative(self):
+        # as the old utils.humanize_timedelta rendered them
+        assert durations.humanize_seconds(-90) == "23h58m30s"
+        assert durations.humanize(datetime.timedelta(days=-3, hours=2)) == "2h"
+        assert durations.humanize(datetime.timedelta(seconds=-1)) == "23h59m59s"
+
+    def test_negative_stored_duration_serializes(self):
+        # GIVEN an activity whose stored duration went negative
+        activity = m.Activity(
+            title="negative", default_duration=datetime.timedelta(minutes=-5)
+        )
+        # WHEN it's serialized
+        # THEN it renders rather than failing the whole list
+        assert s.ActivitySerializer(activity).data["default_duration"] == "23h55m"
+
+
+timedeltas = whole_seconds.map(lambda seconds: datetime.timedelta(seconds=seconds))
+
+
+class TestSerializerRoundTrip:
+    @given(default_duration=timedeltas, min_duration=timedeltas, gap=timedeltas)
+    def test_activity_serializer(self, default_duration, min_duration, gap):
+        activity = m.Activity(
+            title="round-trip",
+            default_duration=default_duration,
+            min_duration=min_duration,
+            max_time_between_events=gap,
+        )
+        data = s.ActivitySerializer(activity).data
+        serializer = s.ActivitySerializer(data=data, partial=True)
+        assert serializer.is_valid(), serializer.errors
+        assert serializer.validated_data["default_duration"] == default_duration
+        assert serializer.validated_data["min_duration"] == min_duration
+        assert serializer.validated_data["max_time_between_events"] == gap
+
+    @given(duration=timedeltas)
+    def test_import_serializer(self, duration):
+        serializer = s.ActivityImportSerializer(
+            data={
+                "title": "round-trip",
+                "default_duration": durations.humanize(duration),
+                "max_time_between_events": durations.humanize(duration),
+            }
+        )
+        assert serializer.is_valid(), serializer.errors
+        assert serializer.validated_data["default_duration"] == duration
+        assert serializer.validated_data["max_time_between_events"] == duration
+
+    def test_strict_field(self, settings):
+        settings.DO_AGAIN_LIST_STRICT_DURATIONS = True
+        serializer = s.ActivityImportSerializer(
+            data={"title": "garbage", "default_duration": "soon"}
+        )
+        assert not serializer.is_valid()
+        assert "default_duration" in serializer.errors
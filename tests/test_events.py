@@ -0,0 +1,244 @@
+import asyncio
+import datetime
+import threading
+
+import pytest
+from django.db import transaction
+from django.test import AsyncRequestFactory
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from do_again_list import events, views
+from do_again_list import services as s
+
+
+class TestPublishing:
+    def test_end_publishes_deltas(
+        self, activity, event_broker, django_capture_on_commit_callbacks
+    ):
+        start_time = timezone.now() - datetime.timedelta(minutes=10)
+        end_time = timezone.now()
+        with django_capture_on_commit_callbacks(execute=True):
+            s.ActivityService().start(activity=activity, start_time=start_time)
+        with django_capture_on_commit_callbacks(execute=True):
+            s.ActivityService().end(activity=activity, end_time=end_time)
+
+        started, ended, occurance_ended = [event for _, event in event_broker.published]
+        assert {user_id for user_id, _ in event_broker.published} == {activity.owner_id}
+        # THEN the activity events carry only the fields that changed
+        assert started == {
+            "type": "activity",
+            "id": activity.pk,
+            "fields": {
+                "state": "active",
+                "start_time": start_time.isoformat(),
+                "end_time": None,
+            },
+        }
+        assert ended["fields"]["state"] == "inactive"
+        assert ended["fields"]["end_time"] == end_time.isoformat()
+        assert "title" not in ended["fields"]
+        occurance = activity.occurances.get()
+        assert occurance_ended == {
+            "type": "occurance_ended",
+            "id": occurance.pk,
+            "activity": activity.pk,
+            "start_time": start_time,
+            "end_time": end_time,
+        }
+
+    def test_update_publishes_activity(
+        self,
+        user_api_client: APIClient,
+        activity,
+        event_broker,
+        django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = user_api_client.patch(
+                f"/api/do-again/activities/{activity.pk}/", {"title": "Renamed"}
+            )
+        assert response.status_code == 200
+        ((_, event),) = event_broker.published
+        assert event == {
+            "type": "activity",
+            "id": activity.pk,
+            "fields": {"title": "Renamed"},
+        }
+
+    def test_create_publishes_whole_activity(
+        self,
+        user_api_client: APIClient,
+        event_broker,
+        django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = user_api_client.post(
+                "/api/do-again/activities/", {"title": "Walk dog"}
+            )
+        assert response.status_code == 201
+        created = next(
+            event for _, event in event_broker.published if event["type"] == "activity"
+        )
+        # THEN it carries everything the API shows but the stats, as shown
+        listed = user_api_client.get(f"/api/do-again/activities/{created['id']}/")
+        assert created["fields"] == {
+            name: value for name, value in listed.json().items() if name != "stats"
+        }
+
+    def test_import_publishes_resync(
+        self, user, event_broker, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            s.DataImportExportService().import_upload(
+                owner=user, upload={"activities": [{"title": "Walk dog"}]}
+            )
+        assert event_broker.published == [(user.pk, events.RESYNC)]
+
+    def test_rolled_back_change_is_not_published(
+        self, activity, event_broker, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            with pytest.raises(RuntimeError), transaction.atomic():
+                s.ActivityService().start(activity=activity, start_time=timezone.now())
+                raise RuntimeError
+        assert event_broker.published == []
+
+    def test_game_state_action(
+        self,
+        user_api_client: APIClient,
+        game_state_factory,
+        event_broker,
+        django_capture_on_commit_callbacks,
+    ):
+        game_state_factory(quest_tokens=3)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = user_api_client.post(
+                "/api/do-again/game/accept_quest/", {"cost": 1}
+            )
+        assert response.status_code == 200
+        assert event_broker.published[-1][1] == {
+            "type": "game_state",
+            "fields": {"quest_tokens": 2},
+        }
+
+    def test_game_state_expressions_are_read_back(
+        self,
+        user_api_client: APIClient,
+        game_state_factory,
+        event_broker,
+        django_capture_on_commit_callbacks,
+    ):
+        game_state_factory(gold=10)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = user_api_client.post(
+                "/api/do-again/game/sync/", {"gold": 5, "streak": 2}
+            )
+        assert response.status_code == 200
+        fields = event_broker.published[-1][1]["fields"]
+        assert fields["gold"] == 15
+        assert fields["streak"] == 2
+
+
+class TestInProcessBroker:
+    def test_fan_out(self, settings):
+        settings.DO_AGAIN_LIST_EVENT_QUEUE_SIZE = 2
+        broker = events.InProcessBroker()
+
+        async def scenario():
+            first = broker.subscribe(1)
+            second = broker.subscribe(1)
+            other = broker.subscribe(2)
+            # published from a worker thread, as the sync views do
+            thread = threading.Thread(
+                target=broker.publish, args=(1, {"type": "activity", "id": 5})
+            )
+            thread.start()
+            thread.join()
+            assert await first.get(1) == {"type": "activity", "id": 5}
+            assert await second.get(1) == {"type": "activity", "id": 5}
+            assert await other.get(0.01) is None
+
+            for index in range(3):
+                broker.publish(2, {"type": "activity", "id": index})
+            await asyncio.sleep(0)
+            assert await other.get(1) == events.RESYNC
+
+            for subscription in (first, second, other):
+                broker.unsubscribe(subscription)
+            assert not broker.has_subscribers(1)
+            assert not broker.has_subscribers(2)
+
+        asyncio.run(scenario())
+
+
+class TestPostgresBroker:
+    def test_delivers_notifications(self):
+        # GIVEN a stream open in this process
+        broker = events.PostgresBroker()
+
+        async def scenario():
+            # subscribed without starting the listener, which needs PostgreSQL
+            subscription = events.InProcessBroker.subscribe(broker, 1)
+            # WHEN another process's event arrives
+            published = {"type": "activity_deleted", "id": 4}
+            broker.deliver(broker.payload(1, published))
+            # THEN the stream gets it
+            assert await subscription.get(1) == published
+
+        asyncio.run(scenario())
+
+    def test_presence_is_shared(self, monkeypatch):
+        # GIVEN two processes' brokers, one with a stream open
+        subscriber, publisher = events.PostgresBroker(), events.PostgresBroker()
+        monkeypatch.setattr(subscriber, "_listen", lambda: None)
+        assert not publisher.has_subscribers(1)
+
+        async def scenario():
+            subscriber.subscribe(1)
+
+        asyncio.run(scenario())
+        # THEN the other can tell that user is listening, and nobody else
+        assert publisher.has_subscribers(1)
+        assert not publisher.has_subscribers(2)
+
+    def test_oversized_event_resyncs(self):
+        broker = events.PostgresBroker()
+        payload = broker.payload(1, {"type": "activity", "title": "x" * 8000})
+        assert payload == '{"user":1,"event":{"type":"resync"}}'
+
+
+class TestEventStream:
+    def test_stream(self, user, settings):
+        settings.DO_AGAIN_LIST_EVENT_KEEPALIVE = 0.01
+
+        async def scenario():
+            request = AsyncRequestFactory().get("/do_again/api/events/")
+
+            async def auser():
+                return user
+
+            request.auser = auser
+            response = await views.event_stream(request)
+            assert response["Content-Type"] == "text/event-stream"
+            stream = aiter(response.streaming_content)
+            assert await anext(stream) == b"retry: 5000\n\n"
+            assert await anext(stream) == b": keepalive\n\n"
+            events.get_broker().publish(user.pk, {"type": "activity_deleted", "id": 4})
+            assert await anext(stream) == (
+                b'event: activity_deleted\ndata: {"type":"activity_deleted","id":4}\n\n'
+            )
+            # a client disconnecting cancels the task reading the stream
+            settings.DO_AGAIN_LIST_EVENT_KEEPALIVE = 60
+            reading = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0.01)
+            reading.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await reading
+            assert not events.get_broker().has_subscribers(user.pk)
+
+        asyncio.run(scenario())
+
+    def test_requires_login(self, client):
+        response = client.get("/do_again/api/events/")
+        assert response.status_code == 403
@@ -0,0 +1,91 @@
+"""
+Check that the hot lookups are served by the indexes added for them.
+
+SQLite plans are checked directly. On Postgres sequential scans are
+disabled for the check, since the planner prefers them on tiny tables.
+"""
+
+import pytest
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from do_again_list import models
+from do_again_list.services import ADD_TO_LIST_TITLE
+
+
+def _plan(queryset) -> str:
+    if connection.vendor == "postgresql":
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+    return queryset.explain()
+
+
+@pytest.fixture(autouse=True)
+def _supported_vendor():
+    if connection.vendor not in ("sqlite", "postgresql"):
+        pytest.skip(f"query plans not checked on {connection.vendor}")
+
+
+class TestOccuranceIndexes:
+    def test_open_occurance_lookup(self, activity):
+        plan = _plan(
+            models.Occurance.objects.filter(activity=activity, end_time__isnull=True)
+        )
+        assert (
+            "occurance_activity_end_idx" in plan
+            or "one_open_occurance_per_activity" in plan
+        ), plan
+
+    def test_latest_completed_lookup(self, activity):
+        plan = _plan(
+            models.Occurance.objects.filter(
+                activity=activity, end_time__isnull=False
+            ).order_by("-end_time")[:1]
+        )
+        assert "occurance_activity_end_idx" in plan, plan
+        # the index already provides the ordering
+        assert "TEMP B-TREE" not in plan, plan
+        assert "Sort" not in plan, plan
+
+    def test_one_open_occurance_per_activity(self, activity):
+        models.Occurance.objects.create(activity=activity, start_time=timezone.now())
+        with pytest.raises(IntegrityError), transaction.atomic():
+            models.Occurance.objects.create(
+                activity=activity, start_time=timezone.now()
+            )
+        # completed occurances are unaffected
+        models.Occurance.objects.create(
+            activity=activity, start_time=timezone.now(), end_time=timezone.now()
+        )
+
+
+class TestActivityIndexes:
+    def test_built_in_lookup(self, user):
+        plan = _plan(
+            models.Activity.objects.filter(
+                owner=user, is_built_in=True, title=ADD_TO_LIST_TITLE
+            )
+        )
+        assert "activity_owner_title_idx" in plan, plan
+
+    def test_due_lookup(self, user):
+        plan = _plan(
+            models.Activity.objects.filter(
+                owner=user, state=models.Activity.State.INACTIVE
+            )
+            .with_due_time()
+            .order_by("due_time")[:5]
+        )
+        assert "activity_owner_state_idx" in plan, plan
+
+
+class TestDailyRollupIndexes:
+    def test_heatmap_lookup(self, user):
+        day = timezone.localdate()
+        plan = _plan(
+            models.DailyRollup.objects.filter(
+                owner=user, day__gte=day, day__lte=day
+            ).values("day")
+        )
+        assert "dailyrollup_owner_day_idx" in plan, plan
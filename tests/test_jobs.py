@@ -0,0 +1,183 @@
+import datetime
+import gzip
+import io
+import json
+import time
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from do_again_list import jobs, models, serializers
+
+
+def _run_jobs():
+    call_command("run_jobs", "--once", stdout=io.StringIO())
+
+
+class TestJobsE2E:
+    def test_export(self, user_api_client: APIClient, bulk_seed, user, game_state):
+        # GIVEN a user with some history
+        bulk_seed(user, 3, 2)
+        # WHEN an export is queued
+        queued = user_api_client.post("/api/do-again/jobs/export/", {"version": 2})
+        assert queued.status_code == 202
+        job_url = f"/api/do-again/jobs/{queued.json()['id']}/"
+        assert user_api_client.get(job_url).json()["status"] == "queued"
+        # AND the worker runs
+        _run_jobs()
+        # THEN the job has finished and its file can be downloaded
+        job = user_api_client.get(job_url).json()
+        assert job["status"] == "succeeded"
+        assert (
+            job["progress"]
+            == job["total"]
+            == models.Activity.objects.filter(owner=user).count()
+        )
+        download = user_api_client.get(f"{job_url}download/")
+        assert download.status_code == 200
+        assert download["Content-Disposition"].endswith('.ndjson.gz"')
+        lines = gzip.decompress(b"".join(download.streaming_content)).splitlines()
+        assert json.loads(lines[0])["version"] == 2
+        assert len(lines) == 1 + job["total"]
+
+    def test_import(self, user_api_client: APIClient, user, game_state):
+        # GIVEN a queued version 1 import
+        start = timezone.now() - datetime.timedelta(days=1)
+        body = {
+            "activities": [
+                {
+                    "title": "imported",
+                    "occurances": [
+                        {
+                            "start_time": start.isoformat(),
+                            "end_time": (
+                                start + datetime.timedelta(hours=1)
+                            ).isoformat(),
+                        }
+                    ],
+                }
+            ],
+            "game_state": {"gold": 7},
+        }
+        queued = user_api_client.post("/api/do-again/jobs/import/", body, format="json")
+        assert queued.status_code == 202
+        assert not models.Activity.objects.filter(title="imported").exists()
+        # WHEN the worker runs
+        _run_jobs()
+        # THEN the data is imported and the counts reported
+        job = user_api_client.get(f"/api/do-again/jobs/{queued.json()['id']}/").json()
+        assert job["status"] == "succeeded"
+        assert job["result"] == {
+            "activities_created": 1,
+            "activities_updated": 0,
+            "occurances_added": 1,
+            "game_state_updated": True,
+        }
+        assert models.Occurance.objects.filter(activity__title="imported").count() == 1
+        game_state.refresh_from_db()
+        assert game_state.gold == 7
+
+    def test_import__invalid(self, user_api_client: APIClient, user):
+        # GIVEN a queued import with an invalid activity
+        body = {"activities": [{"title": "valid"}, {"value": 1}]}
+        queued = user_api_client.post("/api/do-again/jobs/import/", body, format="json")
+        # WHEN the worker runs
+        _run_jobs()
+        # THEN the job fails with the validation error and nothing is written
+        job = models.Job.objects.get(pk=queued.json()["id"])
+        assert job.status == models.Job.Status.FAILED
+        invalid = serializers.ActivityImportSerializer(
+            data=body["activities"], many=True
+        )
+        assert not invalid.is_valid()
+        assert json.loads(job.error) == json.loads(
+            json.dumps({"activities": invalid.errors})
+        )
+        assert not models.Activity.objects.filter(title="valid").exists()
+        assert not any(job.directory.iterdir())
+
+    def test_import__unsupported_media_type(self, user_api_client: APIClient):
+        response = user_api_client.post(
+            "/api/do-again/jobs/import/", "a,b", content_type="text/csv"
+        )
+        assert response.status_code == 415
+        assert not models.Job.objects.exists()
+
+    def test_other_users_jobs_are_hidden(
+        self, user_api_client: APIClient, user_factory
+    ):
+        other = user_factory(username="other")
+        job = jobs.enqueue_export(other, 1)
+        assert user_api_client.get("/api/do-again/jobs/").json() == []
+        assert user_api_client.get(f"/api/do-again/jobs/{job.pk}/").status_code == 404
+
+
+class TestJobs:
+    def test_claim_next_claims_once(self, user):
+        # GIVEN two queued jobs
+        first = jobs.enqueue_export(user, 1)
+        second = jobs.enqueue_export(user, 1)
+        # WHEN workers claim jobs
+        # THEN each is handed out once, oldest first
+        assert jobs.claim_next() == first
+        assert jobs.claim_next() == second
+        assert jobs.claim_next() is None
+
+    def test_purge_expired(self, user, settings):
+        # GIVEN a job that finished long ago and one that just finished
+        settings.DO_AGAIN_LIST_JOB_RETENTION = 60
+        old = jobs.run(jobs.enqueue_export(user, 1))
+        models.Job.objects.filter(pk=old.pk).update(
+            finished_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+        recent = jobs.run(jobs.enqueue_export(user, 1))
+        # WHEN expired jobs are purged
+        assert jobs.purge_expired() == 1
+        # THEN only the old one and its files are gone
+        assert not models.Job.objects.filter(pk=old.pk).exists()
+        assert not old.directory.exists()
+        assert jobs.export_path(recent).exists()
+
+    def test_fail_abandoned(self, user, settings):
+        # GIVEN a job claimed long ago whose worker died, and a long job
+        # whose worker still sends heartbeats
+        settings.DO_AGAIN_LIST_JOB_HEARTBEAT_TIMEOUT = 60
+        dead = jobs.enqueue_export(user, 1)
+        alive = jobs.enqueue_export(user, 1)
+        jobs.claim_next()
+        jobs.claim_next()
+        models.Job.objects.update(
+            started_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+        alive.directory.mkdir(parents=True)
+        (alive.directory / models.Job.PROGRESS_FILENAME).write_text("3")
+        # WHEN abandoned jobs are failed
+        _run_jobs()
+        # THEN only the dead worker's job failed
+        dead.refresh_from_db()
+        alive.refresh_from_db()
+        assert dead.status == models.Job.Status.FAILED
+        assert dead.finished_at is not None
+        assert alive.status == models.Job.Status.RUNNING
+
+    def test_heartbeat(self, user, monkeypatch):
+        # GIVEN a job that reports no progress for a while
+        monkeypatch.setattr(jobs, "_HEARTBEAT_INTERVAL", 0.01)
+        job = jobs.enqueue_export(user, 1)
+        progress_file = job.directory / models.Job.PROGRESS_FILENAME
+        beats = []
+
+        def slow_export(job, progress):
+            beats.append(progress_file.stat().st_mtime_ns)
+            time.sleep(0.1)
+            beats.append(progress_file.stat().st_mtime_ns)
+            return {}
+
+        monkeypatch.setattr(jobs, "_run_export", slow_export)
+        # WHEN it runs
+        job = jobs.run(job)
+        # THEN its progress file was rewritten meanwhile
+        assert job.status == models.Job.Status.SUCCEEDED
+        assert beats[1] > beats[0]
+        assert not progress_file.exists()
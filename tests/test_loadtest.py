@@ -0,0 +1,71 @@
+import pytest
+from django.contrib.auth.models import User
+
+from do_again_list import loadtest, models
+
+
+class TestSummarize:
+    def test_per_endpoint_figures(self):
+        # GIVEN ten fast logins, one of them failed, and one slow export
+        samples = [
+            loadtest.Sample("login", 200, (i + 1) / 1000, 3) for i in range(9)
+        ] + [
+            loadtest.Sample("login", 403, 0.010, 1),
+            loadtest.Sample("export", 200, 2.0, None),
+        ]
+        # WHEN they're summarized over a two second run
+        login, export = loadtest.summarize(samples, elapsed=2.0)
+        # THEN each endpoint gets its own rate, percentiles and query mean
+        assert (login.endpoint, login.requests, login.errors) == ("login", 10, 1)
+        assert login.throughput == 5.0
+        assert (login.p50, login.p95, login.p99) == (5.0, 10.0, 10.0)
+        assert login.queries == 2.8
+        assert (export.requests, export.p99, export.queries) == (1, 2000.0, None)
+
+    def test_percentile_is_nearest_rank(self):
+        assert loadtest.percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+        assert loadtest.percentile([1.0, 2.0, 3.0, 4.0], 51) == 3.0
+        assert loadtest.percentile([7.0], 99) == 7.0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRun:
+    def test_client_flow(self):
+        # GIVEN two synthetic users run one after the other in-process
+        # WHEN each goes through the client's flow with two activities
+        samples, elapsed = loadtest.run(
+            loadtest.ClientSession, users=2, iterations=2, concurrency=1
+        )
+        # THEN every request succeeded and had its queries counted
+        assert elapsed > 0
+        assert [s for s in samples if not 200 <= s.status < 300] == []
+        assert all(s.queries is not None for s in samples)
+        counts = {
+            summary.endpoint: summary.requests
+            for summary in loadtest.summarize(samples, elapsed)
+        }
+        assert counts == {
+            "auth-user": 2,
+            "register": 2,
+            "logout": 2,
+            "login": 2,
+            "game": 2,
+            "activities": 2,
+            "activity-create": 4,
+            "activity-start": 4,
+            "activity-end": 4,
+            "game-sync": 4,
+            "run-over": 2,
+            "export": 2,
+        }
+        # AND the users' activities were completed
+        owners = User.objects.filter(username__startswith="loadtest-")
+        assert owners.count() == 2
+        assert (
+            models.Occurance.objects.filter(
+                activity__owner__in=owners,
+                activity__is_built_in=False,
+                end_time__isnull=False,
+            ).count()
+            == 4
+        )
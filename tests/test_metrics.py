@@ -0,0 +1,167 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from rest_framework.test import APIClient
+
+from do_again_list import metrics
+
+
+@pytest.fixture
+def store(monkeypatch) -> metrics.Store:
+    store = metrics.Store()
+    monkeypatch.setattr(metrics, "store", store)
+    return store
+
+
+def _observe(store, route="activity-list", duration=0.02, queries=3, size=500):
+    store.observe(
+        route=route,
+        method="GET",
+        status=200,
+        duration=duration,
+        usage=metrics.Usage(queries=queries, seconds=0.004),
+        size=size,
+    )
+
+
+class TestRender:
+    def test_histograms_are_cumulative(self, store):
+        # GIVEN a fast and a slow request to the same route
+        _observe(store, duration=0.02)
+        _observe(store, duration=3.0, size=None)
+        # WHEN they're rendered
+        text = metrics.render(metrics.merge([store.snapshot()]))
+        # THEN each bucket counts the requests at or under its bound
+        labels = 'route="activity-list",method="GET"'
+        name = "do_again_list_request_duration_seconds"
+        assert f'{name}_bucket{{{labels},le="0.025"}} 1' in text
+        assert f'{name}_bucket{{{labels},le="2.5"}} 1' in text
+        assert f'{name}_bucket{{{labels},le="5"}} 2' in text
+        assert f'{name}_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f"{name}_sum{{{labels}}} 3.02" in text
+        assert f"{name}_count{{{labels}}} 2" in text
+        assert f'do_again_list_requests_total{{{labels},status="200"}} 2' in text
+        # AND the streamed response has no size
+        assert f"do_again_list_response_size_bytes_count{{{labels}}} 1" in text
+
+    def test_escapes_label_values(self, store):
+        _observe(store, route='odd "route"\\')
+        text = metrics.render(metrics.merge([store.snapshot()]))
+        assert 'route="odd \\"route\\"\\\\"' in text
+
+
+class TestCollect:
+    def test_adds_up_other_workers(self, store, metrics_dir):
+        # GIVEN another worker's file with one request and this worker with two
+        other = metrics.Store()
+        _observe(other)
+        other.write(str(metrics_dir))
+        _observe(store)
+        _observe(store, route="activity-end")
+        # WHEN the metrics are collected
+        collected = metrics.collect()
+        # THEN the counts are summed per series
+        assert collected["requests"] == {
+            ("activity-list", "GET", "200"): 2,
+            ("activity-end", "GET", "200"): 1,
+        }
+        series = collected["histograms"][metrics.DB_QUERIES.name]
+        assert series[("activity-list", "GET")][-1] == 6
+
+    def test_written_at_most_every_interval(self, store, metrics_dir, settings):
+        settings.DO_AGAIN_LIST_METRICS_WRITE_INTERVAL = 60
+        _observe(store)
+        store.write_if_due()
+        _observe(store)
+        store.write_if_due()
+        written = json.loads((metrics_dir / store.filename).read_text())
+        assert written["requests"] == [[["activity-list", "GET", "200"], 1]]
+
+    def test_recycled_pid_starts_a_new_file(self, store, metrics_dir):
+        # GIVEN a worker's file, and a new worker given the same pid
+        dead = metrics.Store()
+        _observe(dead)
+        dead.write(str(metrics_dir))
+        recycled = metrics.Store()
+        _observe(recycled, route="activity-end")
+        # WHEN the new worker writes its counts
+        recycled.write(str(metrics_dir))
+        # THEN the dead worker's counts are still there
+        assert metrics.collect()["requests"] == {
+            ("activity-list", "GET", "200"): 1,
+            ("activity-end", "GET", "200"): 1,
+        }
+
+    def test_exiting_worker_is_archived(self, store, metrics_dir):
+        # GIVEN a worker that wrote its counts
+        other = metrics.Store()
+        _observe(other)
+        other.write(str(metrics_dir))
+        # WHEN it exits
+        other.retire(str(metrics_dir))
+        # THEN its file is gone but its counts are kept
+        assert [path.name for path in metrics_dir.glob("*.json")] == ["exited.json"]
+        assert metrics.collect()["requests"] == {("activity-list", "GET", "200"): 1}
+
+    def test_killed_worker_is_archived(self, store, metrics_dir):
+        # GIVEN the file of a worker that was killed before it could retire
+        process = subprocess.run(
+            [sys.executable, "-c", "import os; print(os.getpid())"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        other = metrics.Store()
+        _observe(other)
+        other.write(str(metrics_dir))
+        (metrics_dir / other.filename).rename(
+            metrics_dir / f"{process.stdout.strip()}-dead.json"
+        )
+        # WHEN the metrics are collected, twice
+        first = metrics.collect()
+        second = metrics.collect()
+        # THEN its counts are archived, once
+        assert (
+            first["requests"]
+            == second["requests"]
+            == {("activity-list", "GET", "200"): 1}
+        )
+        assert [path.name for path in metrics_dir.glob("*.json")] == ["exited.json"]
+
+
+class TestMiddleware:
+    def test_records_drf_view(self, store, user_api_client: APIClient, activity):
+        # GIVEN a user with an activity
+        # WHEN the activity list is requested
+        response = user_api_client.get("/api/do-again/activities/")
+        # THEN its timings are in the header and its route in the store
+        assert response["Server-Timing"].startswith("db;dur=")
+        assert 'queries", total;dur=' in response["Server-Timing"]
+        assert store.requests == {("activity-list", "GET", "200"): 1}
+        queries = store.histograms[metrics.DB_QUERIES.name][("activity-list", "GET")]
+        assert queries[0] == 0  # no request without queries
+
+
+class TestMetricsEndpoint:
+    def test_staff_only(self, store, user_api_client: APIClient):
+        assert user_api_client.get("/api/do-again/metrics/").status_code == 403
+
+    def test_prometheus_text(self, store, user_factory):
+        # GIVEN a staff member scraping with basic authentication
+        user_factory(username="ops", password="scrape", is_staff=True)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Basic b3BzOnNjcmFwZQ==")
+        client.get("/api/do-again/game/")
+        # WHEN the metrics are fetched
+        response = client.get("/api/do-again/metrics/")
+        # THEN they're in the Prometheus text format
+        assert response.status_code == 200
+        assert response["Content-Type"] == metrics.CONTENT_TYPE
+        text = response.content.decode()
+        assert "# TYPE do_again_list_request_duration_seconds histogram" in text
+        assert (
+            'do_again_list_requests_total{route="gamestate-list",method="GET",'
+            'status="200"} 1'
+        ) in text
@@ -41,3 +41,18 @@ class TestActivityModel:
 
     def test_moral_quality__neutral_neither(self, activity):
         assert activity.moral_quality == models.Activity.MoralQuality.NEUTRAL
+
+    def test_refresh_occurance_summary(self, activity):
+        # GIVEN occurances written directly, bypassing ActivityService
+        # WHEN the summary is refreshed
+        # THEN the stored columns match the occurances
+        end_time = timezone.now()
+        models.Occurance.objects.create(
+            activity=activity, start_time=end_time, end_time=end_time
+        )
+        assert activity.state == models.Activity.State.PENDING
+        activity.refresh_occurance_summary()
+        activity.refresh_from_db()
+        assert activity.state == models.Activity.State.INACTIVE
+        assert activity.current_end_time == end_time
+        assert activity.last_completed_end_time == end_time
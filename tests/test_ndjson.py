@@ -0,0 +1,66 @@
+import datetime
+import gzip
+
+import pytest
+
+from do_again_list import ndjson
+
+UTC = datetime.timezone.utc
+
+
+def _at(seconds: int) -> datetime.datetime:
+    return datetime.datetime(2024, 3, 1, tzinfo=UTC) + datetime.timedelta(
+        seconds=seconds
+    )
+
+
+class TestOccuranceColumns:
+    def test_round_trip(self):
+        rows = [
+            (_at(-600), _at(0), _at(1800)),
+            (None, _at(86400), _at(86400 + 60)),
+            (_at(90000), _at(90000), None),
+        ]
+        columns = ndjson.encode_occurances(rows)
+        assert columns == {
+            "start_time": [int(_at(0).timestamp()), 86400, 3600],
+            "end_time": [1800, 60, None],
+            "planned_time": [-600, None, 0],
+        }
+        assert [
+            (o["planned_time"], o["start_time"], o["end_time"])
+            for o in ndjson.decode_occurances(columns)
+        ] == rows
+
+    def test_drops_sub_seconds_and_empty_planned_time(self):
+        start = _at(0).replace(microsecond=999_999)
+        columns = ndjson.encode_occurances([(None, start, None)])
+        assert "planned_time" not in columns
+        (occurance,) = ndjson.decode_occurances(columns)
+        assert occurance["start_time"] == _at(0)
+
+    @pytest.mark.parametrize(
+        "columns",
+        [
+            [],
+            {"start_time": [1, 2], "end_time": [None]},
+            {"start_time": ["soon"], "end_time": [None]},
+        ],
+    )
+    def test_rejects_malformed(self, columns):
+        with pytest.raises(ValueError):
+            ndjson.decode_occurances(columns)
+
+
+class TestLines:
+    def test_gzip_round_trip(self):
+        documents = [{"version": 2}, *({"title": str(i)} for i in range(1000))]
+        body = b"".join(
+            ndjson.gzip_chunks((ndjson.dumps(d) for d in documents), buffer_size=100)
+        )
+        assert list(ndjson.read_lines(body)) == documents
+        assert list(ndjson.read_lines(gzip.decompress(body))) == documents
+
+    def test_rejects_non_object_line(self):
+        with pytest.raises(ValueError, match="line 2"):
+            list(ndjson.read_lines(b'{"version": 2}\n[1, 2]\n'))
@@ -0,0 +1,272 @@
+"""
+Query-count budgets for every API endpoint.
+
+Each endpoint is called for users seeded at several scales of
+activities x occurances. The number of SQL queries must not change with
+scale; a difference means an N+1 crept in.
+"""
+
+import itertools
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from do_again_list import models
+
+# (activities, occurances per activity)
+SCALES = [(1, 1), (10, 5), (30, 20)]
+
+_usernames = itertools.count()
+
+
+@dataclass
+class Seeded:
+    client: APIClient
+    user: object
+    activity: models.Activity
+    occurance: models.Occurance
+
+
+@dataclass
+class Endpoint:
+    name: str
+    call: Callable[[Seeded], object]
+
+
+def _json(method: str, url: str | Callable[[Seeded], str], body=None):
+    def _call(seeded: Seeded):
+        path = url(seeded) if callable(url) else url
+        data = body(seeded) if callable(body) else body
+        if data is None:
+            data = {}
+        return getattr(seeded.client, method)(path, data, format="json")
+
+    return _call
+
+
+def _streamed(call: Callable[[Seeded], object]):
+    """Consume a streaming response inside the capture, where its queries run."""
+
+    def _call(seeded: Seeded):
+        response = call(seeded)
+        b"".join(response.streaming_content)  # type: ignore[attr-defined]
+        return response
+
+    return _call
+
+
+ENDPOINTS = [
+    Endpoint("activities-list", _json("get", "/api/do-again/activities/")),
+    Endpoint(
+        "activities-detail",
+        _json("get", lambda s: f"/api/do-again/activities/{s.activity.pk}/"),
+    ),
+    Endpoint(
+        "activities-create",
+        _json("post", "/api/do-again/activities/", {"title": "budget"}),
+    ),
+    Endpoint(
+        "activities-update",
+        _json(
+            "patch",
+            lambda s: f"/api/do-again/activities/{s.activity.pk}/",
+            {"display_name": "renamed"},
+        ),
+    ),
+    Endpoint(
+        "activities-delete",
+        _json("delete", lambda s: f"/api/do-again/activities/{s.activity.pk}/"),
+    ),
+    Endpoint(
+        "activities-start",
+        _json(
+            "post",
+            lambda s: f"/api/do-again/activities/{s.activity.pk}/start/",
+            {"start_time": timezone.now().isoformat()},
+        ),
+    ),
+    Endpoint(
+        "activities-end",
+        _json(
+            "post",
+            lambda s: f"/api/do-again/activities/{s.activity.pk}/end/",
+            {"end_time": timezone.now().isoformat()},
+        ),
+    ),
+    Endpoint(
+        "activities-set-next",
+        _json(
+            "post",
+            lambda s: f"/api/do-again/activities/{s.activity.pk}/set_next/",
+            {"next_time": timezone.now().isoformat()},
+        ),
+    ),
+    Endpoint(
+        "activities-batch",
+        _json(
+            "post",
+            "/api/do-again/activities/batch/",
+            lambda s: [
+                {
+                    "id": s.activity.pk,
+                    "action": "start",
+                    "start_time": timezone.now().isoformat(),
+                },
+                {
+                    "id": s.activity.pk,
+                    "action": "end",
+                    "end_time": timezone.now().isoformat(),
+                },
+            ],
+        ),
+    ),
+    Endpoint(
+        "activities-resist-impulse",
+        _json(
+            "post",
+            lambda s: f"/api/do-again/activities/{s.activity.pk}/resist_impulse/",
+        ),
+    ),
+    Endpoint("activities-due", _json("get", "/api/do-again/activities/due/")),
+    Endpoint(
+        "activities-analytics", _json("get", "/api/do-again/activities/analytics/")
+    ),
+    Endpoint(
+        "activities-stats",
+        _json("get", lambda s: f"/api/do-again/activities/{s.activity.pk}/stats/"),
+    ),
+    Endpoint("occurances-list", _json("get", "/api/do-again/occurances/")),
+    Endpoint(
+        "occurances-detail",
+        _json("get", lambda s: f"/api/do-again/occurances/{s.occurance.pk}/"),
+    ),
+    Endpoint("game-list", _json("get", "/api/do-again/game/")),
+    Endpoint(
+        "game-sync",
+        _json(
+            "post",
+            "/api/do-again/game/sync/",
+            {"gold": 5, "xp": 150, "streak": 2, "hero_hp": 50, "quest_tokens": 1},
+        ),
+    ),
+    Endpoint("game-run-over", _json("post", "/api/do-again/game/run_over/")),
+    Endpoint(
+        "game-meta-upgrade",
+        _json("post", "/api/do-again/game/meta_upgrade/", {"upgrade": "attack"}),
+    ),
+    Endpoint(
+        "game-accept-quest",
+        _json("post", "/api/do-again/game/accept_quest/", {"cost": 1}),
+    ),
+    Endpoint("changes-full", _json("get", "/api/do-again/changes/")),
+    Endpoint(
+        "changes-since-cursor",
+        lambda s: s.client.get("/api/do-again/changes/", {"cursor": "0"}),
+    ),
+    Endpoint("data-export", _streamed(_json("get", "/api/do-again/data/export/"))),
+    Endpoint(
+        "data-export-v2",
+        _streamed(lambda s: s.client.get("/api/do-again/data/export/", {"version": 2})),
+    ),
+    Endpoint(
+        "data-import",
+        _json(
+            "post",
+            "/api/do-again/data/import/",
+            {
+                "activities": [
+                    {
+                        "title": "seeded-0",
+                        "occurances": [{"start_time": "2020-01-01T00:00:00Z"}],
+                    },
+                    {
+                        "title": "imported",
+                        "default_duration": "30m",
+                        "occurances": [
+                            {
+                                "start_time": "2020-01-01T00:00:00Z",
+                                "end_time": "2020-01-01T01:00:00Z",
+                            }
+                        ],
+                    },
+                ],
+                "game_state": {"gold": 10},
+            },
+        ),
+    ),
+    Endpoint("heatmap", _json("get", "/api/do-again/heatmap/")),
+    Endpoint(
+        "heatmap-activity",
+        lambda s: s.client.get("/api/do-again/heatmap/", {"activity": s.activity.pk}),
+    ),
+    Endpoint("jobs-list", _json("get", "/api/do-again/jobs/")),
+    Endpoint(
+        "jobs-export", _json("post", "/api/do-again/jobs/export/", {"version": 2})
+    ),
+    Endpoint(
+        "jobs-import",
+        _json("post", "/api/do-again/jobs/import/", {"activities": [{"title": "a"}]}),
+    ),
+    Endpoint("auth-user", _json("get", "/do_again/api/auth/user/")),
+    Endpoint(
+        "auth-register",
+        _json(
+            "post",
+            "/do_again/api/auth/register/",
+            lambda s: {
+                "username": f"{s.user.username}-registrant",
+                "password": "well-known",
+            },
+        ),
+    ),
+    Endpoint(
+        "auth-login",
+        _json(
+            "post",
+            "/do_again/api/auth/login/",
+            lambda s: {"username": s.user.username, "password": "well-known"},
+        ),
+    ),
+    Endpoint("auth-logout", _json("post", "/do_again/api/auth/logout/")),
+]
+
+
+@pytest.fixture
+def seed_scale(user_factory, bulk_seed, settings):
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+    def _seed(n_activities: int, n_occurances: int) -> Seeded:
+        user = user_factory(username=f"budget-user-{next(_usernames)}")
+        activities = bulk_seed(user, n_activities, n_occurances)
+        activity = activities[0]
+        activity.is_break = True
+        activity.impulse_resisted_count = 1
+        activity.save()
+        models.GameState.objects.create(owner=user, souls=1000, quest_tokens=10)
+        client = APIClient()
+        client.login(username=user.username, password="well-known")
+        return Seeded(
+            client=client,
+            user=user,
+            activity=activity,
+            occurance=activity.occurances.first(),
+        )
+
+    return _seed
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS, ids=lambda endpoint: endpoint.name)
+def test_query_count_is_independent_of_scale(endpoint: Endpoint, seed_scale):
+    counts = {}
+    for scale in SCALES:
+        seeded = seed_scale(*scale)
+        with CaptureQueriesContext(connection) as context:
+            response = endpoint.call(seeded)
+        assert response.status_code < 400, response.content  # type: ignore[attr-defined]
+        counts[scale] = len(context.captured_queries)
+    assert len(set(counts.values())) == 1, f"query count varies with scale: {counts}"
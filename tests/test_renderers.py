@@ -0,0 +1,85 @@
+import datetime
+import decimal
+import io
+import uuid
+
+import pytest
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+
+from do_again_list import jsonlib
+from do_again_list.parsers import JSONParser
+from do_again_list.renderers import JSONRenderer
+
+PAYLOAD = {
+    "title": "Stretch — 5 min",
+    "created": datetime.datetime(2024, 3, 1, 12, 30, 5, 123456, tzinfo=datetime.UTC),
+    "offset": datetime.datetime(
+        2024, 3, 1, 12, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=2))
+    ),
+    "day": datetime.date(2024, 3, 1),
+    "gap": datetime.timedelta(hours=1, seconds=30),
+    "ratio": decimal.Decimal("1.25"),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "counts": {1: "one"},
+    "items": [1, 2.5, None, True, {"nested": []}],
+    "separator": "a b",
+}
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def backend(request, settings):
+    settings.DO_AGAIN_LIST_JSON_ACCELERATED = request.param
+    if request.param and jsonlib.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+class TestJSONRenderer:
+    def test_matches_drf(self, backend):
+        assert JSONRenderer().render(PAYLOAD) == renderers.JSONRenderer().render(
+            PAYLOAD
+        )
+
+    def test_accelerated(self, settings):
+        settings.DO_AGAIN_LIST_JSON_ACCELERATED = True
+        assert jsonlib.accelerated() is (jsonlib.orjson is not None)
+
+    def test_indent_is_left_to_drf(self, backend):
+        rendered = JSONRenderer().render(PAYLOAD, "application/json; indent=2", {})
+        assert rendered == renderers.JSONRenderer().render(
+            PAYLOAD, "application/json; indent=2", {}
+        )
+        assert b'\n  "title"' in rendered
+
+    def test_huge_integer_falls_back(self, backend):
+        assert JSONRenderer().render({"n": 2**70}) == b'{"n":%d}' % 2**70
+
+    def test_none(self, backend):
+        assert JSONRenderer().render(None) == b""
+
+
+class TestJSONParser:
+    def test_matches_drf(self, backend):
+        body = renderers.JSONRenderer().render(PAYLOAD)
+        assert JSONParser().parse(io.BytesIO(body)) == parsers.JSONParser().parse(
+            io.BytesIO(body)
+        )
+
+    @pytest.mark.parametrize("body", [b"", b"{", b'{"a": NaN}'])
+    def test_malformed(self, backend, body):
+        with pytest.raises(ParseError):
+            JSONParser().parse(io.BytesIO(body))
+
+
+class TestJSONApi:
+    def test_round_trip(self, backend, user_api_client):
+        response = user_api_client.post(
+            "/api/do-again/activities/",
+            {"title": "Stretch — 5 min", "default_duration": "5m"},
+            format="json",
+        )
+        assert response.status_code == 201
+        assert response["Content-Type"] == "application/json"
+        activities = user_api_client.get("/api/do-again/activities/").json()
+        assert "Stretch — 5 min" in [activity["title"] for activity in activities]
@@ -0,0 +1,90 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from do_again_list import models, repositories, services
+
+
+@pytest.fixture(params=["locmem", "filebased"])
+def game_state_cache(request, settings, tmp_path):
+    backends = {
+        "locmem": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "filebased": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        },
+    }
+    settings.CACHES = {**settings.CACHES, "game_state": backends[request.param]}
+    settings.DO_AGAIN_LIST_GAME_STATE_CACHE = "game_state"
+    yield caches["game_state"]
+    caches["game_state"].clear()
+
+
+class TestGameStateRepository:
+    def test_get__cached(self, user, game_state_cache):
+        # GIVEN a user without a game state
+        # WHEN the game state is read twice
+        # THEN it is created once and the second read makes no queries
+        repository = repositories.GameStateRepository()
+        game_state, created = repository.get(user)
+        assert created
+        with CaptureQueriesContext(connection) as context:
+            cached, created = repository.get(user)
+        assert not created
+        assert cached.pk == game_state.pk
+        assert len(context.captured_queries) == 0
+
+    def test_save__invalidates(self, user, game_state_cache):
+        # GIVEN a cached game state
+        # WHEN it is changed through a write path
+        # THEN the next read reflects the change
+        repository = repositories.GameStateRepository()
+        game_state, _ = repository.get(user)
+        services.GameStateService().update(
+            game_state=game_state,
+            game_effect=services.GameEffect(
+                game_state_delta=services.GameStateDelta(gold=7)
+            ),
+        )
+        reread, _ = repository.get(user)
+        assert reread.gold == game_state.gold == 7
+
+    def test_view_write_invalidates(self, user, user_api_client, game_state_cache):
+        # GIVEN a cached game state
+        # WHEN quest tokens are spent through the API
+        # THEN the game list endpoint reports the new balance
+        game_state, _ = repositories.GameStateRepository().get(user)
+        game_state.quest_tokens = 3
+        repositories.GameStateRepository().save(game_state)
+        assert user_api_client.get("/api/do-again/game/").json()[0]["quest_tokens"] == 3
+        response = user_api_client.post(
+            "/api/do-again/game/accept_quest/", {"cost": 2}, format="json"
+        )
+        assert response.status_code == 200
+        assert user_api_client.get("/api/do-again/game/").json()[0]["quest_tokens"] == 1
+
+    def test_write_during_read_is_not_cached(
+        self, user, game_state_factory, game_state_cache, monkeypatch
+    ):
+        # GIVEN a write that commits and invalidates between a cache miss's
+        # read of the row and its caching of what it read
+        game_state_factory(gold=1)
+        repository = repositories.GameStateRepository()
+        manager = models.GameState.objects
+        read = manager.get_or_create
+
+        def read_then_write(**kwargs):
+            result = read(**kwargs)
+            manager.filter(owner=user).update(gold=9)
+            repository.invalidate(user.pk)
+            return result
+
+        monkeypatch.setattr(manager, "get_or_create", read_then_write)
+        stale, _ = repository.get(user)
+        monkeypatch.undo()
+        assert stale.gold == 1
+        # WHEN the game state is read again
+        reread, _ = repository.get(user)
+        # THEN the write is seen rather than the state read before it
+        assert reread.gold == 9
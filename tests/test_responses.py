@@ -0,0 +1,99 @@
+import datetime
+from dataclasses import asdict
+
+import pytest
+from django.utils import timezone
+
+from do_again_list import responses, services
+from do_again_list import serializers as s
+
+EFFECTS = {
+    "empty": services.GameEffect(),
+    "full": services.GameEffect(
+        game_state_delta=services.GameStateDelta(xp=5, gold=3),
+        spawn_enemy=services.SpawnEnemy(
+            level=2, stat_modifier=services.StatModifier(attack=-2, defense=-1)
+        ),
+        hero_buffs=[
+            services.Buff(stat=stat, amount=amount, label="run [good]")
+            for stat, amount in zip(services.Stat, (2, 1, 0))
+        ],
+        reset_streak=True,
+        messages=["Good habit on schedule!", "Level up!"],
+        pending_heal=True,
+        pending_fatigue=True,
+        resource_ref=services.ResourceRef(klass="Activity", pk=7),
+    ),
+}
+
+
+def validated_response(game_state, game_effect):
+    """The response as it was built before ``do_again_list.responses``."""
+    serializer = s.ActivityResponseSerializer(
+        data={
+            "game": game_state,
+            "success": True,
+            "error": None,
+            "messages": game_effect.messages,
+            "spawn_enemy": asdict(game_effect.spawn_enemy)
+            if game_effect.spawn_enemy is not None
+            else None,
+            "hero_buffs": [asdict(buff) for buff in game_effect.hero_buffs],
+            "pending_heal": game_effect.pending_heal,
+            "pending_fatigue": game_effect.pending_fatigue,
+            "resource_ref": asdict(game_effect.resource_ref)
+            if game_effect.resource_ref is not None
+            else None,
+        },
+        context={},
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+@pytest.fixture
+def played_game_state(game_state):
+    game_state.xp = 40
+    game_state.level = 3
+    game_state.streak = 7
+    game_state.items = [{"name": "sword"}]
+    game_state.perm_hp = 2
+    game_state.bonus_xp = 12.5
+    game_state.bonus_xp_updated_at = timezone.now() - datetime.timedelta(minutes=3)
+    game_state.save()
+    return game_state
+
+
+class TestRenderers:
+    def test_game_state(self, played_game_state):
+        assert responses.render_game_state(played_game_state) == dict(
+            s.GameStateSerializer(played_game_state).data
+        )
+
+    def test_game_state_field_order(self, played_game_state):
+        assert list(responses.render_game_state(played_game_state)) == list(
+            s.GameStateSerializer(played_game_state).data
+        )
+
+    @pytest.mark.parametrize("effect", EFFECTS.values(), ids=EFFECTS.keys())
+    def test_activity_action(self, played_game_state, effect):
+        rendered = responses.render_activity_action(played_game_state, effect)
+        assert rendered == validated_response(played_game_state, effect)
+
+    def test_error(self):
+        serializer = s.ErrorResponseSerializer(
+            data={"success": False, "error": "Cannot `end`"}
+        )
+        serializer.is_valid(raise_exception=True)
+        assert responses.render_error("Cannot `end`") == serializer.data
+
+    def test_run_over(self, played_game_state):
+        rendered = responses.render_run_over(
+            played_game_state, souls_earned=11, level_reached=3
+        )
+        assert (
+            rendered
+            == s.RunOverResponseSerializer(
+                {"game": played_game_state, "souls_earned": 11, "level_reached": 3}
+            ).data
+        )
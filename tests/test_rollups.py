@@ -0,0 +1,100 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from do_again_list import models as m
+from do_again_list import services as s
+
+
+def _rollups(owner) -> list[tuple]:
+    return list(
+        m.DailyRollup.objects.filter(owner=owner)
+        .order_by("activity_id", "day")
+        .values_list("activity_id", "day", "count", "total_duration")
+    )
+
+
+class TestDailyRollup:
+    def test_end_matches_backfill(self, user, activity_factory):
+        # GIVEN two activities completed a few times over two days
+        # WHEN the rollups kept by end() are rebuilt by the command
+        # THEN nothing changes
+        today = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        service = s.ActivityService()
+        for activity in (activity_factory(title="one"), activity_factory(title="two")):
+            for end_time in (
+                today - datetime.timedelta(days=1),
+                today - datetime.timedelta(hours=1),
+                today,
+            ):
+                activity.refresh_from_db()
+                service.start(
+                    activity=activity,
+                    start_time=end_time - datetime.timedelta(minutes=20),
+                )
+                activity.refresh_from_db()
+                service.end(activity=activity, end_time=end_time)
+
+        kept = _rollups(user)
+        assert [row[2:] for row in kept] == [
+            (1, datetime.timedelta(minutes=20)),
+            (2, datetime.timedelta(minutes=40)),
+        ] * 2
+        m.DailyRollup.objects.all().delete()
+        call_command("backfill_daily_rollups", stdout=io.StringIO())
+        assert _rollups(user) == kept
+
+
+class TestHeatmapE2E:
+    def test_year_of_days(
+        self,
+        user_api_client: APIClient,
+        user,
+        activity_factory,
+        django_assert_num_queries,
+    ):
+        first = activity_factory(title="first")
+        second = activity_factory(title="second")
+        end = datetime.date(2025, 6, 30)
+        for activity, day, count in (
+            (first, end, 2),
+            (second, end, 1),
+            (first, end - datetime.timedelta(days=364), 1),
+            # a day too early
+            (first, end - datetime.timedelta(days=365), 5),
+        ):
+            m.DailyRollup.objects.create(
+                owner=user,
+                activity=activity,
+                day=day,
+                count=count,
+                total_duration=datetime.timedelta(minutes=10 * count),
+            )
+
+        # (session + user + rollups)
+        with django_assert_num_queries(3):
+            response = user_api_client.get("/api/do-again/heatmap/", {"end": end})
+        assert response.status_code == 200
+        assert response.json() == {
+            "activity": None,
+            "start": "2024-07-01",
+            "end": "2025-06-30",
+            "days": [
+                {"day": "2024-07-01", "count": 1, "total_duration": "10m"},
+                {"day": "2025-06-30", "count": 3, "total_duration": "30m"},
+            ],
+        }
+
+        response = user_api_client.get(
+            "/api/do-again/heatmap/", {"end": end, "activity": second.pk}
+        )
+        assert response.json()["days"] == [
+            {"day": "2025-06-30", "count": 1, "total_duration": "10m"}
+        ]
+
+    def test_invalid_end(self, user_api_client: APIClient):
+        response = user_api_client.get("/api/do-again/heatmap/", {"end": "soon"})
+        assert response.status_code == 400
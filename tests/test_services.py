@@ -1,10 +1,13 @@
 import datetime
+import json
 from collections.abc import Callable
 
 import pytest
 from django.utils import timezone
+from rest_framework.exceptions import ValidationError
 
 from do_again_list import models as m
+from do_again_list import serializers
 from do_again_list import services as s
 
 
@@ -49,6 +52,46 @@ class TestActivityService:
         new_occurance = occurances.pop()
         assert new_occurance.start_time == given_time
 
+    def test_start__updates_summary(self, activity):
+        # GIVEN a pending activity
+        # WHEN I start the activity
+        # THEN the stored summary reflects the active occurance
+        given_time = timezone.now()
+        s.ActivityService().start(activity=activity, start_time=given_time)
+        activity.refresh_from_db()
+        assert activity.state == m.Activity.State.ACTIVE
+        assert activity.current_start_time == given_time
+        assert activity.current_end_time is None
+        assert activity.last_completed_end_time is None
+
+    def test_end__updates_summary(self, activity):
+        # GIVEN an active activity
+        # WHEN I end the activity
+        # THEN the stored summary reflects the completed occurance
+        start_time = timezone.now() - datetime.timedelta(minutes=10)
+        end_time = timezone.now()
+        s.ActivityService().start(activity=activity, start_time=start_time)
+        s.ActivityService().end(activity=activity, end_time=end_time)
+        activity.refresh_from_db()
+        assert activity.state == m.Activity.State.INACTIVE
+        assert activity.current_start_time == start_time
+        assert activity.current_end_time == end_time
+        assert activity.last_completed_end_time == end_time
+
+    def test_end__backdated_keeps_latest(self, activity, occurance_factory):
+        # GIVEN an activity completed an hour ago
+        # WHEN I log a completion from two hours ago
+        # THEN the summary still points at the most recent completion
+        latest_end = timezone.now() - datetime.timedelta(hours=1)
+        occurance_factory(start_time=latest_end, end_time=latest_end)
+        s.ActivityService().end(
+            activity=activity, end_time=latest_end - datetime.timedelta(hours=1)
+        )
+        activity.refresh_from_db()
+        assert activity.state == m.Activity.State.INACTIVE
+        assert activity.current_end_time == latest_end
+        assert activity.last_completed_end_time == latest_end
+
 
 class TestGameStateService:
     def test_update(self, game_state_factory):
@@ -106,3 +149,185 @@ class TestGameStateService:
         assert returned_game_state == game_state
         game_state.refresh_from_db()
         assert game_state.streak == 0
+
+
+class TestDataImportExportService:
+    def test_iter_export(self, user, bulk_seed, game_state):
+        # GIVEN more activities than fit in one chunk
+        bulk_seed(user, 5, 3)
+        service = s.DataImportExportService()
+        # WHEN the export is streamed in small chunks
+        streamed = json.loads("".join(service.iter_export(user, chunk_size=2)))
+        # THEN it is the same document export() builds
+        exported = service.export(user)
+        streamed.pop("exported_at")
+        exported.pop("exported_at")
+        assert streamed == exported
+        assert [len(a["occurances"]) for a in streamed["activities"]][-5:] == [3] * 5
+        starts = [o["start_time"] for o in streamed["activities"][-1]["occurances"]]
+        assert starts == sorted(starts)
+
+    def test_iter_export_survives_reordering(self, user, bulk_seed):
+        # GIVEN activities with their own occurances, read one per chunk
+        activities = bulk_seed(user, 4, 2)
+        service = s.DataImportExportService()
+        exported = service._iter_export_activities(user, chunk_size=1)
+        first, rows = next(exported)
+        seen = {first["title"]: len(list(rows))}
+        # WHEN the rest are reordered while the export is underway
+        for ordering, activity in enumerate(reversed(activities)):
+            m.Activity.objects.filter(pk=activity.pk).update(ordering=ordering)
+        # THEN every activity still gets exactly its own occurances
+        seen.update((fields["title"], len(list(rows))) for fields, rows in exported)
+        assert {a.title: seen[a.title] for a in activities} == {
+            a.title: 2 for a in activities
+        }
+
+    def test_do_import(self, user, activity_factory, monkeypatch):
+        # GIVEN an existing activity with one occurance
+        start = timezone.now() - datetime.timedelta(days=2)
+        existing = activity_factory(title="existing")
+        m.Occurance.objects.create(
+            activity=existing,
+            start_time=start,
+            end_time=start + datetime.timedelta(hours=1),
+        )
+        # and batches small enough that the upload spans several
+        monkeypatch.setattr(s.DataImportExportService, "IMPORT_BATCH_SIZE", 3)
+        activities = [
+            {
+                "title": "existing",
+                "value": 2.0,
+                "occurances": [
+                    {
+                        "start_time": start,
+                        "end_time": start + datetime.timedelta(hours=1),
+                    },
+                    {
+                        "start_time": start + datetime.timedelta(days=1),
+                        "end_time": None,
+                    },
+                    {
+                        "start_time": start + datetime.timedelta(days=1, hours=1),
+                        "end_time": None,
+                    },
+                ],
+            },
+            {"title": "new", "occurances": []},
+            {
+                "title": "new",
+                "occurances": [
+                    {
+                        "start_time": start,
+                        "end_time": start + datetime.timedelta(hours=2),
+                    },
+                    {
+                        "start_time": start,
+                        "end_time": start + datetime.timedelta(hours=2),
+                    },
+                ],
+            },
+        ]
+        # WHEN it is imported
+        result = s.DataImportExportService().do_import(
+            owner=user, activities=iter(activities)
+        )
+        # THEN titles are merged, duplicate and second open occurances dropped
+        assert result.activities_created == 1
+        assert result.activities_updated == 2
+        assert result.occurances_added == 2
+        assert not result.game_state_updated
+        existing.refresh_from_db()
+        assert existing.value == 2.0
+        assert existing.occurances.count() == 2
+        assert existing.state == m.Activity.State.ACTIVE
+        assert existing.current_start_time == start + datetime.timedelta(days=1)
+        new = m.Activity.objects.get(owner=user, title="new")
+        # an omitted default_duration falls back to the model default
+        assert new.default_duration == datetime.timedelta(0)
+        assert new.occurances.count() == 1
+        assert new.state == m.Activity.State.INACTIVE
+        assert new.last_completed_end_time == start + datetime.timedelta(hours=2)
+
+    def test_import_defaults_display_name(self, user, activity_factory):
+        # GIVEN an upload without display names, one for an existing activity
+        activity_factory(title="Feed cat", display_name="")
+        m.Activity.objects.filter(title="Feed cat").update(display_name="")
+        # WHEN it is imported
+        s.DataImportExportService().import_upload(
+            owner=user,
+            upload={"activities": [{"title": "Walk dog"}, {"title": "Feed cat"}]},
+        )
+        # THEN the titles stand in, as when the activities are saved one by one
+        assert dict(
+            m.Activity.objects.filter(
+                owner=user, title__in=["Walk dog", "Feed cat"]
+            ).values_list("title", "display_name")
+        ) == {"Walk dog": "Walk dog", "Feed cat": "Feed cat"}
+
+    def test_import_round_trip(self, user, user_factory, bulk_seed, game_state):
+        # GIVEN another user's export
+        bulk_seed(user, 4, 3)
+        service = s.DataImportExportService()
+        exported = json.loads("".join(service.iter_export(user)))
+        # WHEN it is validated and imported
+        serializer = serializers.DataImportSerializer(data=exported)
+        assert serializer.is_valid(), serializer.errors
+        importer = user_factory(username="importer")
+        result = service.do_import(
+            owner=importer,
+            activities=serializer.iter_activities(chunk_size=5),
+            game_state=serializer.validated_data["game_state"],
+        )
+        # THEN the importer ends up with the same document
+        assert result.occurances_added == 12
+        reexported = service.export(importer)
+        assert reexported["activities"] == exported["activities"]
+        assert reexported["game_state"] == exported["game_state"]
+
+    def test_import_keeps_occurances_within_a_second(self, user, activity_factory):
+        # GIVEN an occurance, and an upload with another a moment later
+        activity = activity_factory()
+        start = timezone.now().replace(microsecond=100_000)
+        m.Occurance.objects.create(activity=activity, start_time=start, end_time=start)
+        later = start + datetime.timedelta(milliseconds=500)
+        # WHEN it is imported
+        result = s.DataImportExportService().do_import(
+            owner=user,
+            activities=[
+                {
+                    "title": activity.title,
+                    "occurances": [
+                        {"start_time": start, "end_time": start},
+                        {"start_time": later, "end_time": later},
+                    ],
+                }
+            ],
+        )
+        # THEN only the exact duplicate is dropped
+        assert result.occurances_added == 1
+        assert activity.occurances.filter(start_time=later).exists()
+
+    def test_import_validation_error(self, user):
+        # GIVEN an upload whose third and fifth activities are invalid
+        activities = [
+            {"title": "a"},
+            {"title": "b"},
+            {"value": 1},
+            {"title": "c"},
+            {"value": 2},
+        ]
+        serializer = serializers.DataImportSerializer(data={"activities": []})
+        assert serializer.is_valid()
+        # WHEN it is imported a chunk at a time
+        with pytest.raises(ValidationError) as excinfo:
+            s.DataImportExportService().do_import(
+                owner=user,
+                activities=serializer.iter_activities(activities, chunk_size=2),
+            )
+        # THEN the errors are those of validating the whole upload at once,
+        # and nothing is written
+        whole = serializers.ActivityImportSerializer(data=activities, many=True)
+        assert not whole.is_valid()
+        assert excinfo.value.detail == {"activities": whole.errors}
+        assert not m.Activity.objects.filter(owner=user, title__in=["a", "b"]).exists()
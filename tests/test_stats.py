@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+from hypothesis import given
+from hypothesis import strategies as st
+from rest_framework.test import APIClient
+
+from do_again_list import models as m
+from do_again_list import services as s
+from do_again_list import stats
+
+
+class TestStats:
+    def test_median_is_within_a_bucket(self):
+        activity_stats = m.ActivityStats()
+        for minutes in (10, 20, 30, 40, 600):
+            stats.record_completion(
+                activity_stats,
+                interval=datetime.timedelta(minutes=minutes),
+                on_time=None,
+            )
+        median = activity_stats.median_interval
+        assert median is not None
+        assert abs(median / datetime.timedelta(minutes=30) - 1) < 0.1
+        assert activity_stats.mean_interval == datetime.timedelta(minutes=140)
+
+    def test_empty(self):
+        activity_stats = m.ActivityStats()
+        assert activity_stats.mean_interval is None
+        assert activity_stats.median_interval is None
+        assert activity_stats.on_time_rate is None
+
+    def test_streaks(self):
+        activity_stats = m.ActivityStats()
+        for on_time in (True, True, True, False, None, True):
+            stats.record_completion(activity_stats, interval=None, on_time=on_time)
+        assert activity_stats.completion_count == 6
+        assert activity_stats.scheduled_count == 5
+        assert activity_stats.on_time_rate == 0.8
+        assert activity_stats.current_streak == 1
+        assert activity_stats.best_streak == 3
+
+    @given(st.lists(st.integers(min_value=0, max_value=10**8), max_size=50))
+    def test_bucket_is_monotonic(self, seconds):
+        buckets = [
+            stats.interval_bucket(datetime.timedelta(seconds=value))
+            for value in sorted(seconds)
+        ]
+        assert buckets == sorted(buckets)
+
+
+class TestActivityStatsService:
+    def test_end_matches_refresh(self, activity):
+        # GIVEN an activity due every day
+        # WHEN it is completed on schedule, then late, then on schedule
+        # THEN the stats kept by end() match those rebuilt from history
+        activity.max_time_between_events = datetime.timedelta(days=1)
+        activity.save()
+        end_time = timezone.now() - datetime.timedelta(days=10)
+        for gap in (None, 20, 30, 10, 22):
+            if gap is not None:
+                end_time += datetime.timedelta(hours=gap)
+            s.ActivityService().end(activity=activity, end_time=end_time)
+            activity.refresh_from_db()
+
+        kept = m.ActivityStats.objects.get(activity=activity)
+        assert (kept.completion_count, kept.scheduled_count, kept.on_time_count) == (
+            5,
+            4,
+            3,
+        )
+        assert (kept.current_streak, kept.best_streak) == (2, 2)
+        m.ActivityStats.objects.all().delete()
+        m.Activity.objects.filter(pk=activity.pk).refresh_stats()
+        rebuilt = m.ActivityStats.objects.get(activity=activity)
+        for field in m.ActivityStats.COUNTER_FIELDS:
+            assert getattr(rebuilt, field) == getattr(kept, field), field
+
+    def test_backdated_completion_adds_no_interval(self, activity, occurance_factory):
+        latest_end = timezone.now() - datetime.timedelta(hours=1)
+        s.ActivityService().end(activity=activity, end_time=latest_end)
+        activity.refresh_from_db()
+        s.ActivityService().end(
+            activity=activity, end_time=latest_end - datetime.timedelta(hours=1)
+        )
+        activity_stats = m.ActivityStats.objects.get(activity=activity)
+        assert activity_stats.completion_count == 2
+        assert activity_stats.interval_count == 0
+
+
+@pytest.mark.django_db
+class TestActivityStatsE2E:
+    def test_stats_endpoint(self, user_api_client: APIClient, activity, game_state):
+        response = user_api_client.get(f"/api/do-again/activities/{activity.pk}/stats/")
+        assert response.status_code == 200
+        assert response.json() == {
+            "completion_count": 0,
+            "mean_interval": None,
+            "median_interval": None,
+            "on_time_rate": None,
+            "current_streak": 0,
+            "best_streak": 0,
+        }
+        now = timezone.now()
+        for end_time in (now - datetime.timedelta(hours=2), now):
+            user_api_client.post(
+                f"/api/do-again/activities/{activity.pk}/end/", {"end_time": end_time}
+            )
+        response = user_api_client.get(f"/api/do-again/activities/{activity.pk}/")
+        assert response.json()["stats"]["completion_count"] == 2
+        assert response.json()["stats"]["mean_interval"] == "2h"
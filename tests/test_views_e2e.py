@@ -1,5 +1,8 @@
 import datetime
+import gzip
+import json
 
+import pytest
 from django.utils import timezone
 from rest_framework.test import APIClient
 
@@ -41,3 +44,468 @@ class TestActivityViewSetE2E:
         print(response.text)
         assert response.status_code == 200
         assert response.json()["spawn_enemy"]["level"] == 2
+
+    def test_list_activities(
+        self, user_api_client: APIClient, activity_factory, django_assert_num_queries
+    ):
+        # GIVEN activities in every state
+        now = timezone.now()
+        pending = activity_factory(title="pending")
+        active = activity_factory(title="active")
+        inactive = activity_factory(title="inactive")
+        models.Occurance.objects.create(activity=active, start_time=now)
+        models.Occurance.objects.create(activity=inactive, start_time=now, end_time=now)
+        models.Activity.objects.all().refresh_occurance_summaries()
+        # WHEN the list is fetched
+        # THEN the state and times come from the stored summary columns
+        # (session + user + etag version + activities)
+        with django_assert_num_queries(4):
+            response = user_api_client.get("/api/do-again/activities/")
+        assert response.status_code == 200
+        by_title = {a["title"]: a for a in response.json()}
+        assert by_title[pending.title]["state"] == "pending"
+        assert by_title[active.title]["state"] == "active"
+        assert by_title[active.title]["start_time"] == now.isoformat()
+        assert by_title[active.title]["end_time"] is None
+        assert by_title[inactive.title]["state"] == "inactive"
+        assert by_title[inactive.title]["end_time"] == now.isoformat()
+
+    def test_shows_stored_state(self, user_api_client: APIClient, activity):
+        # GIVEN an occurance written without refreshing the activity's summary
+        models.Occurance.objects.create(activity=activity, start_time=timezone.now())
+        url = f"/api/do-again/activities/{activity.pk}/"
+        # WHEN it's fetched
+        # THEN it reports the stored state, the one the actions check
+        assert user_api_client.get(url).json()["state"] == activity.state == "pending"
+        activity.refresh_occurance_summary()
+        assert user_api_client.get(url).json()["state"] == "active"
+
+    def test_batch(self, user_api_client: APIClient, activity_factory, game_state):
+        # GIVEN two activities
+        # WHEN one is started and the other started and ended in one batch
+        # THEN every operation is applied and the game state is updated once
+        first = activity_factory(title="first")
+        second = activity_factory(title="second")
+        now = timezone.now()
+        response = user_api_client.post(
+            "/api/do-again/activities/batch/",
+            [
+                {"id": first.pk, "action": "start", "start_time": now},
+                {"id": second.pk, "action": "start", "start_time": now},
+                {"id": second.pk, "action": "end", "end_time": now, "kill_streak": 3},
+            ],
+            format="json",
+        )
+        print(response.text)
+        assert response.status_code == 200
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.state == models.Activity.State.ACTIVE
+        assert second.state == models.Activity.State.INACTIVE
+        assert second.occurances.count() == 1
+        assert response.json()["spawn_enemy"]["level"] == 2
+        game_state.refresh_from_db()
+        # 5 souls for each pending activity that was started
+        assert game_state.souls == 10
+        assert response.json()["game"]["souls"] == 10
+
+    def test_batch__rolls_back(
+        self, user_api_client: APIClient, activity_factory, game_state
+    ):
+        # GIVEN an activity
+        # WHEN a batch starts it twice
+        # THEN the batch is rejected and nothing is applied
+        activity = activity_factory()
+        now = timezone.now()
+        response = user_api_client.post(
+            "/api/do-again/activities/batch/",
+            [
+                {"id": activity.pk, "action": "start", "start_time": now},
+                {"id": activity.pk, "action": "start", "start_time": now},
+            ],
+            format="json",
+        )
+        assert response.status_code == 400
+        assert response.json()["error"].startswith("Operation 1:")
+        activity.refresh_from_db()
+        assert activity.state == models.Activity.State.PENDING
+        assert activity.occurances.count() == 0
+
+
+class TestOfflineSyncE2E:
+    def test_replayed_operation_is_applied_once(
+        self, user_api_client: APIClient, activity, game_state
+    ):
+        # GIVEN an end operation that has been applied
+        # WHEN the client retries it with the same operation id
+        # THEN the original response is returned and nothing is applied again
+        body = {"end_time": timezone.now(), "operation_id": "op-1"}
+        url = f"/api/do-again/activities/{activity.pk}/end/"
+        first = user_api_client.post(url, body, format="json")
+        retry = user_api_client.post(url, body, format="json")
+        assert first.status_code == retry.status_code == 200
+        assert retry.json() == first.json()
+        assert activity.occurances.count() == 1
+        game_state.refresh_from_db()
+        assert game_state.gold == first.json()["game"]["gold"]
+
+    def test_changes_since_cursor(
+        self, user_api_client: APIClient, activity_factory, game_state, settings
+    ):
+        settings.DO_AGAIN_LIST_CHANGES_OVERLAP = 0
+        # GIVEN a client that synced everything
+        changed = activity_factory(title="changed")
+        unchanged = activity_factory(title="unchanged")
+        deleted = activity_factory(title="deleted")
+        full = user_api_client.get("/api/do-again/changes/").json()
+        assert {a["title"] for a in full["activities"]} >= {"changed", "unchanged"}
+        assert full["game"] is not None
+        # WHEN one activity changes and another is deleted
+        user_api_client.post(
+            f"/api/do-again/activities/{changed.pk}/end/",
+            {"end_time": timezone.now()},
+            format="json",
+        )
+        user_api_client.delete(f"/api/do-again/activities/{deleted.pk}/")
+        # THEN only those changes are returned for the cursor
+        delta = user_api_client.get(
+            "/api/do-again/changes/", {"cursor": full["cursor"]}
+        ).json()
+        titles = {a["title"] for a in delta["activities"]}
+        assert "changed" in titles
+        assert unchanged.title not in titles
+        assert [o["activity"] for o in delta["occurances"]] == [changed.pk]
+        assert delta["deleted_activities"] == [deleted.pk]
+        assert delta["game"] is not None
+        assert int(delta["cursor"]) > int(full["cursor"])
+
+    def test_changes_cursor_overlaps(
+        self, user_api_client: APIClient, activity_factory, settings
+    ):
+        settings.DO_AGAIN_LIST_CHANGES_OVERLAP = 60
+        # GIVEN a client that synced everything a moment ago
+        cursor = user_api_client.get("/api/do-again/changes/").json()["cursor"]
+        # WHEN a transaction that stamped its rows before that read commits
+        stamped_before = timezone.now() - datetime.timedelta(seconds=1)
+        late = activity_factory(title="late")
+        models.Activity.objects.filter(pk=late.pk).update(updated_at=stamped_before)
+        # THEN the next read of the feed still delivers them
+        delta = user_api_client.get("/api/do-again/changes/", {"cursor": cursor}).json()
+        assert "late" in {a["title"] for a in delta["activities"]}
+
+
+class TestConditionalGetE2E:
+    @pytest.mark.parametrize(
+        "url", ["/api/do-again/activities/", "/api/do-again/occurances/"]
+    )
+    def test_not_modified_until_changed(
+        self, user_api_client: APIClient, activity_factory, url
+    ):
+        # GIVEN a list the client has already fetched
+        activity = activity_factory()
+        models.Occurance.objects.create(
+            activity=activity, start_time=timezone.now(), end_time=timezone.now()
+        )
+        first = user_api_client.get(url)
+        assert first.status_code == 200
+        etag = first["ETag"]
+        assert "no-cache" in first["Cache-Control"]
+        # WHEN it is re-fetched with the ETag
+        # THEN the server answers 304 without a body
+        again = user_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert again.status_code == 304
+        assert again.content == b""
+        # WHEN the data changes
+        user_api_client.post(
+            f"/api/do-again/activities/{activity.pk}/start/",
+            {"start_time": timezone.now()},
+            format="json",
+        )
+        # THEN the old ETag no longer matches
+        changed = user_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert changed.status_code == 200
+        assert changed["ETag"] != etag
+
+    def test_delete_changes_etag(self, user_api_client: APIClient, activity_factory):
+        # GIVEN two activities the client has already fetched
+        activity_factory(title="kept")
+        deleted = activity_factory(title="deleted")
+        etag = user_api_client.get("/api/do-again/activities/")["ETag"]
+        # WHEN the most recently updated one is not the one deleted
+        models.Activity.objects.filter(pk=deleted.pk).delete()
+        # THEN the list is still considered modified
+        response = user_api_client.get(
+            "/api/do-again/activities/", HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200
+
+    def test_game_state(self, user_api_client: APIClient, game_state):
+        # GIVEN a fetched game state
+        etag = user_api_client.get("/api/do-again/game/")["ETag"]
+        assert (
+            user_api_client.get(
+                "/api/do-again/game/", HTTP_IF_NONE_MATCH=etag
+            ).status_code
+            == 304
+        )
+        # WHEN it changes
+        user_api_client.post("/api/do-again/game/sync/", {"gold": 5}, format="json")
+        # THEN it is served in full again
+        assert (
+            user_api_client.get(
+                "/api/do-again/game/", HTTP_IF_NONE_MATCH=etag
+            ).status_code
+            == 200
+        )
+
+
+class TestDueActivitiesE2E:
+    def test_ranked_by_due_time(
+        self, user_api_client: APIClient, activity_factory, django_assert_num_queries
+    ):
+        # GIVEN completed activities with a next_time, a max interval or
+        # neither, plus an active and a pending one
+        now = timezone.now()
+
+        def completed(title, hours_ago, **kwargs):
+            end_time = now - datetime.timedelta(hours=hours_ago)
+            return activity_factory(
+                title=title,
+                state=models.Activity.State.INACTIVE,
+                current_start_time=end_time,
+                current_end_time=end_time,
+                last_completed_end_time=end_time,
+                **kwargs,
+            )
+
+        overdue = completed(
+            "overdue", 30, max_time_between_events=datetime.timedelta(days=1)
+        )
+        scheduled = completed(
+            "scheduled", 1, next_time=now + datetime.timedelta(hours=1)
+        )
+        unscheduled = completed("unscheduled", 2)
+        # next_time wins over the max interval
+        later = completed(
+            "later",
+            30,
+            max_time_between_events=datetime.timedelta(days=1),
+            next_time=now + datetime.timedelta(days=2),
+        )
+        activity_factory(title="active", state=models.Activity.State.ACTIVE)
+        activity_factory(title="pending")
+
+        # WHEN the most urgent are fetched
+        # THEN they come ranked from a single query (session + user + activities)
+        with django_assert_num_queries(3):
+            response = user_api_client.get("/api/do-again/activities/due/")
+        assert response.status_code == 200
+        assert [a["id"] for a in response.json()] == [
+            overdue.pk,
+            unscheduled.pk,
+            scheduled.pk,
+            later.pk,
+        ]
+        assert response.json()[0]["due_time"] == (
+            now - datetime.timedelta(hours=6)
+        ).isoformat().replace("+00:00", "Z")
+
+        response = user_api_client.get("/api/do-again/activities/due/", {"limit": 2})
+        assert [a["id"] for a in response.json()] == [overdue.pk, unscheduled.pk]
+
+    def test_invalid_limit(self, user_api_client: APIClient):
+        response = user_api_client.get("/api/do-again/activities/due/", {"limit": "x"})
+        assert response.status_code == 400
+
+
+class TestCompressionE2E:
+    def test_large_json_is_gzipped(
+        self, user_api_client: APIClient, activity_factory, settings
+    ):
+        settings.DO_AGAIN_LIST_GZIP_MIN_LENGTH = 1024
+        for index in range(20):
+            activity_factory(title=f"activity-{index}")
+        response = user_api_client.get(
+            "/api/do-again/activities/", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        assert response["Content-Encoding"] == "gzip"
+        assert len(json.loads(gzip.decompress(response.content))) >= 20
+
+    def test_small_json_is_not_gzipped(
+        self, user_api_client: APIClient, activity_factory, settings
+    ):
+        settings.DO_AGAIN_LIST_GZIP_MIN_LENGTH = 1024
+        activity_factory()
+        response = user_api_client.get(
+            "/api/do-again/activities/", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        assert not response.has_header("Content-Encoding")
+
+
+class TestOccurancePaginationE2E:
+    @pytest.fixture
+    def occurances(self, activity_factory, user, user_factory):
+        # ties on end_time, open occurances and another user's rows
+        now = timezone.now().replace(microsecond=0)
+        rows = []
+        for index in range(4):
+            activity = activity_factory(title=f"activity-{index}")
+            rows.append(models.Occurance(activity=activity, start_time=now))
+            for offset in (1, 1, 2, 3):
+                rows.append(
+                    models.Occurance(
+                        activity=activity,
+                        start_time=now - datetime.timedelta(hours=offset + 1),
+                        end_time=now - datetime.timedelta(hours=offset),
+                    )
+                )
+        other = models.Activity.objects.create(
+            owner=user_factory(username="other"), title="theirs"
+        )
+        models.Occurance.objects.create(activity=other, start_time=now, end_time=now)
+        return models.Occurance.objects.bulk_create(rows)
+
+    def _walk(self, client, url, params):
+        pages = []
+        while url:
+            response = client.get(url, params)
+            assert response.status_code == 200
+            pages.append(response.json()["results"])
+            url, params = response.json()["next"], None
+        return pages
+
+    def test_pages_cover_every_row_once_in_order(
+        self, user_api_client: APIClient, occurances
+    ):
+        pages = self._walk(
+            user_api_client, "/api/do-again/occurances/", {"page_size": 3}
+        )
+        assert [len(page) for page in pages] == [3, 3, 3, 3, 3, 3, 2]
+        expected = sorted(
+            occurances,
+            key=lambda o: (o.end_time is None, o.end_time or timezone.now(), o.pk),
+            reverse=True,
+        )
+        assert [row["id"] for page in pages for row in page] == [o.pk for o in expected]
+
+    def test_plain_list_unless_paged(self, user_api_client: APIClient, occurances):
+        # GIVEN a client that doesn't ask for pages
+        # WHEN it lists occurances
+        response = user_api_client.get("/api/do-again/occurances/")
+        # THEN it gets all of its own as a plain list, as before paging
+        assert response.status_code == 200
+        assert sorted(row["id"] for row in response.json()) == sorted(
+            o.pk for o in occurances
+        )
+        # AND a page once it passes page_size
+        page = user_api_client.get("/api/do-again/occurances/", {"page_size": 100})
+        assert set(page.json()) == {"next", "results"}
+        assert page.json()["next"] is None
+
+    def test_page_size_is_capped(
+        self, user_api_client: APIClient, occurances, monkeypatch
+    ):
+        from do_again_list.pagination import OccuranceCursorPagination
+
+        monkeypatch.setattr(OccuranceCursorPagination, "max_page_size", 5)
+        response = user_api_client.get("/api/do-again/occurances/", {"page_size": 1000})
+        assert len(response.json()["results"]) == 5
+
+    @pytest.mark.parametrize("cursor", ["nonsense", "fHg=", "bm90LWEtZGF0ZXwx"])
+    def test_invalid_cursor(self, user_api_client: APIClient, cursor):
+        response = user_api_client.get("/api/do-again/occurances/", {"cursor": cursor})
+        assert response.status_code == 404
+
+    def test_date_range(self, user_api_client: APIClient, occurances):
+        now = max(o.start_time for o in occurances)
+        response = user_api_client.get(
+            "/api/do-again/occurances/",
+            {
+                "end_time__gte": (now - datetime.timedelta(hours=2)).isoformat(),
+                "end_time__lt": (now - datetime.timedelta(hours=1)).isoformat(),
+            },
+        )
+        results = response.json()
+        assert len(results) == 4
+        assert {row["end_time"] for row in results} == {
+            (now - datetime.timedelta(hours=2)).isoformat().replace("+00:00", "Z")
+        }
+
+
+class TestDataExportV2E2E:
+    def test_round_trip(
+        self, user_api_client: APIClient, user, user_factory, bulk_seed, game_state
+    ):
+        # GIVEN a user with some history, one occurance still open
+        activities = bulk_seed(user, 3, 4)
+        models.Occurance.objects.create(
+            activity=activities[0],
+            start_time=timezone.now().replace(microsecond=0),
+            planned_time=timezone.now().replace(microsecond=0),
+        )
+        v1 = json.loads(
+            b"".join(
+                user_api_client.get("/api/do-again/data/export/").streaming_content
+            )
+        )
+        # WHEN the version 2 export is downloaded
+        response = user_api_client.get("/api/do-again/data/export/", {"version": 2})
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/gzip"
+        body = b"".join(response.streaming_content)
+        lines = gzip.decompress(body).splitlines()
+        assert json.loads(lines[0])["version"] == 2
+        assert len(body) < len(json.dumps(v1)) / 2
+        # AND imported into another account
+        user_factory(username="restorer")
+        restorer = APIClient()
+        restorer.login(username="restorer", password="well-known")
+        imported = restorer.post(
+            "/api/do-again/data/import/", body, content_type="application/x-ndjson"
+        )
+        assert imported.status_code == 200, imported.content
+        assert imported.json()["occurances_added"] == 13
+        # THEN it holds the same data, to the second
+        restored = json.loads(
+            b"".join(restorer.get("/api/do-again/data/export/").streaming_content)
+        )
+        assert restored["game_state"] == v1["game_state"]
+        for restored_activity, activity in zip(
+            restored["activities"], v1["activities"]
+        ):
+            for occurance in activity["occurances"]:
+                for key, value in occurance.items():
+                    if value is not None:
+                        occurance[key] = (
+                            datetime.datetime.fromisoformat(value)
+                            .replace(microsecond=0)
+                            .isoformat()
+                        )
+            assert restored_activity == activity
+        # AND importing it again adds nothing
+        again = restorer.post(
+            "/api/do-again/data/import/", body, content_type="application/x-ndjson"
+        )
+        assert again.json()["occurances_added"] == 0
+        # AND so does importing it back over the sub-second originals
+        back = user_api_client.post(
+            "/api/do-again/data/import/", body, content_type="application/x-ndjson"
+        )
+        assert back.json()["occurances_added"] == 0
+
+    def test_import_rejects_corrupt_upload(
+        self, user_api_client: APIClient, activity_factory
+    ):
+        # GIVEN an upload whose second activity line is truncated
+        body = (
+            b'{"version": 2}\n'
+            b'{"title": "first", "occurances": {"start_time": [1700000000], "end_time": [60]}}\n'
+            b'{"title": "second", "occ'
+        )
+        # WHEN it is imported
+        response = user_api_client.post(
+            "/api/do-again/data/import/", body, content_type="application/x-ndjson"
+        )
+        # THEN nothing is written
+        assert response.status_code == 400
+        assert not models.Activity.objects.filter(title="first").exists()